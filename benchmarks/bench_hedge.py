@@ -0,0 +1,166 @@
+"""Tail latency with and without hedged queries.
+
+Starts two fake nameservers on one port (127.0.0.1 and 127.0.0.2) that
+hold back a fraction of replies for a long stall, then resolves the same
+hosts through the UDP backend without hedging, with a fixed hedge delay
+and with a percentile-based one. Reports latency percentiles and the
+extra queries each policy cost as JSON.
+
+    python benchmarks/bench_hedge.py --lookups 5000 --stall-ratio 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from fakedns import FakeDNSServer
+
+from domain_ip_converter import resolver
+from domain_ip_converter.errors import DomainIPConverterError
+from domain_ip_converter.metrics import get_metrics
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(
+    name: str,
+    servers: List[FakeDNSServer],
+    lookups: int,
+    concurrency: int,
+    timeout: float,
+    hedge_delay: Optional[float] = None,
+    hedge_percentile: Optional[float] = None,
+    hedge_max_rate: float = 0.05,
+) -> Dict[str, Any]:
+    session = resolver.ResolverSession(
+        ["127.0.0.1", "127.0.0.2"],
+        timeout=timeout,
+        port=servers[0].port,
+        family=4,
+        backend="udp",
+        hedge_delay=hedge_delay,
+        hedge_percentile=hedge_percentile,
+        hedge_max_rate=hedge_max_rate,
+    )
+    latencies: List[float] = []
+    errors = [0]
+
+    def one(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            resolver.resolve_host(
+                f"{name}-{index}.example", timeout=timeout, session=session
+            )
+        except DomainIPConverterError:
+            errors[0] += 1
+        latencies.append(time.perf_counter() - started)
+
+    get_metrics().reset()
+    received = sum(server.received for server in servers)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(lookups)))
+    finally:
+        session.close()
+    queries = sum(server.received for server in servers) - received
+    snapshot = get_metrics().snapshot()
+    ordered = sorted(latencies)
+    return {
+        "policy": name,
+        "hedge_delay": hedge_delay,
+        "hedge_percentile": hedge_percentile,
+        "lookups": lookups,
+        "errors": errors[0],
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "p999_ms": round(_percentile(ordered, 0.999) * 1000, 3),
+        "queries_per_lookup": round(queries / lookups, 4),
+        "hedges_sent": snapshot.counter(
+            "hedged_queries_total", (("result", "sent"),)
+        ),
+        "hedges_won": snapshot.counter(
+            "hedged_queries_total", (("result", "won"),)
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--lookups", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--stall", type=float, default=1.0)
+    parser.add_argument("--stall-ratio", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--hedge-delay", type=float, default=0.02)
+    parser.add_argument("--hedge-percentile", type=float, default=95.0)
+    parser.add_argument("--hedge-max-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    primary = FakeDNSServer(
+        latency=args.latency, stall=args.stall, stall_ratio=args.stall_ratio
+    )
+    secondary = FakeDNSServer(
+        port=primary.port,
+        host="127.0.0.2",
+        latency=args.latency,
+        stall=args.stall,
+        stall_ratio=args.stall_ratio,
+        seed=1,
+    )
+    servers = [primary, secondary]
+    common = (servers, args.lookups, args.concurrency, args.timeout)
+    try:
+        results = [
+            run("none", *common),
+            run(
+                "delay",
+                *common,
+                hedge_delay=args.hedge_delay,
+                hedge_max_rate=args.hedge_max_rate,
+            ),
+            run(
+                "percentile",
+                *common,
+                hedge_delay=args.latency,
+                hedge_percentile=args.hedge_percentile,
+                hedge_max_rate=args.hedge_max_rate,
+            ),
+        ]
+    finally:
+        primary.close()
+        secondary.close()
+
+    for result in results:
+        print(
+            f"{result['policy']:>10}: p99 {result['p99_ms']:>9} ms, "
+            f"{result['queries_per_lookup']} queries/lookup",
+            file=sys.stderr,
+        )
+    report = {
+        "server": {
+            "latency_s": args.latency,
+            "stall_s": args.stall,
+            "stall_ratio": args.stall_ratio,
+        },
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
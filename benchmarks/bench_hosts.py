@@ -0,0 +1,99 @@
+"""Cost of answering pinned names from a hosts file.
+
+Writes a hosts-style file with ``--entries`` names (plus a few wildcard
+suffixes), then measures how long it takes to load, how long
+``resolve_host()`` takes for an exact and a wildcard match through a
+session, and how long a reload takes after the file changes. No network
+traffic is involved. Reports JSON.
+
+    python benchmarks/bench_hosts.py --entries 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+from domain_ip_converter.hosts import HostsIndex
+from domain_ip_converter.resolver import ResolverSession, resolve_host
+
+
+def _write(path: str, entries: int) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        for index in range(entries):
+            octets = index.to_bytes(3, "big")
+            address = "10." + ".".join(map(str, octets))
+            handle.write(f"{address} host{index}.corp.example\n")
+        for index in range(16):
+            handle.write(f"10.255.0.{index} *.zone{index}.example\n")
+
+
+def _per_call(func: Callable[[], Any], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hosts")
+        _write(path, args.entries)
+
+        started = time.perf_counter()
+        index = HostsIndex([path], check_interval=0)
+        load = time.perf_counter() - started
+
+        session = ResolverSession(hosts_files=[path])
+        exact = f"host{args.entries // 2}.corp.example"
+        wildcard = "a.b.zone7.example"
+        assert resolve_host(exact, session=session).ipv4
+        assert resolve_host(wildcard, session=session).ipv4
+
+        report: Dict[str, Any] = {
+            "entries": args.entries,
+            "python": sys.version.split()[0],
+            "load_seconds": round(load, 4),
+            "exact_lookup_us": round(
+                _per_call(
+                    lambda: resolve_host(exact, session=session),
+                    args.lookups,
+                )
+                * 1e6,
+                3,
+            ),
+            "wildcard_lookup_us": round(
+                _per_call(
+                    lambda: resolve_host(wildcard, session=session),
+                    args.lookups,
+                )
+                * 1e6,
+                3,
+            ),
+        }
+
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write("10.254.0.1 added.corp.example\n")
+        started = time.perf_counter()
+        index.refresh()
+        report["reload_seconds"] = round(time.perf_counter() - started, 4)
+        assert index.lookup("added.corp.example") is not None
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
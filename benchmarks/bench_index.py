@@ -0,0 +1,90 @@
+"""Cost of building and querying an IP-to-domain index.
+
+Builds an index of ``--domains`` synthetic results (two IPv4 and one
+IPv6 address each), then measures how long it takes to build, to open
+and to answer an exact lookup and a /24 query. No network traffic is
+involved. Reports JSON.
+
+    python benchmarks/bench_index.py --domains 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from domain_ip_converter.index import AddressIndex, build_index
+from domain_ip_converter.results import ResolveResult
+
+
+def _results(domains: int) -> Iterator[Tuple[str, ResolveResult]]:
+    for number in range(domains):
+        ipv4 = number.to_bytes(3, "big")
+        shared = (number % 4096).to_bytes(2, "big")
+        yield f"host{number}.corp.example", ResolveResult.from_packed(
+            b"\x0a" + ipv4 + b"\xc0\xa8" + shared,
+            b"\x20\x01\x0d\xb8" + bytes(8) + number.to_bytes(4, "big"),
+        )
+
+
+def _per_call(func: Callable[[], Any], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--domains", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "run.index")
+        started = time.perf_counter()
+        records = build_index(path, _results(args.domains))
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = AddressIndex(path)
+        opened = time.perf_counter() - started
+        exact = "10.0.0.1"
+        assert index.lookup(exact) == ["host1.corp.example"]
+
+        with index:
+            report: Dict[str, Any] = {
+                "domains": args.domains,
+                "records": records,
+                "python": sys.version.split()[0],
+                "file_mb": round(os.path.getsize(path) / 2**20, 1),
+                "build_seconds": round(build, 3),
+                "open_ms": round(opened * 1e3, 3),
+                "exact_lookup_us": round(
+                    _per_call(lambda: index.lookup(exact), args.queries)
+                    * 1e6,
+                    3,
+                ),
+                "slash24_query_us": round(
+                    _per_call(
+                        lambda: list(index.search("10.0.1.0/24")),
+                        args.queries // 100 or 1,
+                    )
+                    * 1e6,
+                    3,
+                ),
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
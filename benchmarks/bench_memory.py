@@ -0,0 +1,149 @@
+"""Memory held by bulk results: dict-of-lists vs. the compact forms.
+
+Builds the same synthetic results (one to three IPv4 and zero to two IPv6
+addresses per host, a share of failures) three ways and measures what each
+keeps allocated with tracemalloc:
+
+* ``dict`` -- the CLI's former map of host to ``{"ipv4": [...], ...}``;
+* ``objects`` -- a dict of host to slotted, packed ``ResolveResult``;
+* ``result_set`` -- a columnar ``ResultSet``.
+
+Host names are allocated up front and shared, so only the results
+themselves are counted. Reports bytes per host and the saving as JSON.
+
+    python benchmarks/bench_memory.py --hosts 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from domain_ip_converter.results import ResolveResult, ResultSet
+
+_Answer = Tuple[List[str], List[str]]
+_Outcome = Union[_Answer, str]
+
+
+def _synthetic(hosts: int, error_ratio: float, seed: int) -> List[_Outcome]:
+    rng = random.Random(seed)
+    outcomes: List[_Outcome] = []
+    for index in range(hosts):
+        if rng.random() < error_ratio:
+            outcomes.append(f"DNS resolution failed for 'h{index}.example'.")
+            continue
+        ipv4 = [
+            "10." + ".".join(str(rng.randrange(256)) for _ in range(3))
+            for _ in range(rng.randint(1, 3))
+        ]
+        ipv6 = [
+            f"2001:db8:{rng.randrange(65536):x}::{rng.randrange(65536):x}"
+            for _ in range(rng.randint(0, 2))
+        ]
+        outcomes.append((ipv4, ipv6))
+    return outcomes
+
+
+def build_dict(keys: List[str], outcomes: List[_Outcome]) -> Any:
+    results: Dict[str, Dict[str, Any]] = {}
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, str):
+            results[key] = {"error": outcome}
+        else:
+            # Fresh strings, as each lookup used to produce its own.
+            results[key] = {
+                "ipv4": [ip.encode().decode() for ip in outcome[0]],
+                "ipv6": [ip.encode().decode() for ip in outcome[1]],
+            }
+    return results
+
+
+def build_objects(keys: List[str], outcomes: List[_Outcome]) -> Any:
+    return {
+        key: outcome if isinstance(outcome, str) else ResolveResult(*outcome)
+        for key, outcome in zip(keys, outcomes)
+    }
+
+
+def build_result_set(keys: List[str], outcomes: List[_Outcome]) -> Any:
+    results = ResultSet()
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, str):
+            results.add(key, outcome)
+        else:
+            results.add(key, ResolveResult(*outcome))
+    return results
+
+
+def measure(
+    name: str,
+    build: Callable[[List[str], List[_Outcome]], Any],
+    keys: List[str],
+    outcomes: List[_Outcome],
+) -> Dict[str, Any]:
+    # Error messages are copied so they count against each layout.
+    copied = [
+        "".join(outcome) if isinstance(outcome, str) else outcome
+        for outcome in outcomes
+    ]
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    built = build(keys, copied)
+    seconds = time.perf_counter() - started
+    del copied
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return {
+        "layout": name,
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "bytes_per_host": round(retained / len(keys), 1),
+        "build_seconds": round(seconds, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--hosts", type=int, default=1_000_000)
+    parser.add_argument("--error-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    outcomes = _synthetic(args.hosts, args.error_ratio, args.seed)
+    keys = [f"h{index}.example" for index in range(args.hosts)]
+    results = [
+        measure("dict", build_dict, keys, outcomes),
+        measure("objects", build_objects, keys, outcomes),
+        measure("result_set", build_result_set, keys, outcomes),
+    ]
+    baseline = results[0]["retained_bytes"]
+    for result in results:
+        result["ratio"] = round(result["retained_bytes"] / baseline, 3)
+        print(
+            f"{result['layout']:>10}: {result['bytes_per_host']:>7} B/host "
+            f"({result['ratio']:.0%} of dict)",
+            file=sys.stderr,
+        )
+    report = {
+        "hosts": args.hosts,
+        "error_ratio": args.error_ratio,
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
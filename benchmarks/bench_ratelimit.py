@@ -0,0 +1,109 @@
+"""Throughput against a throttling nameserver, with and without pacing.
+
+Starts a fake nameserver that drops queries above ``--max-qps`` and
+resolves the same number of hosts through the UDP backend at high
+concurrency, first unpaced and then with ``ResolverSession(qps=...)`` at
+each ``--qps`` value. Reports answered lookups per second, failures and
+how many queries the server dropped, as JSON.
+
+    python benchmarks/bench_ratelimit.py --lookups 3000 --max-qps 1000 \\
+        --qps 900 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from fakedns import FakeDNSServer
+
+from domain_ip_converter import resolver
+from domain_ip_converter.errors import DomainIPConverterError
+
+
+def run(
+    server: FakeDNSServer,
+    lookups: int,
+    concurrency: int,
+    timeout: float,
+    qps: Optional[float],
+) -> Dict[str, Any]:
+    session = resolver.ResolverSession(
+        ["127.0.0.1"],
+        timeout=timeout,
+        port=server.port,
+        family=4,
+        backend="udp",
+        qps=qps,
+    )
+    errors = [0]
+
+    def one(index: int) -> None:
+        try:
+            resolver.resolve_host(
+                f"q{qps}-{index}.example", timeout=timeout, session=session
+            )
+        except DomainIPConverterError:
+            errors[0] += 1
+
+    received, throttled = server.received, server.throttled
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(lookups)))
+    finally:
+        session.close()
+    wall = time.perf_counter() - started
+    return {
+        "qps_limit": qps,
+        "lookups": lookups,
+        "errors": errors[0],
+        "seconds": round(wall, 3),
+        "answered_per_second": round((lookups - errors[0]) / wall, 1),
+        "queries_sent": server.received - received,
+        "queries_dropped": server.throttled - throttled,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--lookups", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--max-qps", type=float, default=1000.0)
+    parser.add_argument(
+        "--qps", type=float, nargs="+", default=[900.0, 1000.0]
+    )
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    results = []
+    with FakeDNSServer(latency=args.latency, max_qps=args.max_qps) as server:
+        for qps in [None, *args.qps]:
+            results.append(
+                run(server, args.lookups, args.concurrency, args.timeout, qps)
+            )
+            result = results[-1]
+            print(
+                f"qps={str(qps):>7}: {result['answered_per_second']:>8} "
+                f"answered/s, {result['errors']} errors",
+                file=sys.stderr,
+            )
+
+    report = {
+        "server": {"max_qps": args.max_qps, "latency_s": args.latency},
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
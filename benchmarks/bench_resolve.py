@@ -0,0 +1,271 @@
+"""Throughput and latency of each backend against a local fake DNS server.
+
+Every (backend, mode, concurrency) scenario runs in a fresh subprocess so
+CPU time and peak RSS are attributed to that scenario alone. Modes:
+
+* ``resolve_host`` -- a thread pool calling ``resolve_host`` directly;
+* ``resolve_many`` -- the CLI's ``_resolve_many`` batch helper;
+* ``cli`` -- ``cli.main`` end to end with ``--json`` output discarded.
+
+The ``socket`` backend cannot be pointed at the fake server (it asks the
+system resolver through ``getaddrinfo``), so it resolves ``--socket-host``
+and mostly measures client-side threading overhead.
+
+    python benchmarks/bench_resolve.py --lookups 2000 \\
+        --concurrency 1 16 64 --latency 0.005 --loss 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from fakedns import FakeDNSServer
+
+from domain_ip_converter import cli, resolver
+from domain_ip_converter.errors import DomainIPConverterError
+
+BACKENDS = ("dnspython", "udp", "socket")
+MODES = ("resolve_host", "resolve_many", "cli")
+
+Scenario = Dict[str, Any]
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+def _peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return int(peak // 1024 if sys.platform == "darwin" else peak)
+
+
+def _hosts(scenario: Scenario) -> List[str]:
+    if scenario["backend"] == "socket":
+        return [scenario["socket_host"]] * scenario["lookups"]
+    run = scenario["run_id"]
+    return [
+        f"host{index}.r{run}.bench.example"
+        for index in range(scenario["lookups"])
+    ]
+
+
+def _session_options(scenario: Scenario) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "timeout": scenario["timeout"],
+        "backend": scenario["backend"],
+    }
+    if scenario["backend"] != "socket":
+        options["nameservers"] = ["127.0.0.1"]
+        options["port"] = scenario["port"]
+    return options
+
+
+def _timed(
+    latencies: List[float], errors: List[int], func: Callable[..., Any]
+) -> Callable[..., Any]:
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except DomainIPConverterError:
+            with lock:
+                errors[0] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    return wrapper
+
+
+def run_scenario(scenario: Scenario) -> Dict[str, Any]:
+    """Run one scenario in this process and return its measurements."""
+
+    hosts = _hosts(scenario)
+    concurrency = scenario["concurrency"]
+    latencies: List[float] = []
+    errors = [0]
+    timed_resolve = _timed(latencies, errors, resolver.resolve_host)
+    cli.resolve_host = timed_resolve
+
+    session = resolver.ResolverSession(**_session_options(scenario))
+    previous = resolver.install_session(session)
+
+    def one(host: str) -> None:
+        try:
+            timed_resolve(host, timeout=scenario["timeout"])
+        except DomainIPConverterError:
+            pass
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        if scenario["mode"] == "resolve_host":
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(one, hosts))
+        elif scenario["mode"] == "resolve_many":
+            cli._resolve_many(hosts, scenario["timeout"], concurrency)
+        else:
+            # The CLI has no port option; bind the fake server's port in.
+            cli.ResolverSession = functools.partial(  # type: ignore
+                resolver.ResolverSession, port=scenario["port"]
+            )
+            with tempfile.NamedTemporaryFile(
+                "w", suffix=".txt", delete=False
+            ) as handle:
+                handle.write("\n".join(hosts))
+            argv = [
+                "--file",
+                handle.name,
+                "--json",
+                "--concurrency",
+                str(concurrency),
+                "--timeout",
+                str(scenario["timeout"]),
+                "--backend",
+                scenario["backend"],
+            ]
+            if scenario["backend"] != "socket":
+                argv += ["--nameserver", "127.0.0.1"]
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cli.main(argv)
+            finally:
+                os.unlink(handle.name)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+    finally:
+        resolver.install_session(previous)
+        session.close()
+
+    ordered = sorted(latencies)
+    return {
+        "backend": scenario["backend"],
+        "mode": scenario["mode"],
+        "concurrency": concurrency,
+        "lookups": len(hosts),
+        "errors": errors[0],
+        "wall_s": round(wall, 4),
+        "qps": round(len(ordered) / wall, 1) if wall else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_kib": _peak_rss_kib(),
+    }
+
+
+def _spawn(scenario: Scenario) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, __file__, "--scenario", json.dumps(scenario)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    result: Dict[str, Any] = json.loads(completed.stdout)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 16, 64]
+    )
+    parser.add_argument(
+        "--backend", choices=BACKENDS, nargs="+", default=list(BACKENDS)
+    )
+    parser.add_argument(
+        "--mode", choices=MODES, nargs="+", default=list(MODES)
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--nxdomain", type=float, default=0.0)
+    parser.add_argument("--ttl", type=int, default=300)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--socket-host", default="localhost")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(json.loads(args.scenario))))
+        return
+
+    if "dnspython" in args.backend and not resolver.HAS_DNSPYTHON:
+        print("dnspython is not installed; skipping it.", file=sys.stderr)
+        args.backend.remove("dnspython")
+
+    results = []
+    with FakeDNSServer(
+        latency=args.latency,
+        loss=args.loss,
+        nxdomain_ratio=args.nxdomain,
+        ttl=args.ttl,
+    ) as server:
+        run_id = 0
+        for backend in args.backend:
+            for mode in args.mode:
+                for concurrency in args.concurrency:
+                    run_id += 1
+                    scenario = {
+                        "backend": backend,
+                        "mode": mode,
+                        "concurrency": concurrency,
+                        "lookups": args.lookups,
+                        "timeout": args.timeout,
+                        "port": server.port,
+                        "socket_host": args.socket_host,
+                        "run_id": run_id,
+                    }
+                    results.append(_spawn(scenario))
+                    print(
+                        f"{backend:>9} {mode:>12} c={concurrency:<4} "
+                        f"{results[-1]['qps']:>9} qps",
+                        file=sys.stderr,
+                    )
+
+    report = {
+        "server": {
+            "latency_s": args.latency,
+            "loss": args.loss,
+            "nxdomain_ratio": args.nxdomain,
+            "ttl": args.ttl,
+        },
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
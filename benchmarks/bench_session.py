@@ -0,0 +1,93 @@
+"""Per-lookup overhead of a reused ResolverSession vs. a fresh resolver.
+
+Requires dnspython. Lookups are answered by a tiny responder on 127.0.0.1,
+so the numbers isolate client-side cost rather than network latency.
+
+    python benchmarks/bench_session.py --lookups 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import threading
+import time
+from typing import Callable, Dict
+
+import dns.message
+import dns.rdatatype
+import dns.rrset
+import dns.resolver
+
+from domain_ip_converter.resolver import ResolverSession, resolve_host
+
+
+def _serve(sock: socket.socket) -> None:
+    while True:
+        try:
+            wire, addr = sock.recvfrom(4096)
+        except OSError:
+            return
+        query = dns.message.from_wire(wire)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        address = "192.0.2.1" if rdtype == "A" else "2001:db8::1"
+        response.answer.append(
+            dns.rrset.from_text(question.name, 60, "IN", rdtype, address)
+        )
+        sock.sendto(response.to_wire(), addr)
+
+
+def _measure(lookups: int, resolve: Callable[[str], object]) -> float:
+    start = time.perf_counter()
+    for index in range(lookups):
+        resolve(f"host{index}.bench.example")
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    threading.Thread(target=_serve, args=(sock,), daemon=True).start()
+
+    def fresh_resolver(host: str) -> object:
+        # What every lookup paid before sessions: re-read resolv.conf.
+        resolver = dns.resolver.Resolver()
+        resolver.nameservers = ["127.0.0.1"]
+        resolver.port = port
+        resolver.resolve(host, "A", lifetime=2.0)
+        return resolver.resolve(host, "AAAA", lifetime=2.0)
+
+    session = ResolverSession(["127.0.0.1"], timeout=2.0, port=port)
+
+    def with_session(host: str) -> object:
+        return resolve_host(host, timeout=2.0, session=session)
+
+    setup_start = time.perf_counter()
+    for _ in range(args.lookups):
+        dns.resolver.Resolver()
+    setup_us = (time.perf_counter() - setup_start) / args.lookups * 1e6
+
+    report: Dict[str, float] = {
+        "lookups": args.lookups,
+        "resolver_setup_us": round(setup_us, 2),
+        "fresh_resolver_us_per_lookup": round(
+            _measure(args.lookups, fresh_resolver), 2
+        ),
+        "session_us_per_lookup": round(
+            _measure(args.lookups, with_session), 2
+        ),
+    }
+    sock.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
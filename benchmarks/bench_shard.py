@@ -0,0 +1,124 @@
+"""Scaling of resolve_sharded() with the number of worker processes.
+
+Resolves the same input (a mix of hostnames and URLs, with repeats)
+against a local fake DNS server through the UDP backend for each
+``--processes`` value, consuming the results as NDJSON lines the way the
+CLI does, and reports lines per second and the speedup over one process
+as JSON. Scaling is bounded by the cores available and by the fake
+server, which runs in this process.
+
+    python benchmarks/bench_shard.py --lines 200000 --processes 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+from fakedns import FakeDNSServer
+
+from domain_ip_converter import cli
+from domain_ip_converter.resolver import ResolverSession
+from domain_ip_converter.shard import DEFAULT_SHARD_CACHE_SIZE
+
+
+def build_inputs(lines: int, unique: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    pool = []
+    for index in range(unique):
+        host = f"host-{index}.zone{index % 97}.example"
+        pool.append(f"https://{host}/p" if rng.random() < 0.3 else host)
+    return [rng.choice(pool) for _ in range(lines)]
+
+
+def run(
+    inputs: List[str],
+    session: ResolverSession,
+    processes: int,
+    workers: int,
+    use_async: bool,
+    ordered: bool,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    produced = cli._run_sharded(
+        inputs,
+        session,
+        processes=processes,
+        workers=workers,
+        use_async=use_async,
+        cache_size=DEFAULT_SHARD_CACHE_SIZE,
+        cache_file=None,
+        render=functools.partial(cli._shard_line, False),
+        ordered=ordered,
+    )
+    count = sum(1 for _ in produced)
+    wall = time.perf_counter() - start
+    return {
+        "processes": processes,
+        "lines": count,
+        "wall_s": round(wall, 4),
+        "lines_per_s": round(count / wall, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--unique", type=int, default=50_000)
+    parser.add_argument(
+        "--processes", type=int, nargs="+", default=[1, 2, 4]
+    )
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--ordered", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    inputs = build_inputs(args.lines, args.unique, args.seed)
+    results = []
+    with FakeDNSServer(latency=args.latency) as server:
+        session = ResolverSession(
+            ["127.0.0.1"], timeout=5.0, port=server.port, backend="udp"
+        )
+        for processes in args.processes:
+            results.append(
+                run(
+                    inputs,
+                    session,
+                    processes,
+                    args.workers,
+                    args.use_async,
+                    args.ordered,
+                )
+            )
+            print(
+                f"processes={processes:<3} "
+                f"{results[-1]['lines_per_s']:>10} lines/s",
+                file=sys.stderr,
+            )
+
+    baseline = results[0]["lines_per_s"]
+    for result in results:
+        result["speedup"] = round(result["lines_per_s"] / baseline, 2)
+    report = {
+        "cpus": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "async": args.use_async,
+        "ordered": args.ordered,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
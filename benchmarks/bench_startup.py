@@ -0,0 +1,181 @@
+"""Import cost of the package and the CLI, checked against a budget.
+
+Runs each scenario in a fresh interpreter under ``python -X importtime``
+and sums the cumulative time of the modules it imports beyond a bare
+interpreter's, after one warm-up run so bytecode is cached as in an
+installed package. The child then prints ``sys.modules``, the exact
+set of loaded module names, which is checked for modules a scenario
+must not load (asyncio, dnspython, sqlite3, multiprocessing, the
+resolver for plain normalization): those are only meant to be imported
+on first use. The ``-X importtime`` output is used for timings only.
+
+Reports the median per scenario as JSON and exits non-zero if any median
+exceeds its budget or a forbidden module was loaded. Budgets hold with
+some margin on a single-core CI runner; scale them for slower machines
+with ``--budget-scale``.
+
+    python benchmarks/bench_startup.py --runs 15 --budget-scale 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class Scenario(NamedTuple):
+    code: str
+    budget_ms: Optional[float]
+    forbidden: Tuple[str, ...]
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "package": Scenario(
+        "import domain_ip_converter",
+        15.0,
+        ("asyncio", "domain_ip_converter.cli", "domain_ip_converter.resolver"),
+    ),
+    "normalize": Scenario(
+        "from domain_ip_converter import normalize_domain\n"
+        "normalize_domain('Example.COM.')",
+        25.0,
+        ("asyncio", "domain_ip_converter.resolver"),
+    ),
+    "cli": Scenario(
+        "import domain_ip_converter.cli",
+        # Measured 50-60ms on a single-core CI runner; logging (through
+        # concurrent.futures), argparse and socket make up most of it.
+        70.0,
+        (
+            "asyncio",
+            # Pulls in inspect, dis and ast: about a sixth of the budget.
+            "dataclasses",
+            "dns.resolver",
+            "domain_ip_converter.udp",
+            "multiprocessing",
+            "sqlite3",
+        ),
+    ),
+    # Picking the "auto" backend is what imports dnspython, if installed.
+    "first_lookup": Scenario(
+        "from domain_ip_converter import ResolverSession\n"
+        "ResolverSession().backend_name()",
+        None,
+        ("asyncio",),
+    ),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+# Appended to every scenario; sys is always loaded already.
+_DUMP_MODULES = "\nimport sys\nprint('\\n'.join(sorted(sys.modules)))\n"
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _run(code: str) -> Tuple[List[Tuple[int, str, int]], Set[str]]:
+    """Run ``code``; return its timed imports and the modules it loaded.
+
+    Timed imports are ``(depth, module, cumulative_us)`` tuples.
+    """
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code + _DUMP_MODULES],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    times = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            times.append((depth, match.group(4), int(match.group(2))))
+    return times, set(completed.stdout.split())
+
+
+def _measure(
+    code: str, baseline: Set[str], runs: int
+) -> Tuple[List[float], Set[str]]:
+    _run(code)  # warm-up: writes bytecode
+    samples = []
+    loaded: Set[str] = set()
+    for _ in range(runs):
+        times, loaded = _run(code)
+        samples.append(
+            sum(
+                cumulative
+                for depth, module, cumulative in times
+                if depth == 0 and module not in baseline
+            )
+            / 1000
+        )
+    return samples, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-scale", type=float, default=1.0)
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), action="append"
+    )
+    args = parser.parse_args()
+
+    baseline = {module for _, module, _ in _run("pass")[0]}
+    results = []
+    failed = False
+    for name in args.scenario or SCENARIOS:
+        scenario = SCENARIOS[name]
+        samples, loaded = _measure(scenario.code, baseline, args.runs)
+        median = statistics.median(samples)
+        budget = (
+            scenario.budget_ms * args.budget_scale
+            if scenario.budget_ms is not None
+            else None
+        )
+        unwanted = sorted(set(scenario.forbidden) & loaded)
+        ok = not unwanted and (budget is None or median <= budget)
+        failed = failed or not ok
+        results.append(
+            {
+                "scenario": name,
+                "import_ms_median": round(median, 2),
+                "import_ms_min": round(min(samples), 2),
+                "budget_ms": budget,
+                "forbidden_loaded": unwanted,
+                "dnspython_loaded": "dns.resolver" in loaded,
+                "ok": ok,
+            }
+        )
+        print(
+            f"{name:>12}: {median:7.2f} ms (budget {budget}) "
+            f"{'ok' if ok else 'OVER BUDGET'}",
+            file=sys.stderr,
+        )
+
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Configurable local DNS responder for benchmarks and load tests.
+
+Answers A and AAAA queries over UDP on a loopback address with optional
+added latency, random stalls, random packet loss, a deterministic
+NXDOMAIN ratio, fixed TTLs and an optional query rate cap above which
+queries are dropped, as throttling resolvers do. It can be imported
+(``FakeDNSServer``) or run on its own:
+
+    python benchmarks/fakedns.py --port 5353 --latency 0.02 --loss 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import random
+import socket
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from domain_ip_converter import wire
+
+_Reply = Tuple[float, int, bytes, Tuple[str, int]]
+
+
+class FakeDNSServer:
+    """Threaded UDP responder; replies are delayed by ``latency`` seconds.
+
+    ``nxdomain_ratio`` of names (chosen by a hash of the name, so repeated
+    lookups agree) answer NXDOMAIN with an SOA carrying ``ttl``; ``loss``
+    is the probability that a query is silently dropped, and
+    ``stall_ratio`` the probability that its reply is held back for an
+    extra ``stall`` seconds. Several servers can share a port on
+    different loopback addresses (``host``), as nameservers of one
+    resolver must. With ``max_qps``, queries beyond that rate (after a
+    burst of a tenth of a second's worth) are dropped and counted in
+    ``throttled``.
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        loss: float = 0.0,
+        nxdomain_ratio: float = 0.0,
+        ttl: int = 300,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        stall: float = 0.0,
+        stall_ratio: float = 0.0,
+        max_qps: Optional[float] = None,
+    ) -> None:
+        self.latency = latency
+        self.stall = stall
+        self.stall_ratio = stall_ratio
+        self.loss = loss
+        self.nxdomain_ratio = nxdomain_ratio
+        self.ttl = ttl
+        self.max_qps = max_qps
+        self.received = 0
+        self.dropped = 0
+        self.throttled = 0
+        self._burst = max(max_qps / 10, 1.0) if max_qps else 0.0
+        self._tokens = self._burst
+        self._refilled = time.monotonic()
+        self._random = random.Random(seed)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self._sock.bind((host, port))
+        self.port: int = self._sock.getsockname()[1]
+        self._replies: List[_Reply] = []
+        self._sequence = 0
+        self._ready = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._receive, daemon=True),
+            threading.Thread(target=self._send_delayed, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> "FakeDNSServer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _is_nxdomain(self, name: str) -> bool:
+        bucket = zlib.crc32(name.encode("ascii", "replace")) % 10000
+        return bucket < self.nxdomain_ratio * 10000
+
+    def _throttle(self) -> bool:
+        if not self.max_qps:
+            return False
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._refilled) * self.max_qps, self._burst
+        )
+        self._refilled = now
+        if self._tokens < 1:
+            self.throttled += 1
+            return True
+        self._tokens -= 1
+        return False
+
+    def _answer(self, data: bytes) -> Optional[bytes]:
+        try:
+            query = wire.decode_message(data)
+        except wire.WireFormatError:
+            return None
+        if query.question is None:
+            return None
+        name, rdtype = query.question
+        if self._is_nxdomain(name):
+            return wire.encode_response(
+                query, rcode=wire.RCODE_NXDOMAIN, negative_ttl=self.ttl
+            )
+        digest = zlib.crc32(name.encode("ascii", "replace"))
+        if rdtype == wire.TYPE_A:
+            octets = digest.to_bytes(4, "big")[1:]
+            value = "10." + ".".join(str(octet) for octet in octets)
+        elif rdtype == wire.TYPE_AAAA:
+            value = f"fd00::{digest >> 16:x}:{digest & 0xFFFF:x}"
+        elif rdtype == wire.TYPE_PTR:
+            value = f"host-{digest:08x}.example"
+        else:
+            return wire.encode_response(query)
+        return wire.encode_response(query, [(rdtype, self.ttl, value)])
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                data, address = self._sock.recvfrom(4096)
+            except OSError:
+                return
+            self.received += 1
+            if self._throttle():
+                continue
+            if self.loss and self._random.random() < self.loss:
+                self.dropped += 1
+                continue
+            reply = self._answer(data)
+            if reply is None:
+                continue
+            delay = self.latency
+            if self.stall_ratio and self._random.random() < self.stall_ratio:
+                delay += self.stall
+            if not delay:
+                self._sock.sendto(reply, address)
+                continue
+            with self._ready:
+                self._sequence += 1
+                heapq.heappush(
+                    self._replies,
+                    (
+                        time.monotonic() + delay,
+                        self._sequence,
+                        reply,
+                        address,
+                    ),
+                )
+                self._ready.notify()
+
+    def _send_delayed(self) -> None:
+        while True:
+            with self._ready:
+                while not self._closed and (
+                    not self._replies
+                    or self._replies[0][0] > time.monotonic()
+                ):
+                    timeout = None
+                    if self._replies:
+                        timeout = self._replies[0][0] - time.monotonic()
+                    self._ready.wait(timeout)
+                if self._closed:
+                    return
+                _, _, reply, address = heapq.heappop(self._replies)
+            try:
+                self._sock.sendto(reply, address)
+            except OSError:
+                return
+
+    def close(self) -> None:
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+        self._sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=5353)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--nxdomain", type=float, default=0.0)
+    parser.add_argument("--ttl", type=int, default=300)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--stall", type=float, default=0.0)
+    parser.add_argument("--stall-ratio", type=float, default=0.0)
+    parser.add_argument("--max-qps", type=float)
+    args = parser.parse_args()
+
+    server = FakeDNSServer(
+        args.port,
+        args.latency,
+        args.loss,
+        args.nxdomain,
+        args.ttl,
+        host=args.host,
+        stall=args.stall,
+        stall_ratio=args.stall_ratio,
+        max_qps=args.max_qps,
+    )
+    print(f"Serving DNS on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
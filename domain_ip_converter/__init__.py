@@ -1,24 +1,133 @@
-"""Domain to IP Converter package."""
+"""Domain to IP Converter package.
+
+Public names are imported from their submodules on first access, so
+``import domain_ip_converter`` stays cheap and a caller that only needs
+``normalize_domain`` never loads the resolver backends or the CLI.
+"""
 
 from __future__ import annotations
 
-from .cli import main
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
 from .errors import (
+    AddressIndexError,
+    CheckpointError,
     DNSTimeoutError,
     DomainIPConverterError,
     InvalidInputError,
+    NXDomainError,
     ResolutionError,
 )
-from .resolver import ResolveResult, resolve_host
-from .validate import normalize_domain
+
+if TYPE_CHECKING:
+    from .batch import resolve_many, resolve_reverse_many
+    from .cache import ResolverCache, install_cache
+    from .checkpoint import Checkpoint
+    from .cli import main
+    from .hosts import HostsIndex
+    from .index import AddressIndex, IndexBuilder, build_index
+    from .metrics import Metrics, get_metrics
+    from .ratelimit import RateLimiter
+    from .resolver import (
+        ResolverSession,
+        install_session,
+        resolve_host,
+        resolve_host_async,
+        resolve_many_async,
+        resolve_reverse,
+        resolve_reverse_async,
+        resolve_reverse_many_async,
+        reverse_name,
+    )
+    from .results import ResolveResult, ResultSet
+    from .shard import ShardResult, resolve_sharded
+    from .store import PersistentCache
+    from .validate import normalize_address, normalize_domain, normalize_many
+
+_LAZY: Dict[str, str] = {
+    "AddressIndex": "index",
+    "Checkpoint": "checkpoint",
+    "HostsIndex": "hosts",
+    "IndexBuilder": "index",
+    "Metrics": "metrics",
+    "PersistentCache": "store",
+    "RateLimiter": "ratelimit",
+    "ResolveResult": "results",
+    "ResolverCache": "cache",
+    "ResolverSession": "resolver",
+    "ResultSet": "results",
+    "ShardResult": "shard",
+    "build_index": "index",
+    "get_metrics": "metrics",
+    "install_cache": "cache",
+    "install_session": "resolver",
+    "main": "cli",
+    "normalize_address": "validate",
+    "normalize_domain": "validate",
+    "normalize_many": "validate",
+    "resolve_host": "resolver",
+    "resolve_host_async": "resolver",
+    "resolve_many": "batch",
+    "resolve_many_async": "resolver",
+    "resolve_reverse": "resolver",
+    "resolve_reverse_async": "resolver",
+    "resolve_reverse_many": "batch",
+    "resolve_reverse_many_async": "resolver",
+    "resolve_sharded": "shard",
+    "reverse_name": "resolver",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY))
+
 
 __all__ = [
+    "AddressIndex",
+    "AddressIndexError",
+    "Checkpoint",
+    "CheckpointError",
     "DNSTimeoutError",
     "DomainIPConverterError",
+    "HostsIndex",
+    "IndexBuilder",
     "InvalidInputError",
+    "Metrics",
+    "NXDomainError",
+    "PersistentCache",
+    "RateLimiter",
     "ResolutionError",
     "ResolveResult",
+    "ResolverCache",
+    "ResolverSession",
+    "ResultSet",
+    "ShardResult",
+    "build_index",
+    "get_metrics",
+    "install_cache",
+    "install_session",
     "main",
+    "normalize_address",
     "normalize_domain",
+    "normalize_many",
     "resolve_host",
+    "resolve_host_async",
+    "resolve_many",
+    "resolve_many_async",
+    "resolve_reverse",
+    "resolve_reverse_async",
+    "resolve_reverse_many",
+    "resolve_reverse_many_async",
+    "resolve_sharded",
+    "reverse_name",
 ]
@@ -0,0 +1,139 @@
+"""Adaptive limit on the number of lookups in flight.
+
+:class:`AdaptiveConcurrency` is an AIMD controller: it doubles the limit
+while lookups stay healthy (slow start), then grows it by one per window
+of completed lookups, and cuts it multiplicatively when the window's
+timeout rate or median latency shows the upstream resolver is saturated.
+Every change is logged on the ``domain_ip_converter.adaptive`` logger and
+counted in the ``concurrency_changes_total`` metric.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List
+
+from .metrics import get_metrics
+
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 512
+DEFAULT_INITIAL_CONCURRENCY = 8
+# Fewer completed lookups than this say too little to act on.
+MIN_WINDOW = 8
+# How far the latency baseline drifts up per window, so that a slower mix
+# of hosts later in the run is not mistaken for congestion forever.
+BASELINE_DRIFT = 1.05
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for lookups in flight, bounded by min/max.
+
+    Callers keep at most :attr:`limit` lookups in flight and report each
+    completed one with :meth:`record`. Once a window of ``max(limit,
+    MIN_WINDOW)`` lookups has completed, the limit is multiplied by
+    ``decrease`` if more than ``timeout_threshold`` of them timed out or
+    their median latency exceeds ``latency_tolerance`` times the baseline
+    (the lowest window median, drifting up slowly); otherwise it grows.
+    Safe to share across threads.
+    """
+
+    def __init__(
+        self,
+        minimum: int = DEFAULT_MIN_CONCURRENCY,
+        maximum: int = DEFAULT_MAX_CONCURRENCY,
+        initial: int = DEFAULT_INITIAL_CONCURRENCY,
+        timeout_threshold: float = 0.02,
+        latency_tolerance: float = 2.0,
+        decrease: float = 0.5,
+    ) -> None:
+        if minimum < 1 or maximum < minimum:
+            raise ValueError("bounds must satisfy 1 <= minimum <= maximum.")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1.")
+        if latency_tolerance <= 1:
+            raise ValueError("latency_tolerance must be greater than 1.")
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.timeout_threshold = timeout_threshold
+        self.latency_tolerance = latency_tolerance
+        self.decrease = decrease
+        self._limit = min(max(initial, minimum), maximum)
+        self._slow_start = True
+        self._baseline = float("inf")
+        self._latencies: List[float] = []
+        self._timeouts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Number of lookups that may be in flight right now."""
+
+        return self._limit
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        """Report one completed lookup and adjust the limit if due."""
+
+        with self._lock:
+            if timed_out:
+                self._timeouts += 1
+            else:
+                self._latencies.append(seconds)
+            samples = len(self._latencies) + self._timeouts
+            if samples >= max(self._limit, MIN_WINDOW):
+                self._adjust(samples)
+
+    def _adjust(self, samples: int) -> None:
+        import statistics
+
+        timeout_rate = self._timeouts / samples
+        median = (
+            statistics.median(self._latencies) if self._latencies else 0.0
+        )
+        self._latencies = []
+        self._timeouts = 0
+
+        old = self._limit
+        if timeout_rate > self.timeout_threshold:
+            reason = "timeouts"
+            detail = (
+                f"{timeout_rate:.1%} of {samples} lookups timed out "
+                f"(threshold {self.timeout_threshold:.1%})"
+            )
+        elif median > self._baseline * self.latency_tolerance:
+            reason = "latency"
+            detail = (
+                f"median latency {median * 1000:.1f}ms exceeds "
+                f"{self.latency_tolerance:g}x baseline "
+                f"{self._baseline * 1000:.1f}ms"
+            )
+        else:
+            reason = "slow_start" if self._slow_start else "additive"
+            detail = (
+                f"{samples} lookups healthy, median latency "
+                f"{median * 1000:.1f}ms"
+            )
+
+        if median:
+            self._baseline = min(median, self._baseline * BASELINE_DRIFT)
+
+        if reason in ("timeouts", "latency"):
+            self._slow_start = False
+            new = max(self.minimum, int(old * self.decrease))
+        elif reason == "slow_start":
+            new = min(self.maximum, old * 2)
+        else:
+            new = min(self.maximum, old + 1)
+        if new == old:
+            return
+
+        self._limit = new
+        direction = "up" if new > old else "down"
+        get_metrics().incr(
+            "concurrency_changes_total",
+            labels=(("direction", direction), ("reason", reason)),
+        )
+        logger.info("concurrency %d -> %d: %s", old, new, detail)
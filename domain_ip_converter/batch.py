@@ -0,0 +1,152 @@
+"""Bulk resolution of raw inputs, looking up each distinct host once."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar, Union
+
+from .cache import CacheBackend
+from .errors import DomainIPConverterError, InvalidInputError
+from .resolver import ResolverSession, resolve_host, resolve_reverse
+from .results import ResolveResult
+from .validate import normalize_addresses, normalize_many
+
+DEFAULT_WORKERS = 32
+
+Outcome = Union[ResolveResult, DomainIPConverterError]
+# A reverse lookup yields the address's host names.
+ReverseOutcome = Union[List[str], DomainIPConverterError]
+
+_T = TypeVar("_T")
+
+
+class InputPlan:
+    """Raw inputs grouped by the host they normalize to.
+
+    ``normalized`` is aligned with ``inputs`` and holds either the host or
+    the :class:`InvalidInputError` for that line. ``hosts`` maps every
+    distinct valid host, in order of first appearance, to the raw inputs
+    that produced it. For reverse lookups the hosts are IP addresses.
+    """
+
+    __slots__ = ("inputs", "normalized", "hosts")
+
+    def __init__(
+        self,
+        inputs: List[str],
+        normalized: List[Union[str, InvalidInputError]],
+        hosts: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        self.inputs = inputs
+        self.normalized = normalized
+        self.hosts: Dict[str, List[str]] = {} if hosts is None else hosts
+
+
+def plan_inputs(inputs: Iterable[str], reverse: bool = False) -> InputPlan:
+    """Normalize ``inputs`` and group them by resulting host.
+
+    With ``reverse`` the inputs are IP addresses to look up names for.
+    """
+
+    raw_inputs = list(inputs)
+    normalize = normalize_addresses if reverse else normalize_many
+    plan = InputPlan(raw_inputs, normalize(raw_inputs))
+    for raw, host in zip(plan.inputs, plan.normalized):
+        if not isinstance(host, InvalidInputError):
+            plan.hosts.setdefault(host, []).append(raw)
+    return plan
+
+
+def lookup_outcome(
+    host: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+    family: Optional[int] = None,
+) -> Outcome:
+    """Resolve ``host``, returning a failure instead of raising it."""
+
+    try:
+        return resolve_host(
+            host, timeout=timeout, cache=cache, session=session, family=family
+        )
+    except DomainIPConverterError as exc:
+        return exc
+
+
+def reverse_outcome(
+    address: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+) -> ReverseOutcome:
+    """Look up ``address``'s names, returning a failure instead of raising."""
+
+    try:
+        return resolve_reverse(
+            address, timeout=timeout, cache=cache, session=session
+        )
+    except DomainIPConverterError as exc:
+        return exc
+
+
+def resolve_many(
+    inputs: Iterable[str],
+    timeout: float = 5.0,
+    workers: int = DEFAULT_WORKERS,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+    family: Optional[int] = None,
+) -> List[Outcome]:
+    """Normalize and resolve raw inputs (hostnames, URLs, IP literals).
+
+    Each distinct host is resolved once on a pool of ``workers`` threads
+    and its outcome is shared by every input that normalized to it. The
+    returned list is aligned with ``inputs``; invalid inputs and failed
+    lookups are returned as the raised :class:`DomainIPConverterError`.
+    """
+
+    def _lookup(host: str) -> Outcome:
+        return lookup_outcome(host, timeout, cache, session, family)
+
+    return _resolve_planned(plan_inputs(inputs), workers, _lookup)
+
+
+def resolve_reverse_many(
+    inputs: Iterable[str],
+    timeout: float = 5.0,
+    workers: int = DEFAULT_WORKERS,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+) -> List[ReverseOutcome]:
+    """Normalize IP addresses and look up their host names (PTR records).
+
+    Works like :func:`resolve_many`: each distinct address is looked up
+    once on ``workers`` threads and the list is aligned with ``inputs``,
+    holding each address's names or the :class:`DomainIPConverterError`.
+    """
+
+    def _lookup(address: str) -> ReverseOutcome:
+        return reverse_outcome(address, timeout, cache, session)
+
+    plan = plan_inputs(inputs, reverse=True)
+    return _resolve_planned(plan, workers, _lookup)
+
+
+def _resolve_planned(
+    plan: InputPlan,
+    workers: int,
+    lookup: Callable[[str], Union[_T, DomainIPConverterError]],
+) -> List[Union[_T, DomainIPConverterError]]:
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+
+    hosts = list(plan.hosts)
+    pool_size = max(min(workers, len(hosts)), 1)
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        outcomes = dict(zip(hosts, pool.map(lookup, hosts)))
+
+    return [
+        host if isinstance(host, InvalidInputError) else outcomes[host]
+        for host in plan.normalized
+    ]
@@ -0,0 +1,311 @@
+"""In-process, TTL-aware LRU cache for resolution results.
+
+Besides addresses, caches remember the host names found by reverse (PTR)
+lookups and negative answers -- a name that does not exist (NXDOMAIN) or
+has no records of the requested type -- for the negative TTL of the
+zone's SOA record, so dead domains in bulk input are not queried again
+and again.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Protocol, Sequence, Tuple, Union
+
+from .errors import NXDomainError
+from .results import ResolveResult
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_TTL = 86400.0
+# Used for negative answers that carry no SOA record.
+DEFAULT_NEGATIVE_TTL = 60.0
+DEFAULT_MAX_NEGATIVE_TTL = 3600.0
+
+# A cached value: addresses, or the host names of a reverse name.
+_Value = Union[ResolveResult, Tuple[str, ...]]
+
+
+def cache_key(host: str, family: Optional[int] = None) -> str:
+    """Return the cache key used for ``host`` restricted to ``family``."""
+
+    key = host.strip().rstrip(".").lower()
+    if family is not None:
+        key = f"{key}/{family}"
+    return key
+
+
+def names_key(name: str) -> str:
+    """Return the cache key for the PTR records of reverse ``name``."""
+
+    return f"{cache_key(name)}/ptr"
+
+
+def is_negative(result: ResolveResult) -> bool:
+    """Return whether ``result`` is a NoAnswer outcome (no addresses)."""
+
+    return not result.ipv4 and not result.ipv6
+
+
+class CacheBackend(Protocol):
+    """Interface shared by the in-memory and persistent caches.
+
+    ``get`` raises :class:`~domain_ip_converter.errors.NXDomainError` for
+    a host stored with ``set_nxdomain``; results without addresses are
+    kept for the negative TTL rather than the positive one. ``get_names``
+    and ``set_names`` do the same for the host names of a reverse
+    (``in-addr.arpa`` / ``ip6.arpa``) name, with ``None`` for NXDOMAIN.
+    """
+
+    def get(
+        self, host: str, family: Optional[int] = None
+    ) -> Optional[ResolveResult]:
+        ...  # pragma: no cover
+
+    def set(
+        self,
+        host: str,
+        result: ResolveResult,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        ...  # pragma: no cover
+
+    def set_nxdomain(
+        self,
+        host: str,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        ...  # pragma: no cover
+
+    def get_names(self, name: str) -> Optional[List[str]]:
+        ...  # pragma: no cover
+
+    def set_names(
+        self,
+        name: str,
+        names: Optional[Sequence[str]],
+        ttl: Optional[float] = None,
+    ) -> None:
+        ...  # pragma: no cover
+
+
+class ResolverCache:
+    """Thread-safe LRU cache of :class:`ResolveResult` keyed by host.
+
+    Host names from reverse lookups share the same LRUs under their own
+    keys (see :func:`names_key`).
+
+    Entries expire after the TTL reported by the DNS answer, clamped to
+    ``[min_ttl, max_ttl]``. Backends that cannot report a TTL (the
+    ``getaddrinfo`` fallback) use ``default_ttl``. Once ``max_entries``
+    is reached the least recently used entry is evicted.
+
+    Negative answers (NXDOMAIN, or a result without addresses) live in a
+    separate LRU of ``max_negative_entries`` (default: ``max_entries``),
+    so a flood of dead domains cannot evict good results. They expire
+    after their SOA negative TTL, or ``default_negative_ttl``, capped at
+    ``max_negative_ttl``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        default_ttl: float = DEFAULT_TTL,
+        min_ttl: float = 0.0,
+        max_ttl: float = DEFAULT_MAX_TTL,
+        clock: Callable[[], float] = time.monotonic,
+        max_negative_entries: Optional[int] = None,
+        default_negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    ) -> None:
+        if max_negative_entries is None:
+            max_negative_entries = max_entries
+        if max_entries < 1 or max_negative_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        if min_ttl < 0 or max_ttl < min_ttl:
+            raise ValueError("TTL bounds must satisfy 0 <= min <= max.")
+        if max_negative_ttl < 0:
+            raise ValueError("max_negative_ttl must not be negative.")
+
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.max_negative_entries = max_negative_entries
+        self.default_negative_ttl = default_negative_ttl
+        self.max_negative_ttl = max_negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, _Value]]" = (
+            OrderedDict()
+        )
+        # ``None`` marks NXDOMAIN; otherwise an empty (NoAnswer) result.
+        self._negative: "OrderedDict[str, Tuple[float, Optional[_Value]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries) + len(self._negative)
+
+    def _clamp_ttl(self, ttl: Optional[float]) -> float:
+        if ttl is None:
+            ttl = self.default_ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _clamp_negative_ttl(self, ttl: Optional[float]) -> float:
+        if ttl is None:
+            ttl = self.default_negative_ttl
+        return min(ttl, self.max_negative_ttl)
+
+    def get(
+        self, host: str, family: Optional[int] = None
+    ) -> Optional[ResolveResult]:
+        """Return the cached result for ``host`` or ``None`` if absent.
+
+        Raises :class:`~domain_ip_converter.errors.NXDomainError` while
+        ``host`` is cached as nonexistent.
+        """
+
+        value = self._get(cache_key(host, family), host)
+        return value if isinstance(value, ResolveResult) else None
+
+    def get_names(self, name: str) -> Optional[List[str]]:
+        """Return the cached host names for reverse ``name``, if any.
+
+        Raises :class:`~domain_ip_converter.errors.NXDomainError` while
+        ``name`` is cached as nonexistent.
+        """
+
+        value = self._get(names_key(name), name)
+        if value is None or isinstance(value, ResolveResult):
+            return None
+        return list(value)
+
+    def _get(self, key: str, host: str) -> Optional[_Value]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            negative = self._negative.get(key)
+            if negative is not None:
+                expires_at, outcome = negative
+                if expires_at > now:
+                    self._negative.move_to_end(key)
+                    self.hits += 1
+                    if outcome is None:
+                        raise NXDomainError(host)
+                    return outcome
+                del self._negative[key]
+            self.misses += 1
+            return None
+
+    def set(
+        self,
+        host: str,
+        result: ResolveResult,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        """Store ``result`` for ``host`` for ``ttl`` seconds."""
+
+        key = cache_key(host, family)
+        if is_negative(result):
+            self._set_negative(key, result, ttl)
+        else:
+            self._set_positive(key, result, ttl)
+
+    def set_names(
+        self,
+        name: str,
+        names: Optional[Sequence[str]],
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store the host ``names`` of reverse ``name`` for ``ttl`` seconds.
+
+        ``None`` records that ``name`` does not exist.
+        """
+
+        key = names_key(name)
+        if not names:
+            self._set_negative(key, None if names is None else (), ttl)
+        else:
+            self._set_positive(key, tuple(names), ttl)
+
+    def _set_positive(
+        self, key: str, value: _Value, ttl: Optional[float]
+    ) -> None:
+        ttl = self._clamp_ttl(ttl)
+        if ttl <= 0:
+            return
+
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._negative.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_nxdomain(
+        self,
+        host: str,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        """Remember that ``host`` does not exist for ``ttl`` seconds."""
+
+        self._set_negative(cache_key(host, family), None, ttl)
+
+    def _set_negative(
+        self, key: str, outcome: Optional[_Value], ttl: Optional[float]
+    ) -> None:
+        ttl = self._clamp_negative_ttl(ttl)
+        if ttl <= 0:
+            return
+
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._negative[key] = (expires_at, outcome)
+            self._negative.move_to_end(key)
+            while len(self._negative) > self.max_negative_entries:
+                self._negative.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_installed_cache: Optional[CacheBackend] = None
+
+
+def install_cache(cache: Optional[CacheBackend]) -> Optional[CacheBackend]:
+    """Install ``cache`` as the process-wide default and return the old one.
+
+    Passing ``None`` uninstalls the current cache.
+    """
+
+    global _installed_cache
+    previous = _installed_cache
+    _installed_cache = cache
+    return previous
+
+
+def get_installed_cache() -> Optional[CacheBackend]:
+    return _installed_cache
@@ -0,0 +1,184 @@
+"""Append-only journal of completed lookups for resumable bulk runs.
+
+A :class:`Checkpoint` file starts with a header line naming the lookup
+mode, followed by one JSON object per completed host::
+
+    {"checkpoint": 1, "reverse": false}
+    {"host": "example.com", "ipv4": ["192.0.2.1"], "ipv6": []}
+    {"host": "gone.example", "error": "Domain does not exist: ..."}
+
+Records are buffered and appended in batches, each with a single write
+followed by ``fsync``, so a crash loses at most the last batch. A torn
+final line left by a crash mid-write is dropped when the journal is
+reopened. Lookups that failed transiently (timeouts, SERVFAIL, no
+reachable nameserver) are not journaled, so a resumed run retries them.
+Completed hosts are loaded into a
+:class:`~domain_ip_converter.results.ResultSet`, which is both the index
+of work to skip and the source of their results in the merged output.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Type, Union
+
+from .errors import (
+    CheckpointError,
+    DomainIPConverterError,
+    NXDomainError,
+    ResolutionError,
+)
+from .results import Entry, ResolveResult, ResultSet
+
+VERSION = 1
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_INTERVAL = 5.0
+
+
+def _record(host: str, entry: Entry) -> str:
+    item: Dict[str, Any] = {"host": host}
+    if isinstance(entry, ResolveResult):
+        item["ipv4"] = entry.ipv4
+        item["ipv6"] = entry.ipv6
+    elif isinstance(entry, list):
+        item["names"] = entry
+    else:
+        item["error"] = entry
+    return json.dumps(item, separators=(",", ":"))
+
+
+def _entry(item: Dict[str, Any]) -> Entry:
+    if "error" in item:
+        return str(item["error"])
+    if "names" in item:
+        return [str(name) for name in item["names"]]
+    return ResolveResult(item["ipv4"], item["ipv6"])
+
+
+class Checkpoint:
+    """Journal at ``path`` for a forward or ``reverse`` bulk run.
+
+    An existing journal is loaded into :attr:`results` (``resumed`` counts
+    its hosts) and then appended to; it must come from a run in the same
+    mode. :meth:`record` buffers a completed host and
+    appends the buffer once ``batch_size`` records are waiting or
+    ``interval`` seconds have passed since the last write. :meth:`close`
+    (or leaving the ``with`` block) writes what is left. Not thread-safe;
+    record results from the thread that collects them.
+
+    Raises :class:`OSError` if the file cannot be opened and
+    :class:`CheckpointError` if it is not a compatible journal.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reverse: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        interval: float = DEFAULT_INTERVAL,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        self.path = path
+        self.reverse = reverse
+        self.batch_size = batch_size
+        self.interval = interval
+        self.results = ResultSet()
+        self._buffer: List[str] = []
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            self._load()
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self.resumed = len(self.results)
+        self._last_write = time.monotonic()
+
+    def _load(self) -> None:
+        header = json.dumps({"checkpoint": VERSION, "reverse": self.reverse})
+        complete = 0
+        with open(self._fd, "rb", closefd=False) as handle:
+            for number, line in enumerate(handle, 1):
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                if number == 1:
+                    if line.decode("utf-8", "replace").strip() != header:
+                        raise CheckpointError(
+                            f"{self.path} is not a checkpoint of a "
+                            f"{'reverse' if self.reverse else 'forward'} run."
+                        )
+                    continue
+                try:
+                    item = json.loads(line)
+                    self.results.add(str(item["host"]), _entry(item))
+                except (ValueError, KeyError, TypeError) as exc:
+                    raise CheckpointError(
+                        f"{self.path}:{number}: corrupt record: {exc}"
+                    ) from None
+        if complete < os.fstat(self._fd).st_size:
+            # A torn write from a crash: drop the partial record.
+            os.ftruncate(self._fd, complete)
+        if not complete:
+            self._write([header])
+
+    def record(
+        self, host: str, entry: Union[Entry, DomainIPConverterError]
+    ) -> None:
+        """Journal ``entry`` as the completed result for ``host``.
+
+        ``entry`` may be the error the lookup failed with; a transient
+        one (any :class:`ResolutionError` but NXDOMAIN) is not journaled.
+        """
+
+        if isinstance(entry, DomainIPConverterError):
+            if isinstance(entry, ResolutionError) and not isinstance(
+                entry, NXDomainError
+            ):
+                return
+            entry = str(entry)
+        self._buffer.append(_record(host, entry))
+        if (
+            len(self._buffer) >= self.batch_size
+            or time.monotonic() - self._last_write >= self.interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Append buffered records to the journal and sync it to disk."""
+
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer.clear()
+        self._last_write = time.monotonic()
+
+    def _write(self, lines: List[str]) -> None:
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        while data:
+            written = os.write(self._fd, data)
+            data = data[written:]
+        os.fsync(self._fd)
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
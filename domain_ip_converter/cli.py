@@ -3,14 +3,82 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import itertools
 import json
+import logging
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Iterable, List, Tuple, TypedDict
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
-from .errors import DomainIPConverterError, InvalidInputError
-from .resolver import resolve_host
-from .validate import normalize_domain
+from .adaptive import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MIN_CONCURRENCY,
+    AdaptiveConcurrency,
+)
+from .adaptive import logger as adaptive_logger
+from .batch import plan_inputs
+from .cache import (
+    DEFAULT_MAX_NEGATIVE_TTL,
+    CacheBackend,
+    ResolverCache,
+    install_cache,
+)
+from .errors import (
+    AddressIndexError,
+    CheckpointError,
+    DNSTimeoutError,
+    DomainIPConverterError,
+    InvalidInputError,
+    ResolutionError,
+)
+from .health import summary as health_summary
+from .hedge import DEFAULT_HEDGE_MAX_RATE, check_hedge
+from .metrics import get_metrics
+from .resolver import (
+    BACKENDS,
+    HAS_DNSPYTHON,
+    ResolverSession,
+    answered_locally,
+    install_session,
+    resolve_host,
+    resolve_host_async,
+    resolve_many_async,
+    resolve_reverse,
+    resolve_reverse_async,
+    resolve_reverse_many_async,
+)
+from .results import Entry, ResolveResult, ResultSet
+from .validate import normalize_address, normalize_domain
+
+# Modules only some runs need (asyncio, sharding, the SQLite cache, the
+# checkpoint journal and the address index) are imported where they are
+# used, so a one-off lookup from a shell script starts quickly.
+if TYPE_CHECKING:
+    from .checkpoint import Checkpoint
+    from .shard import ShardResult
 
 
 def _supports_color(no_color: bool) -> bool:
@@ -25,86 +93,733 @@ def _banner(no_color: bool) -> str:
     return "\033[92mDomain to IP Converter\033[0m"
 
 
+STREAM_BATCH_SIZE = 512
+STREAM_FLUSH_INTERVAL = 1.0
+
+# A lookup's entry, or the error it failed with.
+_Outcome = Union[Entry, DomainIPConverterError]
+# Called with each host and its outcome as a bulk lookup completes.
+_OnResult = Callable[[str, _Outcome], None]
+
+
+def _open_input(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8")
+
+
+def _iter_domains(handle: TextIO) -> Iterator[str]:
+    for line in handle:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
 def _load_domains_from_file(path: str) -> List[str]:
-    domains: List[str] = []
-    with open(path, "r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                domains.append(line)
-    return domains
+    handle = _open_input(path)
+    try:
+        return list(_iter_domains(handle))
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
 
 
 class ResultItem(TypedDict, total=False):
     ipv4: List[str]
     ipv6: List[str]
+    names: List[str]
     error: str
+    inputs: List[str]
+
 
+def _result_item(outcome: _Outcome) -> ResultItem:
+    if isinstance(outcome, ResolveResult):
+        return {"ipv4": outcome.ipv4, "ipv6": outcome.ipv6}
+    if isinstance(outcome, list):
+        return {"names": outcome}
+    return {"error": str(outcome)}
 
-ResultsMap = Dict[str, ResultItem]
 
+def _entry(outcome: _Outcome) -> Entry:
+    if isinstance(outcome, DomainIPConverterError):
+        return str(outcome)
+    return outcome
 
-def _resolve_one(raw: str, timeout: float) -> Tuple[str, ResultItem]:
+
+def _lookup(
+    host: str,
+    timeout: float,
+    queued_at: Optional[float] = None,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+) -> _Outcome:
+    started = time.perf_counter()
+    if queued_at is not None:
+        get_metrics().observe(
+            "queue_wait_seconds", started - queued_at, (("pool", "cli"),)
+        )
+    timed_out = False
+    outcome: _Outcome
     try:
-        normalized = normalize_domain(raw)
-    except InvalidInputError as exc:
-        return raw, {"error": str(exc)}
+        if reverse:
+            outcome = resolve_reverse(host, timeout=timeout)
+        else:
+            outcome = resolve_host(host, timeout=timeout)
+    except DNSTimeoutError as exc:
+        timed_out = True
+        outcome = exc
+    except DomainIPConverterError as exc:
+        outcome = exc
+    # Hosts-file, cache and literal answers would drag the baseline to
+    # microseconds; only lookups that queried upstream are samples.
+    if controller is not None and not answered_locally():
+        controller.record(time.perf_counter() - started, timed_out)
+    return outcome
+
 
+async def _lookup_async(
+    host: str,
+    timeout: float,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+) -> Tuple[str, _Outcome]:
+    started = time.perf_counter()
+    timed_out = False
+    outcome: _Outcome
     try:
-        result = resolve_host(normalized, timeout=timeout)
+        if reverse:
+            outcome = await resolve_reverse_async(host, timeout=timeout)
+        else:
+            outcome = await resolve_host_async(host, timeout=timeout)
+    except DNSTimeoutError as exc:
+        timed_out = True
+        outcome = exc
     except DomainIPConverterError as exc:
-        return normalized, {"error": str(exc)}
+        outcome = exc
+    if controller is not None and not answered_locally():
+        controller.record(time.perf_counter() - started, timed_out)
+    return host, outcome
 
-    return normalized, {"ipv4": result.ipv4, "ipv6": result.ipv6}
 
+def _lookup_many_async(
+    hosts: List[str], timeout: float, concurrency: int, reverse: bool = False
+) -> Dict[str, Entry]:
+    import asyncio
 
-def _resolve_many(
-    domains: List[str], timeout: float, workers: int
-) -> ResultsMap:
-    results: ResultsMap = {}
-    if not domains:
-        return results
+    outcomes: Sequence[_Outcome]
+    if reverse:
+        outcomes = asyncio.run(
+            resolve_reverse_many_async(
+                hosts, timeout=timeout, concurrency=concurrency
+            )
+        )
+    else:
+        outcomes = asyncio.run(
+            resolve_many_async(hosts, timeout=timeout, concurrency=concurrency)
+        )
+    return {host: _entry(outcome) for host, outcome in zip(hosts, outcomes)}
+
+
+class _Collector:
+    """Gather completed lookups, passing each to ``on_result`` as it lands.
+
+    ``on_result`` runs on the collecting thread (or event loop).
+    """
+
+    def __init__(self, on_result: Optional[_OnResult] = None) -> None:
+        self.items: Dict[str, Entry] = {}
+        self._on_result = on_result
+
+    def add(self, host: str, outcome: _Outcome) -> None:
+        self.items[host] = _entry(outcome)
+        if self._on_result is not None:
+            self._on_result(host, outcome)
+
+
+async def _lookup_bounded_async(
+    hosts: List[str],
+    timeout: float,
+    concurrency: int,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+    on_result: Optional[_OnResult] = None,
+) -> Dict[str, Entry]:
+    import asyncio
+
+    collector = _Collector(on_result)
+    pending: Set["asyncio.Future[Tuple[str, _Outcome]]"] = set()
+    for host in hosts:
+        if controller is not None:
+            concurrency = controller.limit
+        while len(pending) >= concurrency:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                collector.add(*task.result())
+        pending.add(
+            asyncio.ensure_future(
+                _lookup_async(host, timeout, controller, reverse)
+            )
+        )
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        for task in done:
+            collector.add(*task.result())
+    return collector.items
 
-    if workers <= 1 or len(domains) == 1:
-        for raw in domains:
-            key, data = _resolve_one(raw, timeout)
-            results[key] = data
-        return results
+
+def _lookup_adaptive(
+    hosts: List[str],
+    timeout: float,
+    use_async: bool,
+    controller: AdaptiveConcurrency,
+    reverse: bool = False,
+    on_result: Optional[_OnResult] = None,
+) -> Dict[str, Entry]:
+    """Resolve ``hosts`` keeping ``controller.limit`` lookups in flight."""
+
+    if use_async:
+        import asyncio
+
+        return asyncio.run(
+            _lookup_bounded_async(
+                hosts,
+                timeout,
+                controller.limit,
+                controller,
+                reverse,
+                on_result,
+            )
+        )
+
+    collector = _Collector(on_result)
+    pending: Dict["Future[_Outcome]", str] = {}
+    with ThreadPoolExecutor(max_workers=controller.maximum) as executor:
+        for host in hosts:
+            while len(pending) >= controller.limit:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collector.add(pending.pop(future), future.result())
+            future = executor.submit(
+                _lookup,
+                host,
+                timeout,
+                time.perf_counter(),
+                controller,
+                reverse,
+            )
+            pending[future] = host
+        for future in as_completed(pending):
+            collector.add(pending[future], future.result())
+    return collector.items
+
+
+def _lookup_many(
+    hosts: List[str],
+    timeout: float,
+    workers: int,
+    use_async: bool,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+    on_result: Optional[_OnResult] = None,
+) -> Dict[str, Entry]:
+    """Resolve ``hosts``, calling ``on_result`` as each one completes."""
+
+    if controller is not None:
+        return _lookup_adaptive(
+            hosts, timeout, use_async, controller, reverse, on_result
+        )
+
+    if use_async:
+        if on_result is None:
+            return _lookup_many_async(hosts, timeout, workers, reverse)
+        import asyncio
+
+        return asyncio.run(
+            _lookup_bounded_async(
+                hosts, timeout, workers, None, reverse, on_result
+            )
+        )
+
+    collector = _Collector(on_result)
+    if workers <= 1 or len(hosts) <= 1:
+        for host in hosts:
+            collector.add(host, _lookup(host, timeout, reverse=reverse))
+        return collector.items
 
     with ThreadPoolExecutor(max_workers=workers) as executor:
         future_map = {
-            executor.submit(_resolve_one, raw, timeout): raw for raw in domains
+            executor.submit(
+                _lookup, host, timeout, time.perf_counter(), None, reverse
+            ): host
+            for host in hosts
         }
         for future in as_completed(future_map):
-            key, data = future.result()
-            results[key] = data
+            collector.add(future_map[future], future.result())
+    return collector.items
+
+
+def _resolve_many(
+    domains: List[str],
+    timeout: float,
+    workers: int,
+    use_async: bool = False,
+    emit_inputs: bool = False,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+    checkpoint: Optional[Checkpoint] = None,
+) -> ResultSet:
+    """Resolve every distinct host once and key results by host.
+
+    Inputs that normalize to the same host share one lookup; invalid
+    inputs are keyed by their raw text. Entries are in order of first
+    appearance. With ``emit_inputs`` each entry lists the raw inputs that
+    mapped to it. A ``controller`` replaces the fixed ``workers`` limit
+    with an adaptive one. With ``reverse`` the inputs are IP addresses
+    and their PTR names are looked up. Hosts already in ``checkpoint``
+    are not looked up again, and each new result is journaled to it as
+    soon as it completes.
+    """
+
+    results = ResultSet()
+    if not domains:
+        return results
+
+    plan = plan_inputs(domains, reverse)
+    hosts = list(plan.hosts)
+    previous = ResultSet()
+    on_result: Optional[_OnResult] = None
+    if checkpoint is not None:
+        previous = checkpoint.results
+        hosts = [host for host in hosts if host not in previous]
+        on_result = checkpoint.record
+    entries = _lookup_many(
+        hosts, timeout, workers, use_async, controller, reverse, on_result
+    )
+    for raw, host in zip(plan.inputs, plan.normalized):
+        if isinstance(host, InvalidInputError):
+            results.add(raw, host, [raw] if emit_inputs else None)
+        elif host not in results:
+            # Popping hands each lookup over to the compact set as we go.
+            if host in entries:
+                entry = entries.pop(host)
+            else:
+                entry = previous.get(host)
+            results.add(
+                host, entry, plan.hosts[host] if emit_inputs else None
+            )
+    return results
+
+
+def _ndjson_line(
+    domain: str, item: ResultItem, raw: Optional[str], field: str = "domain"
+) -> str:
+    record: Dict[str, object] = {field: domain}
+    if raw is not None:
+        record["input"] = raw
+    record.update(item)
+    return json.dumps(record)
+
+
+class _NDJSONWriter:
+    """Write one JSON object per line, flushing in batches.
+
+    With ``emit_inputs`` each record also carries the raw ``input`` line.
+    ``field`` names the key of the looked-up host (``address`` in reverse
+    mode).
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        batch_size: int = STREAM_BATCH_SIZE,
+        interval: float = STREAM_FLUSH_INTERVAL,
+        emit_inputs: bool = False,
+        field: str = "domain",
+    ) -> None:
+        self._stream = stream
+        self._field = field
+        self._batch_size = batch_size
+        self._interval = interval
+        self._emit_inputs = emit_inputs
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+
+    def write(
+        self, domain: str, item: ResultItem, raw: Optional[str] = None
+    ) -> None:
+        if self._emit_inputs and raw is None:
+            raw = domain
+        elif not self._emit_inputs:
+            raw = None
+        self.write_line(_ndjson_line(domain, item, raw, self._field))
+
+    def write_line(self, line: str) -> None:
+        self._buffer.append(line)
+        if (
+            len(self._buffer) >= self._batch_size
+            or time.monotonic() - self._last_flush >= self._interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._stream.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._stream.flush()
+        self._last_flush = time.monotonic()
 
+
+class _Coalescer:
+    """Attach raw inputs to an in-flight lookup of the same host.
+
+    Only lookups still in flight are shared, so memory stays bounded by
+    the concurrency window; every raw input still gets its own record.
+    """
+
+    def __init__(self, writer: _NDJSONWriter, reverse: bool = False) -> None:
+        self._writer = writer
+        self._normalize = normalize_address if reverse else normalize_domain
+        self._waiting: Dict[str, List[str]] = {}
+
+    def add(self, raw: str) -> Optional[str]:
+        """Return the host to look up, or ``None`` if nothing is needed."""
+
+        try:
+            host = self._normalize(raw)
+        except InvalidInputError as exc:
+            self._writer.write(raw, {"error": str(exc)}, raw)
+            return None
+        waiting = self._waiting.get(host)
+        if waiting is not None:
+            waiting.append(raw)
+            return None
+        self._waiting[host] = [raw]
+        return host
+
+    def finish(self, host: str, outcome: _Outcome) -> None:
+        item = _result_item(outcome)
+        for raw in self._waiting.pop(host):
+            self._writer.write(host, item, raw)
+
+
+def _stream_threaded(
+    domains: Iterable[str],
+    timeout: float,
+    workers: int,
+    writer: _NDJSONWriter,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+) -> None:
+    window = workers * 2
+    coalescer = _Coalescer(writer, reverse)
+    pending: Dict["Future[_Outcome]", str] = {}
+
+    def _finish(done: Iterable["Future[_Outcome]"]) -> None:
+        for future in done:
+            coalescer.finish(pending.pop(future), future.result())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for raw in domains:
+            host = coalescer.add(raw)
+            if host is None:
+                continue
+            future = executor.submit(
+                _lookup,
+                host,
+                timeout,
+                time.perf_counter(),
+                controller,
+                reverse,
+            )
+            pending[future] = host
+            if controller is not None:
+                window = controller.limit
+            while len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _finish(done)
+        _finish(as_completed(list(pending)))
+
+
+async def _stream_async(
+    domains: Iterable[str],
+    timeout: float,
+    concurrency: int,
+    writer: _NDJSONWriter,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+) -> None:
+    import asyncio
+
+    coalescer = _Coalescer(writer, reverse)
+    pending: Set["asyncio.Future[Tuple[str, _Outcome]]"] = set()
+    for raw in domains:
+        host = coalescer.add(raw)
+        if host is None:
+            continue
+        pending.add(
+            asyncio.ensure_future(
+                _lookup_async(host, timeout, controller, reverse)
+            )
+        )
+        if controller is not None:
+            concurrency = controller.limit
+        while len(pending) >= concurrency:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                coalescer.finish(*task.result())
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        for task in done:
+            coalescer.finish(*task.result())
+
+
+def _stream_many(
+    domains: Iterable[str],
+    timeout: float,
+    workers: int,
+    use_async: bool,
+    stream: TextIO,
+    emit_inputs: bool = False,
+    controller: Optional[AdaptiveConcurrency] = None,
+    reverse: bool = False,
+) -> None:
+    """Resolve lazily and emit NDJSON as results complete.
+
+    At most ``workers`` lookups (twice that for threads, to keep the pool
+    busy) are in flight, so memory stays flat regardless of input size.
+    With a ``controller`` the limit is its current
+    :attr:`~AdaptiveConcurrency.limit` and ``workers`` only sizes the
+    thread pool. Inputs for a host whose lookup is already in flight
+    share it. With ``reverse`` the inputs are IP addresses and their PTR
+    names are looked up.
+    """
+
+    field = "address" if reverse else "domain"
+    writer = _NDJSONWriter(stream, emit_inputs=emit_inputs, field=field)
+    try:
+        if use_async:
+            import asyncio
+
+            asyncio.run(
+                _stream_async(
+                    domains, timeout, workers, writer, controller, reverse
+                )
+            )
+        else:
+            _stream_threaded(
+                domains, timeout, workers, writer, controller, reverse
+            )
+    finally:
+        writer.flush()
+
+
+def _shard_line(
+    emit_inputs: bool, result: ShardResult, field: str = "domain"
+) -> str:
+    domain = result.input if result.host is None else result.host
+    raw = result.input if emit_inputs else None
+    return _ndjson_line(domain, _result_item(result.outcome), raw, field)
+
+
+def _shard_entry(
+    result: ShardResult,
+) -> Tuple[str, Optional[str], Entry]:
+    return result.input, result.host, _entry(result.outcome)
+
+
+def _run_sharded(
+    domains: Iterable[str],
+    session: ResolverSession,
+    processes: int,
+    workers: int,
+    use_async: bool,
+    cache_size: int,
+    cache_file: Optional[str],
+    render: Callable[[ShardResult], Any],
+    ordered: bool = False,
+    max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    reverse: bool = False,
+) -> Iterator[Any]:
+    from .shard import resolve_sharded
+
+    return resolve_sharded(
+        domains,
+        processes,
+        session.timeout,
+        workers,
+        use_async,
+        ordered,
+        session,
+        cache_size,
+        cache_file,
+        max_negative_ttl=max_negative_ttl,
+        reverse=reverse,
+        render=render,
+    )
+
+
+def _collect_sharded(
+    entries: Iterable[Tuple[str, Optional[str], Entry]],
+    emit_inputs: bool,
+) -> ResultSet:
+    """Build the same set as :func:`_resolve_many` from ordered entries."""
+
+    results = ResultSet()
+    for raw, host, entry in entries:
+        if host is None or host not in results:
+            key = raw if host is None else host
+            results.add(key, entry, [raw] if emit_inputs else None)
+        elif emit_inputs:
+            results.add_input(host, raw)
     return results
 
 
-def _print_human(results: ResultsMap) -> None:
-    for domain, data in results.items():
-        print(f"\nDomain: {domain}")
-        if "error" in data:
-            print(f"  Error: {data['error']}")
+def _print_human(results: ResultSet, reverse: bool = False) -> None:
+    heading = "Address" if reverse else "Domain"
+    for domain, entry in results.items():
+        print(f"\n{heading}: {domain}")
+        if isinstance(entry, str):
+            print(f"  Error: {entry}")
+        elif isinstance(entry, list):
+            print(f"  Names: {', '.join(entry) or 'none'}")
         else:
-            ipv4 = ", ".join(data["ipv4"]) or "none"
-            ipv6 = ", ".join(data["ipv6"]) or "none"
+            ipv4 = ", ".join(entry.ipv4) or "none"
+            ipv6 = ", ".join(entry.ipv6) or "none"
             print(f"  IPv4: {ipv4}")
             print(f"  IPv6: {ipv6}")
+        inputs = results.inputs(domain)
+        if inputs is not None:
+            print(f"  Inputs: {', '.join(inputs)}")
+
+
+def _write_json(results: ResultSet, stream: TextIO) -> None:
+    """Write ``results`` exactly as ``json.dumps(..., indent=2)`` would.
+
+    Entries are encoded one at a time, so the document is never built in
+    memory as a whole.
+    """
+
+    if not len(results):
+        stream.write("{}\n")
+        return
+    separator = "{\n"
+    for domain, entry in results.items():
+        item = _result_item(entry)
+        inputs = results.inputs(domain)
+        if inputs is not None:
+            item["inputs"] = inputs
+        body = json.dumps(item, indent=2).replace("\n", "\n  ")
+        stream.write(f"{separator}  {json.dumps(domain)}: {body}")
+        separator = ",\n"
+    stream.write("\n}\n")
+
+
+def _query_index(path: str, networks: List[str], as_json: bool) -> int:
+    """Print the domains in the index at ``path`` behind each network."""
+
+    from .index import AddressIndex
+
+    try:
+        index = AddressIndex(path)
+    except (OSError, AddressIndexError) as exc:
+        print(f"Index error: {exc}", file=sys.stderr)
+        return 2
+    matches: Dict[str, List[Dict[str, Any]]] = {}
+    with index:
+        for network in networks:
+            try:
+                pairs = index.search(network)
+            except InvalidInputError as exc:
+                print(f"error: {exc}", file=sys.stderr)
+                return 2
+            matches[network] = [
+                {"address": address, "domains": [name for _, name in group]}
+                for address, group in itertools.groupby(
+                    pairs, key=lambda pair: pair[0]
+                )
+            ]
+
+    if as_json:
+        print(json.dumps(matches, indent=2))
+        return 0
+    for network, found in matches.items():
+        print(f"\nNetwork: {network}")
+        if not found:
+            print("  No matches")
+        for match in found:
+            print(f"  {match['address']}: {', '.join(match['domains'])}")
+    return 0
+
+
+def _report_metrics(
+    stats: bool, metrics_file: Optional[str], session: ResolverSession
+) -> int:
+    metrics = get_metrics()
+    if stats:
+        print(metrics.summary(), file=sys.stderr)
+        nameservers = session.nameserver_stats()
+        if nameservers:
+            print(health_summary(nameservers), file=sys.stderr)
+    if metrics_file:
+        try:
+            metrics.write_prometheus(metrics_file)
+        except OSError as exc:
+            print(f"Metrics error: {exc}", file=sys.stderr)
+            return 2
+    return 0
+
+
+def _concurrency(value: str) -> Union[int, str]:
+    if value == "auto":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected an integer or 'auto', got '{value}'"
+        ) from None
+
+
+def _log_decisions() -> logging.Handler:
+    """Print adaptive concurrency changes to stderr."""
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    adaptive_logger.addHandler(handler)
+    adaptive_logger.setLevel(logging.INFO)
+    return handler
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
-        description="Resolve domain names to IPv4 and IPv6 addresses",
+        description=(
+            "Resolve domain names to IPv4 and IPv6 addresses, or IP "
+            "addresses back to host names with --reverse"
+        ),
     )
     parser.add_argument(
         "domains",
         nargs="*",
-        help="Domains or URLs to resolve",
+        help="Domains or URLs to resolve (IP addresses with --reverse)",
+    )
+    parser.add_argument(
+        "-f", "--file", help="File containing domains ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="Look up host names (PTR records) for IP addresses",
     )
-    parser.add_argument("-f", "--file", help="File containing domains")
     parser.add_argument("--json", action="store_true", help="JSON output")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read input lazily and print one JSON line per result",
+    )
     parser.add_argument(
         "-q",
         "--quiet",
@@ -116,9 +831,184 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--concurrency",
-        type=int,
+        type=_concurrency,
         default=4,
-        help="Number of thread workers for bulk resolution",
+        help=(
+            "Number of thread workers (or in-flight async lookups); 'auto' "
+            "adapts it to observed latency and timeouts"
+        ),
+    )
+    parser.add_argument(
+        "--min-concurrency",
+        type=int,
+        default=DEFAULT_MIN_CONCURRENCY,
+        help="Lower bound for --concurrency auto",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Upper bound for --concurrency auto",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Resolve on an asyncio event loop instead of worker threads",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Shard bulk input across N worker processes",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="With --processes, print --stream results in input order",
+    )
+    parser.add_argument(
+        "--nameserver",
+        dest="nameservers",
+        action="append",
+        metavar="IP",
+        help=(
+            "Query this nameserver instead of the system ones (repeatable; "
+            "the fastest healthy one is preferred)"
+        ),
+    )
+    parser.add_argument(
+        "--hosts",
+        dest="hosts_files",
+        action="append",
+        metavar="FILE",
+        help=(
+            "Answer names pinned in this hosts-style file without a query "
+            "('*.suffix' matches subdomains; repeatable; reloaded when it "
+            "changes)"
+        ),
+    )
+    parser.add_argument(
+        "--qps",
+        type=float,
+        metavar="N",
+        help=(
+            "Send at most N DNS queries per second, evenly paced (split "
+            "across --processes)"
+        ),
+    )
+    parser.add_argument(
+        "--nameserver-qps",
+        type=float,
+        metavar="N",
+        help=(
+            "Send at most N queries per second to each nameserver "
+            "(backend udp, or dnspython)"
+        ),
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="Lookup backend; 'udp' is the built-in pipelined engine",
+    )
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "With --backend udp, also ask the next nameserver when the "
+            "first has not answered after SECONDS"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        metavar="P",
+        help=(
+            "Hedge after the P-th percentile of recent query latency "
+            "(--hedge-delay becomes the floor)"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-max-rate",
+        type=float,
+        default=DEFAULT_HEDGE_MAX_RATE,
+        metavar="FRACTION",
+        help="Cap hedged queries at this fraction of all queries",
+    )
+    parser.add_argument(
+        "--family",
+        type=int,
+        choices=(4, 6),
+        help="Only query IPv4 (A) or IPv6 (AAAA) records",
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--cache-size",
+        type=int,
+        default=0,
+        help="Cache up to N results in memory for this run (0 disables)",
+    )
+    cache_group.add_argument(
+        "--cache-file",
+        metavar="PATH",
+        help="Reuse unexpired results from an on-disk cache across runs",
+    )
+    parser.add_argument(
+        "--max-negative-ttl",
+        type=float,
+        default=DEFAULT_MAX_NEGATIVE_TTL,
+        metavar="SECONDS",
+        help=(
+            "Cache NXDOMAIN and empty answers for at most this long "
+            f"(default: {DEFAULT_MAX_NEGATIVE_TTL:g})"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help=(
+            "Journal completed lookups to PATH and, when rerun with the "
+            "same PATH, skip the hosts already done"
+        ),
+    )
+    parser.add_argument(
+        "--index",
+        metavar="PATH",
+        help=(
+            "Write an IP-to-domain index of the results to PATH, or read "
+            "it with --query-index"
+        ),
+    )
+    parser.add_argument(
+        "--query-index",
+        dest="index_queries",
+        action="append",
+        metavar="NETWORK",
+        help=(
+            "Print the domains in the --index file that resolved to an "
+            "address in NETWORK (an IP or CIDR block; repeatable) instead "
+            "of resolving anything"
+        ),
+    )
+    parser.add_argument(
+        "--emit-inputs",
+        action="store_true",
+        help="Report which raw inputs mapped to each normalized host",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help=(
+            "Print query counters, latency percentiles and nameserver "
+            "health to stderr"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Write metrics in Prometheus text format to PATH when done",
     )
     parser.add_argument(
         "--no-color", action="store_true", help="Disable colored output"
@@ -134,37 +1024,284 @@ def main(argv: Iterable[str] = sys.argv[1:]) -> int:
         print("error: --timeout must be greater than 0.", file=sys.stderr)
         return 2
 
-    if args.concurrency < 1:
+    if args.index_queries:
+        if not args.index:
+            print("error: --query-index requires --index.", file=sys.stderr)
+            return 2
+        return _query_index(args.index, args.index_queries, args.json)
+
+    controller: Optional[AdaptiveConcurrency] = None
+    workers = args.concurrency
+    if args.concurrency == "auto":
+        if args.processes > 1:
+            print(
+                "error: --concurrency auto does not support --processes.",
+                file=sys.stderr,
+            )
+            return 2
+        if not 1 <= args.min_concurrency <= args.max_concurrency:
+            print(
+                "error: --min-concurrency and --max-concurrency must "
+                "satisfy 1 <= min <= max.",
+                file=sys.stderr,
+            )
+            return 2
+        controller = AdaptiveConcurrency(
+            args.min_concurrency, args.max_concurrency
+        )
+        workers = args.max_concurrency
+    elif args.concurrency < 1:
         print("error: --concurrency must be at least 1.", file=sys.stderr)
         return 2
 
+    if args.processes < 1:
+        print("error: --processes must be at least 1.", file=sys.stderr)
+        return 2
+
+    if args.ordered and args.processes < 2:
+        print(
+            "error: --ordered requires --processes greater than 1.",
+            file=sys.stderr,
+        )
+        return 2
+
+    if args.checkpoint and (args.stream or args.processes > 1):
+        print(
+            "error: --checkpoint does not support --stream or --processes.",
+            file=sys.stderr,
+        )
+        return 2
+
+    if args.index and (args.stream or args.reverse):
+        print(
+            "error: --index does not support --stream or --reverse.",
+            file=sys.stderr,
+        )
+        return 2
+
+    if args.cache_size < 0:
+        print("error: --cache-size must not be negative.", file=sys.stderr)
+        return 2
+    if args.max_negative_ttl < 0:
+        print(
+            "error: --max-negative-ttl must not be negative.",
+            file=sys.stderr,
+        )
+        return 2
+
+    for flag, rate in (
+        ("--qps", args.qps),
+        ("--nameserver-qps", args.nameserver_qps),
+    ):
+        if rate is not None and rate <= 0:
+            print(f"error: {flag} must be greater than 0.", file=sys.stderr)
+            return 2
+
+    hedging = (
+        args.hedge_delay is not None or args.hedge_percentile is not None
+    )
+    if hedging and args.backend != "udp":
+        print(
+            "error: hedged queries require --backend udp.", file=sys.stderr
+        )
+        return 2
+    try:
+        check_hedge(
+            args.hedge_delay, args.hedge_percentile, args.hedge_max_rate
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    # getaddrinfo() always asks the system resolver.
+    if args.nameservers and args.backend == "socket":
+        print(
+            "error: --nameserver is not supported by --backend socket.",
+            file=sys.stderr,
+        )
+        return 2
+    if args.nameservers and not HAS_DNSPYTHON and args.backend != "udp":
+        print(
+            "error: --nameserver requires dnspython or --backend udp.",
+            file=sys.stderr,
+        )
+        return 2
+
+    input_handle: Optional[TextIO] = None
     raw_domains: List[str] = []
-    if args.file:
-        try:
+    try:
+        if args.stream and args.file:
+            input_handle = _open_input(args.file)
+        elif args.file:
             raw_domains.extend(_load_domains_from_file(args.file))
-        except OSError as exc:
-            print(f"File error: {exc}", file=sys.stderr)
-            return 2
+    except OSError as exc:
+        print(f"File error: {exc}", file=sys.stderr)
+        return 2
 
     raw_domains.extend(args.domains)
 
-    if not raw_domains:
-        print("error: No domains or URLs provided.", file=sys.stderr)
+    if not raw_domains and input_handle is None:
+        what = "IP addresses" if args.reverse else "domains or URLs"
+        print(f"error: No {what} provided.", file=sys.stderr)
         parser.print_usage(sys.stderr)
         return 2
 
-    if not args.quiet and _supports_color(args.no_color):
+    try:
+        session = ResolverSession(
+            args.nameservers,
+            timeout=args.timeout,
+            family=args.family,
+            backend=args.backend,
+            hedge_delay=args.hedge_delay,
+            hedge_percentile=args.hedge_percentile,
+            hedge_max_rate=args.hedge_max_rate,
+            hosts_files=args.hosts_files,
+            qps=args.qps,
+            nameserver_qps=args.nameserver_qps,
+        )
+    except OSError as exc:
+        print(f"Hosts error: {exc}", file=sys.stderr)
+        return 2
+
+    cache: Optional[CacheBackend] = None
+    persistent: Optional[PersistentCache] = None
+    if args.cache_file:
+        import sqlite3
+
+        from .store import PersistentCache
+
+        try:
+            cache = persistent = PersistentCache(
+                args.cache_file, max_negative_ttl=args.max_negative_ttl
+            )
+        except (OSError, sqlite3.Error) as exc:
+            print(f"Cache error: {exc}", file=sys.stderr)
+            return 2
+    elif args.cache_size:
+        cache = ResolverCache(
+            args.cache_size, max_negative_ttl=args.max_negative_ttl
+        )
+
+    checkpoint: Optional[Checkpoint] = None
+    if args.checkpoint:
+        from .checkpoint import Checkpoint
+
+        try:
+            checkpoint = Checkpoint(args.checkpoint, reverse=args.reverse)
+        except (OSError, CheckpointError) as exc:
+            print(f"Checkpoint error: {exc}", file=sys.stderr)
+            if persistent is not None:
+                persistent.close()
+            return 2
+        if checkpoint.resumed:
+            print(
+                f"Resuming: {checkpoint.resumed} hosts already done.",
+                file=sys.stderr,
+            )
+
+    if (
+        not args.quiet
+        and not args.stream
+        and _supports_color(args.no_color)
+    ):
         print(_banner(args.no_color))
 
-    results = _resolve_many(
-        raw_domains,
-        timeout=args.timeout,
-        workers=args.concurrency,
-    )
+    if args.stats or args.metrics_file:
+        get_metrics().reset()
+    previous_session = install_session(session)
+    previous_cache = install_cache(cache) if cache is not None else None
+    log_handler = _log_decisions() if controller is not None else None
+    results = ResultSet()
+    field = "address" if args.reverse else "domain"
+    domains: Iterable[str] = raw_domains
+    if args.stream:
+        domains = itertools.chain(
+            _iter_domains(input_handle) if input_handle else (),
+            raw_domains,
+        )
+    try:
+        if args.processes > 1:
+            from .shard import DEFAULT_SHARD_CACHE_SIZE
 
-    if args.json:
-        print(json.dumps(results, indent=2))
-    else:
-        _print_human(results)
+            render: Callable[[ShardResult], Any] = _shard_entry
+            if args.stream:
+                render = functools.partial(
+                    _shard_line, args.emit_inputs, field=field
+                )
+            produced = _run_sharded(
+                domains,
+                session,
+                processes=args.processes,
+                workers=workers,
+                use_async=args.use_async,
+                cache_size=args.cache_size or DEFAULT_SHARD_CACHE_SIZE,
+                cache_file=args.cache_file,
+                render=render,
+                ordered=args.ordered or not args.stream,
+                max_negative_ttl=args.max_negative_ttl,
+                reverse=args.reverse,
+            )
+            if args.stream:
+                writer = _NDJSONWriter(sys.stdout, field=field)
+                try:
+                    for line in produced:
+                        writer.write_line(line)
+                finally:
+                    writer.flush()
+            else:
+                results = _collect_sharded(produced, args.emit_inputs)
+        elif args.stream:
+            _stream_many(
+                domains,
+                timeout=args.timeout,
+                workers=workers,
+                use_async=args.use_async,
+                stream=sys.stdout,
+                emit_inputs=args.emit_inputs,
+                controller=controller,
+                reverse=args.reverse,
+            )
+        else:
+            results = _resolve_many(
+                raw_domains,
+                timeout=args.timeout,
+                workers=workers,
+                use_async=args.use_async,
+                emit_inputs=args.emit_inputs,
+                controller=controller,
+                reverse=args.reverse,
+                checkpoint=checkpoint,
+            )
+    except ResolutionError as exc:
+        print(f"Worker error: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        if input_handle is not None and input_handle is not sys.stdin:
+            input_handle.close()
+        install_session(previous_session)
+        session.close()
+        if cache is not None:
+            install_cache(previous_cache)
+        if persistent is not None:
+            persistent.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if log_handler is not None:
+            adaptive_logger.removeHandler(log_handler)
+            adaptive_logger.setLevel(logging.NOTSET)
 
-    return 0
+    if args.json and not args.stream:
+        _write_json(results, sys.stdout)
+    elif not args.stream:
+        _print_human(results, args.reverse)
+
+    if args.index:
+        from .index import build_index
+
+        try:
+            build_index(args.index, results.items())
+        except OSError as exc:
+            print(f"Index error: {exc}", file=sys.stderr)
+            return 2
+
+    return _report_metrics(args.stats, args.metrics_file, session)
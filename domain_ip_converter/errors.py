@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Any, Optional, Tuple
+
 
 class DomainIPConverterError(Exception):
     """Base exception for all domain-ip-converter errors."""
@@ -17,3 +19,27 @@ class ResolutionError(DomainIPConverterError):
 
 class DNSTimeoutError(ResolutionError):
     """Raised when DNS resolution times out."""
+
+
+class NXDomainError(ResolutionError):
+    """Raised when the queried domain does not exist.
+
+    ``ttl`` is the negative-caching TTL from the zone's SOA record, when
+    the response carried one.
+    """
+
+    def __init__(self, host: str, ttl: Optional[float] = None) -> None:
+        super().__init__(f"Domain does not exist: '{host}'.")
+        self.host = host
+        self.ttl = ttl
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.host, self.ttl)
+
+
+class AddressIndexError(DomainIPConverterError):
+    """Raised when an address index file is truncated or not an index."""
+
+
+class CheckpointError(DomainIPConverterError):
+    """Raised when a checkpoint journal is corrupt or from another run."""
@@ -0,0 +1,241 @@
+"""Per-nameserver health: latency, failure rate and ejection.
+
+:class:`NameserverHealth` keeps an exponentially weighted moving average
+(EWMA) of each nameserver's response latency and failure rate, and
+:meth:`~NameserverHealth.order` ranks the servers for the next query:
+fastest healthy server first, ejected ones last. A server that fails
+``eject_after`` times in a row is ejected for a cooldown; once that
+expires, the next query is sent to it first as a probe, which either
+restores it or ejects it again for twice as long. Ejections are logged on
+the ``domain_ip_converter.health`` logger and counted in the
+``nameserver_ejections_total`` metric.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from .metrics import get_metrics
+
+DEFAULT_ALPHA = 0.2
+DEFAULT_EJECT_AFTER = 3
+DEFAULT_COOLDOWN = 10.0
+MAX_COOLDOWN = 300.0
+# Failure rates are capped here when they inflate a server's latency
+# score, so a flaky server still ranks by how fast it answers.
+_MAX_FAILURE_RATE = 0.95
+
+HEALTHY = "healthy"
+EJECTED = "ejected"
+PROBING = "probing"
+
+logger = logging.getLogger(__name__)
+
+
+class NameserverStats(NamedTuple):
+    server: str
+    state: str
+    latency: Optional[float]
+    failure_rate: float
+    queries: int
+    failures: int
+    consecutive_failures: int
+    ejections: int
+
+
+class _Server:
+    __slots__ = (
+        "name",
+        "position",
+        "latency",
+        "failure_rate",
+        "queries",
+        "failures",
+        "consecutive",
+        "ejections",
+        "state",
+        "cooldown",
+        "until",
+    )
+
+    def __init__(self, name: str, position: int, cooldown: float) -> None:
+        self.name = name
+        self.position = position
+        self.latency: Optional[float] = None
+        self.failure_rate = 0.0
+        self.queries = 0
+        self.failures = 0
+        self.consecutive = 0
+        self.ejections = 0
+        self.state = HEALTHY
+        self.cooldown = cooldown
+        self.until = 0.0
+
+    def score(self) -> float:
+        # Untried servers rank first so each gets measured; servers that
+        # have only ever failed rank last.
+        if self.latency is None:
+            return float("inf") if self.failures else 0.0
+        return self.latency / (1 - min(self.failure_rate, _MAX_FAILURE_RATE))
+
+
+class NameserverHealth:
+    """Health tracker and ranking for a fixed list of nameservers.
+
+    Callers report every attempt against a server with
+    :meth:`record_success` (with its latency) or :meth:`record_failure`
+    (timeouts, SERVFAIL, REFUSED). ``alpha`` weights the newest sample in
+    both averages. Ties keep the configured order. When every server is
+    ejected they are still returned, soonest-due first, so lookups always
+    have somewhere to go. Safe to share across threads.
+    """
+
+    def __init__(
+        self,
+        nameservers: Sequence[str],
+        alpha: float = DEFAULT_ALPHA,
+        eject_after: int = DEFAULT_EJECT_AFTER,
+        cooldown: float = DEFAULT_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not nameservers:
+            raise ValueError("At least one nameserver is required.")
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be between 0 and 1.")
+        if eject_after < 1:
+            raise ValueError("eject_after must be at least 1.")
+        if cooldown <= 0:
+            raise ValueError("cooldown must be greater than 0.")
+
+        self.servers = list(dict.fromkeys(nameservers))
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.cooldown = cooldown
+        self._clock = clock
+        self._state: Dict[str, _Server] = {
+            name: _Server(name, position, cooldown)
+            for position, name in enumerate(self.servers)
+        }
+        self._lock = threading.Lock()
+
+    def order(self) -> List[str]:
+        """Return the servers in the order the next query should try them.
+
+        At most one ejected server whose cooldown has expired is put first
+        as a probe; it stays in the probing state until its result is
+        recorded or another cooldown passes.
+        """
+
+        with self._lock:
+            now = self._clock()
+            healthy = []
+            ejected = []
+            probe: Optional[_Server] = None
+            for server in self._state.values():
+                if server.state == HEALTHY:
+                    healthy.append(server)
+                elif probe is None and server.until <= now:
+                    probe = server
+                else:
+                    ejected.append(server)
+            healthy.sort(key=lambda server: (server.score(), server.position))
+            ejected.sort(key=lambda server: (server.until, server.position))
+            if probe is not None:
+                if probe.state == EJECTED:
+                    logger.info("probing nameserver %s", probe.name)
+                probe.state = PROBING
+                probe.until = now + probe.cooldown
+                healthy.insert(0, probe)
+            return [server.name for server in healthy + ejected]
+
+    def record_success(self, server: str, seconds: float) -> None:
+        """Report an answer from ``server`` after ``seconds``."""
+
+        with self._lock:
+            state = self._state.get(server)
+            if state is None:
+                return
+            state.queries += 1
+            state.consecutive = 0
+            state.failure_rate *= 1 - self.alpha
+            if state.latency is None:
+                state.latency = seconds
+            else:
+                state.latency += self.alpha * (seconds - state.latency)
+            if state.state != HEALTHY:
+                logger.info("nameserver %s is healthy again", server)
+                state.state = HEALTHY
+                state.cooldown = self.cooldown
+
+    def record_failure(self, server: str) -> None:
+        """Report a timeout or server failure from ``server``."""
+
+        with self._lock:
+            state = self._state.get(server)
+            if state is None:
+                return
+            state.queries += 1
+            state.failures += 1
+            state.consecutive += 1
+            state.failure_rate += self.alpha * (1 - state.failure_rate)
+            if state.state == PROBING:
+                state.cooldown = min(state.cooldown * 2, MAX_COOLDOWN)
+                self._eject(state, "probe failed")
+            elif (
+                state.state == HEALTHY
+                and state.consecutive >= self.eject_after
+            ):
+                self._eject(
+                    state, f"{state.consecutive} consecutive failures"
+                )
+
+    def _eject(self, state: _Server, reason: str) -> None:
+        state.state = EJECTED
+        state.until = self._clock() + state.cooldown
+        state.ejections += 1
+        get_metrics().incr(
+            "nameserver_ejections_total", labels=(("server", state.name),)
+        )
+        logger.info(
+            "ejecting nameserver %s for %gs: %s",
+            state.name,
+            state.cooldown,
+            reason,
+        )
+
+    def stats(self) -> List[NameserverStats]:
+        """Return a snapshot per server, in configured order."""
+
+        with self._lock:
+            return [
+                NameserverStats(
+                    server=state.name,
+                    state=state.state,
+                    latency=state.latency,
+                    failure_rate=state.failure_rate,
+                    queries=state.queries,
+                    failures=state.failures,
+                    consecutive_failures=state.consecutive,
+                    ejections=state.ejections,
+                )
+                for state in self._state.values()
+            ]
+
+
+def summary(stats: Sequence[NameserverStats]) -> str:
+    """Return a short human-readable report of ``stats`` for ``--stats``."""
+
+    lines = ["Nameserver health:"]
+    for entry in stats:
+        latency = "-"
+        if entry.latency is not None:
+            latency = f"{entry.latency * 1000:.1f}ms"
+        lines.append(
+            f"  {entry.server}: {entry.state} latency={latency} "
+            f"failures={entry.failure_rate:.1%} queries={entry.queries} "
+            f"ejections={entry.ejections}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,24 @@
+"""Hedged-query settings shared by the CLI, sessions and the UDP engine.
+
+Kept apart from :mod:`~domain_ip_converter.udp` so that validating the
+options does not load the UDP stack unless that backend is used.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+DEFAULT_HEDGE_MAX_RATE = 0.05
+
+
+def check_hedge(
+    delay: Optional[float], percentile: Optional[float], max_rate: float
+) -> None:
+    """Raise ``ValueError`` for invalid hedging settings."""
+
+    if delay is not None and delay <= 0:
+        raise ValueError("hedge_delay must be greater than 0.")
+    if percentile is not None and not 0 < percentile < 100:
+        raise ValueError("hedge_percentile must be between 0 and 100.")
+    if not 0 <= max_rate <= 1:
+        raise ValueError("hedge_max_rate must be between 0 and 1.")
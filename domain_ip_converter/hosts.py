@@ -0,0 +1,267 @@
+"""Static host overrides from hosts-style files.
+
+:class:`HostsIndex` parses one or more files in ``/etc/hosts`` format
+(``address name [alias ...]``, ``#`` comments) into a dict keyed by
+normalized name, so a pinned host is answered with one dict lookup and
+no network I/O. A name written as ``*.corp.example`` matches every name
+below ``corp.example`` through a trie of reversed labels; exact names win
+over wildcards and longer suffixes over shorter ones. The reverse map
+(address to names) serves :func:`~domain_ip_converter.resolve_reverse`.
+
+Files are re-checked at most every ``check_interval`` seconds and only
+those whose modification time or size changed are parsed again.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .errors import InvalidInputError
+from .results import ResolveResult
+from .validate import normalize_domain
+
+DEFAULT_CHECK_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+# One parsed name: its packed IPv4 and IPv6 addresses in file order.
+_Addresses = Tuple[List[bytes], List[bytes]]
+
+
+class _Parsed(NamedTuple):
+    names: Dict[str, _Addresses]
+    wildcards: Dict[str, _Addresses]
+    reverse: Dict[bytes, List[str]]
+
+
+class _Node:
+    __slots__ = ("children", "answers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+        self.answers: Optional[ResolveResult] = None
+
+
+class _Index(NamedTuple):
+    names: Dict[str, ResolveResult]
+    wildcards: _Node
+    reverse: Dict[bytes, List[str]]
+
+
+class _File:
+    __slots__ = ("path", "signature", "parsed")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.signature: Optional[Tuple[int, int]] = None
+        self.parsed = _Parsed({}, {}, {})
+
+
+def _pack(address: str) -> bytes:
+    # inet_pton rather than ipaddress: several times faster on big files.
+    family = socket.AF_INET6 if ":" in address else socket.AF_INET
+    return socket.inet_pton(family, address.partition("%")[0])
+
+
+def _add(table: Dict[str, _Addresses], name: str, address: bytes) -> None:
+    ipv4, ipv6 = table.setdefault(name, ([], []))
+    addresses = ipv4 if len(address) == 4 else ipv6
+    if address not in addresses:
+        addresses.append(address)
+
+
+def _parse(lines: Iterable[str], source: str) -> _Parsed:
+    # Invalid entries are logged and skipped, as resolvers do.
+    parsed = _Parsed({}, {}, {})
+    for number, line in enumerate(lines, 1):
+        fields = line.partition("#")[0].split()
+        if not fields:
+            continue
+        raw, names = fields[0], fields[1:]
+        try:
+            address = _pack(raw)
+        except OSError:
+            logger.warning("%s:%d: invalid address %r", source, number, raw)
+            continue
+        for name in names:
+            wildcard = name.startswith("*.")
+            try:
+                host = normalize_domain(name[2:] if wildcard else name)
+            except InvalidInputError:
+                logger.warning("%s:%d: invalid name %r", source, number, name)
+                continue
+            _add(parsed.wildcards if wildcard else parsed.names, host, address)
+            if not wildcard:
+                known = parsed.reverse.setdefault(address, [])
+                if host not in known:
+                    known.append(host)
+    return parsed
+
+
+def _answers(addresses: _Addresses) -> ResolveResult:
+    return ResolveResult.from_packed(
+        b"".join(addresses[0]), b"".join(addresses[1])
+    )
+
+
+def _merge(files: Sequence[_File]) -> _Index:
+    if len(files) == 1:
+        names, wildcards, reverse = files[0].parsed
+    else:
+        # Later lines for the same name add addresses, as in /etc/hosts.
+        names, wildcards, reverse = {}, {}, {}
+        for file in files:
+            for target, table in (
+                (names, file.parsed.names),
+                (wildcards, file.parsed.wildcards),
+            ):
+                for name, (ipv4, ipv6) in table.items():
+                    for address in ipv4 + ipv6:
+                        _add(target, name, address)
+            for address, hosts in file.parsed.reverse.items():
+                known = reverse.setdefault(address, [])
+                known.extend(host for host in hosts if host not in known)
+
+    root = _Node()
+    for suffix, addresses in wildcards.items():
+        node = root
+        for label in reversed(suffix.split(".")):
+            node = node.children.setdefault(label, _Node())
+        node.answers = _answers(addresses)
+    return _Index(
+        {name: _answers(addresses) for name, addresses in names.items()},
+        root,
+        {address: sorted(hosts) for address, hosts in reverse.items()},
+    )
+
+
+class HostsIndex:
+    """Lookup table built from hosts-style ``paths``, later files adding.
+
+    Raises :class:`OSError` if a file cannot be read on construction; a
+    file that becomes unreadable later keeps its last contents (and a
+    warning is logged). ``check_interval`` bounds how often the files are
+    stat'ed; ``0`` checks on every lookup. Safe to share across threads:
+    a reload swaps in a new index while readers keep the old one.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        check_interval: float = DEFAULT_CHECK_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not paths:
+            raise ValueError("At least one hosts file is required.")
+        if check_interval < 0:
+            raise ValueError("check_interval must not be negative.")
+
+        self.paths = list(paths)
+        self.check_interval = check_interval
+        self._clock = clock
+        self._files = [_File(path) for path in self.paths]
+        self._lock = threading.Lock()
+        self.reloads = 0
+        for file in self._files:
+            self._load(file, os.stat(file.path))
+        self._index = _merge(self._files)
+        self._next_check = clock() + check_interval
+
+    def lookup(
+        self, host: str, family: Optional[int] = None
+    ) -> Optional[ResolveResult]:
+        """Return the pinned addresses of ``host``, or ``None``.
+
+        ``family`` (4 or 6) keeps only that family's addresses; a pinned
+        host without any is still answered, with an empty result.
+        """
+
+        index = self._current()
+        key = host.rstrip(".").lower()
+        result = index.names.get(key)
+        if result is None:
+            result = self._wildcard(index.wildcards, key)
+            if result is None:
+                return None
+        if family == 4:
+            return ResolveResult.from_packed(result.packed_ipv4)
+        if family == 6:
+            return ResolveResult.from_packed(ipv6=result.packed_ipv6)
+        return result
+
+    def names(self, address: str) -> Optional[List[str]]:
+        """Return the sorted names pinned to ``address``, or ``None``."""
+
+        try:
+            names = self._current().reverse.get(_pack(address))
+        except OSError:
+            return None
+        return None if names is None else list(names)
+
+    def __len__(self) -> int:
+        return len(self._current().names)
+
+    @staticmethod
+    def _wildcard(root: _Node, key: str) -> Optional[ResolveResult]:
+        # A wildcard node matches names with at least one more label.
+        found = None
+        node = root
+        for label in reversed(key.split(".")):
+            if node.answers is not None:
+                found = node.answers
+            child = node.children.get(label)
+            if child is None:
+                break
+            node = child
+        return found
+
+    def _current(self) -> _Index:
+        if self._clock() >= self._next_check:
+            self.refresh()
+        return self._index
+
+    def refresh(self) -> bool:
+        """Re-read the files that changed; return whether any did.
+
+        Does nothing if another thread is already refreshing.
+        """
+
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            changed = False
+            for file in self._files:
+                try:
+                    stat = os.stat(file.path)
+                    if (stat.st_mtime_ns, stat.st_size) != file.signature:
+                        self._load(file, stat)
+                        changed = True
+                except OSError as exc:
+                    logger.warning("keeping %s as loaded: %s", file.path, exc)
+            if changed:
+                self._index = _merge(self._files)
+                self.reloads += 1
+            self._next_check = self._clock() + self.check_interval
+            return changed
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _load(file: _File, stat: os.stat_result) -> None:
+        with open(file.path, encoding="utf-8", errors="replace") as handle:
+            file.parsed = _parse(handle, file.path)
+        file.signature = (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,330 @@
+"""Memory-mapped index from IP addresses back to the domains behind them.
+
+:class:`IndexBuilder` turns forward results into an on-disk file of
+fixed-size records, one per (address, domain) pair, sorted by address:
+
+    header    b"DIPINDX1", record count, name count   (little-endian)
+    records   17-byte key + 4-byte name id, sorted
+    offsets   name count + 1 end offsets into the name blob (u64)
+    names     the domains, UTF-8, back to back
+
+A key is a family byte (4 or 6) followed by the packed address, IPv4
+padded to 16 bytes, so every network is one contiguous run of records.
+:class:`AddressIndex` maps the file and binary-searches it in place:
+opening costs a header read whatever the size, and a query touches only
+the pages it needs instead of loading pairs into Python objects. The
+builder sorts bounded chunks in memory and spills them to temporary
+files, merging them at the end, so its memory does not grow with the
+number of pairs either.
+"""
+
+from __future__ import annotations
+
+import heapq
+import ipaddress
+import mmap
+import os
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+from array import array
+from types import TracebackType
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Type
+
+from .errors import AddressIndexError, InvalidInputError
+from .results import Entry, ResolveResult
+from .validate import normalize_address
+
+MAGIC = b"DIPINDX1"
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+_HEADER = struct.Struct("<8sQQ")
+_ID = struct.Struct(">I")  # big-endian, so ties sort by insertion order
+_OFFSETS = struct.Struct("<QQ")
+_KEY_SIZE = 17
+_RECORD_SIZE = _KEY_SIZE + _ID.size
+_IPV4_PAD = bytes(12)
+_READ_RECORDS = 4096
+
+
+def _key(packed: bytes) -> bytes:
+    if len(packed) == 4:
+        return b"\x04" + packed + _IPV4_PAD
+    return b"\x06" + packed
+
+
+def _address(key: bytes) -> str:
+    if key[0] == 4:
+        return socket.inet_ntoa(key[1:5])
+    return str(ipaddress.IPv6Address(key[1:]))
+
+
+def _read_records(handle: IO[bytes]) -> Iterator[bytes]:
+    handle.seek(0)
+    while True:
+        block = handle.read(_RECORD_SIZE * _READ_RECORDS)
+        if not block:
+            return
+        for start in range(0, len(block), _RECORD_SIZE):
+            yield block[start:start + _RECORD_SIZE]
+
+
+class IndexBuilder:
+    """Write an :class:`AddressIndex` of forward results to ``path``.
+
+    Call :meth:`add` for each domain, then :meth:`finish` (or leave the
+    ``with`` block without an exception). At most ``chunk_size`` records
+    are held in memory; beyond that, sorted chunks are spilled to
+    temporary files next to ``path``. The index replaces ``path``
+    atomically, so readers of an older index keep a consistent view.
+    """
+
+    def __init__(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.records = 0
+        self._spilled = 0
+        self._directory = os.path.dirname(os.path.abspath(path))
+        self._pending: List[bytes] = []
+        self._chunks: List[IO[bytes]] = []
+        self._names = tempfile.TemporaryFile(dir=self._directory)
+        self._ends = array("Q", [0])
+
+    def add(self, domain: str, result: ResolveResult) -> None:
+        """Index every address of ``result`` as pointing at ``domain``."""
+
+        packed_ipv4, packed_ipv6 = result.packed_ipv4, result.packed_ipv6
+        if not packed_ipv4 and not packed_ipv6:
+            return
+        ends = self._ends
+        name = _ID.pack(len(ends) - 1)
+        encoded = domain.encode("utf-8")
+        self._names.write(encoded)
+        ends.append(ends[-1] + len(encoded))
+        pending = self._pending
+        if len(packed_ipv4) == 4:
+            pending.append(b"\x04" + packed_ipv4 + _IPV4_PAD + name)
+        else:
+            pending.extend(
+                [
+                    b"\x04" + packed_ipv4[start:start + 4] + _IPV4_PAD + name
+                    for start in range(0, len(packed_ipv4), 4)
+                ]
+            )
+        if packed_ipv6:
+            pending.extend(
+                [
+                    b"\x06" + packed_ipv6[start:start + 16] + name
+                    for start in range(0, len(packed_ipv6), 16)
+                ]
+            )
+        if len(pending) >= self.chunk_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        self._pending.sort()
+        chunk = tempfile.TemporaryFile(dir=self._directory)
+        chunk.write(b"".join(self._pending))
+        self._chunks.append(chunk)
+        self._spilled += len(self._pending)
+        self._pending = []
+
+    def finish(self) -> int:
+        """Write the index and return how many records it holds."""
+
+        if self._chunks and self._pending:
+            self._spill()
+        self._pending.sort()
+        records: Iterable[bytes] = self._pending
+        if self._chunks:
+            records = heapq.merge(*map(_read_records, self._chunks))
+        count = self._spilled + len(self._pending)
+        ends = self._ends
+        if sys.byteorder != "little":
+            ends = array("Q", ends)
+            ends.byteswap()
+
+        partial = f"{self.path}.tmp"
+        try:
+            with open(partial, "wb") as handle:
+                handle.write(_HEADER.pack(MAGIC, count, len(ends) - 1))
+                batch: List[bytes] = []
+                for record in records:
+                    batch.append(record)
+                    if len(batch) >= _READ_RECORDS:
+                        handle.write(b"".join(batch))
+                        batch.clear()
+                handle.write(b"".join(batch))
+                handle.write(ends.tobytes())
+                self._names.seek(0)
+                shutil.copyfileobj(self._names, handle)
+            os.replace(partial, self.path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.unlink(partial)
+            raise
+        finally:
+            self.close()
+        self.records = count
+        return count
+
+    def close(self) -> None:
+        """Discard the temporary files; :meth:`finish` calls this."""
+
+        for chunk in self._chunks:
+            chunk.close()
+        self._chunks = []
+        self._pending = []
+        self._names.close()
+
+    def __enter__(self) -> "IndexBuilder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
+
+
+def build_index(
+    path: str,
+    results: Iterable[Tuple[str, Entry]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Index the resolved entries of ``results`` (e.g. a ``ResultSet``).
+
+    Errors and reverse-lookup names are skipped. Returns the number of
+    (address, domain) records written.
+    """
+
+    with IndexBuilder(path, chunk_size) as builder:
+        for domain, entry in results:
+            if isinstance(entry, ResolveResult):
+                builder.add(domain, entry)
+    return builder.records
+
+
+class AddressIndex:
+    """Read-only view of an index file written by :class:`IndexBuilder`.
+
+    Raises :class:`OSError` if ``path`` cannot be opened and
+    :class:`AddressIndexError` if it is not a complete index. Lookups are
+    binary searches over the mapped records; safe to share across
+    threads until :meth:`close`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < _HEADER.size:
+                raise AddressIndexError(f"{path} is not an address index.")
+            self._map = mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        try:
+            self._check(size)
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _check(self, size: int) -> None:
+        magic, self._count, self._name_count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise AddressIndexError(f"{self.path} is not an address index.")
+        self._offsets = _HEADER.size + self._count * _RECORD_SIZE
+        self._names = self._offsets + (self._name_count + 1) * 8
+        if self._names > size or self._names + self._name_end() != size:
+            raise AddressIndexError(f"{self.path} is truncated.")
+
+    def _name_end(self) -> int:
+        (end,) = struct.unpack_from(
+            "<Q", self._map, self._offsets + self._name_count * 8
+        )
+        return int(end)
+
+    def _name(self, position: int) -> str:
+        (name,) = _ID.unpack_from(
+            self._map, _HEADER.size + position * _RECORD_SIZE + _KEY_SIZE
+        )
+        start, end = _OFFSETS.unpack_from(self._map, self._offsets + name * 8)
+        return self._map[self._names + start:self._names + end].decode()
+
+    def _record_key(self, position: int) -> bytes:
+        start = _HEADER.size + position * _RECORD_SIZE
+        return self._map[start:start + _KEY_SIZE]
+
+    def _first(self, key: bytes) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, network: str) -> Iterator[Tuple[str, str]]:
+        """Yield ``(address, domain)`` for every address in ``network``.
+
+        ``network`` is an address or a CIDR block (host bits are
+        ignored). Pairs come in address order, and in insertion order for
+        domains sharing an address. Raises :class:`InvalidInputError` for
+        anything else.
+        """
+
+        try:
+            block = ipaddress.ip_network(network.strip(), strict=False)
+        except ValueError:
+            raise InvalidInputError(
+                f"Invalid IP address or network: '{network}'."
+            ) from None
+        return self._range(
+            _key(block.network_address.packed),
+            _key(block.broadcast_address.packed),
+        )
+
+    def lookup(self, address: str) -> List[str]:
+        """Return the domains that resolved to ``address``, in order."""
+
+        key = _key(ipaddress.ip_address(normalize_address(address)).packed)
+        return [domain for _, domain in self._range(key, key)]
+
+    def _range(self, first: bytes, last: bytes) -> Iterator[Tuple[str, str]]:
+        position = self._first(first)
+        while position < self._count:
+            key = self._record_key(position)
+            if key > last:
+                return
+            yield _address(key), self._name(position)
+            position += 1
+
+    def __len__(self) -> int:
+        return int(self._count)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "AddressIndex":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,282 @@
+"""Lock-light counters and latency histograms for resolution internals.
+
+Every thread records into its own shard, so the hot path is a couple of
+dict operations with no lock. Readers merge the shards on demand; shards
+of threads that have exited are folded into a single retired shard.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+PROMETHEUS_PREFIX = "domain_ip_converter_"
+
+Labels = Tuple[Tuple[str, str], ...]
+_Key = Tuple[str, Labels]
+
+
+class HistogramSnapshot(NamedTuple):
+    buckets: Tuple[float, ...]
+    counts: List[int]
+    total: float
+    samples: int
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile as the matching bucket's bound."""
+
+        if not self.samples:
+            return 0.0
+        rank = q * self.samples
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsSnapshot(NamedTuple):
+    counters: Dict[_Key, float]
+    histograms: Dict[_Key, HistogramSnapshot]
+
+    def counter(self, name: str, labels: Labels = ()) -> float:
+        return self.counters.get((name, labels), 0.0)
+
+    def total(self, name: str) -> float:
+        """Sum ``name`` across all label values."""
+
+        return sum(
+            value for (key, _), value in self.counters.items() if key == name
+        )
+
+
+class _Shard:
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread: Optional[threading.Thread]) -> None:
+        self.thread = thread
+        self.counters: Dict[_Key, float] = {}
+        # Per key: one count per bucket, then +Inf, then sum, then count.
+        self.histograms: Dict[_Key, List[float]] = {}
+
+
+class Metrics:
+    """Registry of counters and histograms sharded per thread."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        if list(buckets) != sorted(buckets) or not buckets:
+            raise ValueError("buckets must be a non-empty ascending list.")
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+
+    def _shard(self) -> _Shard:
+        shard: Optional[_Shard] = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def incr(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        histograms = self._shard().histograms
+        key = (name, labels)
+        slots = histograms.get(key)
+        if slots is None:
+            slots = histograms[key] = [0.0] * (len(self.buckets) + 3)
+        slots[bisect.bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def _retire_dead_shards(self) -> List[_Shard]:
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                thread = shard.thread
+                if thread is not None and not thread.is_alive():
+                    _merge(self._retired, shard)
+                else:
+                    live.append(shard)
+            self._shards = live
+            return live + [self._retired]
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Return merged totals across all threads."""
+
+        merged = _Shard(None)
+        for shard in self._retire_dead_shards():
+            _merge(merged, shard)
+        histograms = {
+            key: HistogramSnapshot(
+                self.buckets,
+                [int(count) for count in slots[:-2]],
+                slots[-2],
+                int(slots[-1]),
+            )
+            for key, slots in merged.histograms.items()
+        }
+        return MetricsSnapshot(merged.counters, histograms)
+
+    def merge(self, snapshot: MetricsSnapshot) -> None:
+        """Add ``snapshot``, e.g. one taken in a worker process."""
+
+        shard = _Shard(None)
+        shard.counters = dict(snapshot.counters)
+        for key, hist in snapshot.histograms.items():
+            if hist.buckets != self.buckets:
+                raise ValueError("snapshot uses different buckets.")
+            shard.histograms[key] = [float(count) for count in hist.counts]
+            shard.histograms[key] += [hist.total, float(hist.samples)]
+        with self._lock:
+            _merge(self._retired, shard)
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.counters = {}
+                shard.histograms = {}
+            self._retired = _Shard(None)
+
+    def render_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        typed: Set[str] = set()
+        for (name, labels), value in sorted(snapshot.counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {prefix}{name} counter")
+            lines.append(f"{prefix}{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), hist in sorted(snapshot.histograms.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {prefix}{name} histogram")
+            cumulative = 0
+            bounds = [_number(bound) for bound in hist.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, hist.counts):
+                cumulative += count
+                bucket_labels = _labels(labels + (("le", bound),))
+                lines.append(
+                    f"{prefix}{name}_bucket{bucket_labels} {cumulative}"
+                )
+            lines.append(
+                f"{prefix}{name}_sum{_labels(labels)} {_number(hist.total)}"
+            )
+            lines.append(
+                f"{prefix}{name}_count{_labels(labels)} {hist.samples}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically replace ``path`` with :meth:`render_prometheus`."""
+
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def summary(self) -> str:
+        """Return a short human-readable report for ``--stats``."""
+
+        snapshot = self.snapshot()
+        lines = ["Resolution stats:"]
+        for (name, labels), value in sorted(snapshot.counters.items()):
+            lines.append(f"  {name}{_labels(labels)}: {_number(value)}")
+        for (name, labels), hist in sorted(snapshot.histograms.items()):
+            if not hist.samples:
+                continue
+            mean_ms = hist.total / hist.samples * 1000
+            p50, p95, p99 = (
+                hist.quantile(q) * 1000 for q in (0.5, 0.95, 0.99)
+            )
+            lines.append(
+                f"  {name}{_labels(labels)}: n={hist.samples} "
+                f"mean={mean_ms:.1f}ms p50<={p50:g}ms p95<={p95:g}ms "
+                f"p99<={p99:g}ms"
+            )
+        return "\n".join(lines)
+
+
+def _merge(target: _Shard, source: _Shard) -> None:
+    for key, value in list(source.counters.items()):
+        target.counters[key] = target.counters.get(key, 0.0) + value
+    for key, slots in list(source.histograms.items()):
+        existing = target.histograms.get(key)
+        if existing is None:
+            target.histograms[key] = list(slots)
+        else:
+            for index, value in enumerate(slots):
+                existing[index] += value
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels
+    )
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide registry used by the resolver and CLI."""
+
+    return _metrics
@@ -0,0 +1,175 @@
+"""Token-bucket pacing of outgoing DNS queries.
+
+:class:`TokenBucket` tracks when the next query is due rather than a
+token count (the generic cell rate algorithm), so claiming a slot is a
+comparison and an addition. With the default ``burst`` of one, queries
+are spaced exactly ``1 / rate`` apart instead of leaving in a burst at
+the start of every second, which is what trips upstream throttling.
+
+:class:`RateLimiter` pairs an overall bucket with one bucket per
+nameserver. A caller claims a slot under the lock and waits for it
+outside: worker threads sleep, coroutines await and the UDP engine
+defers the send, so every thread and event loop using one session
+shares a single budget. Waits are counted in the
+``rate_limit_wait_seconds`` histogram.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .metrics import get_metrics
+
+DEFAULT_BURST = 1.0
+
+
+class TokenBucket:
+    """``rate`` queries per second, up to ``burst`` of them back to back.
+
+    Not thread-safe on its own; :class:`RateLimiter` serializes access.
+    """
+
+    __slots__ = ("rate", "burst", "_interval", "_tolerance", "_due")
+
+    def __init__(self, rate: float, burst: float = DEFAULT_BURST) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0.")
+        if burst < 1:
+            raise ValueError("burst must be at least 1.")
+
+        self.rate = rate
+        self.burst = burst
+        self._interval = 1.0 / rate
+        self._tolerance = (burst - 1) * self._interval
+        self._due = float("-inf")
+
+    def delay(self, now: float) -> float:
+        """Seconds from ``now`` until a query may be sent."""
+
+        return max(self._due - self._tolerance - now, 0.0)
+
+    def take(self, at: float) -> None:
+        """Account for a query sent at ``at``, even one over the rate."""
+
+        self._due = max(self._due, at) + self._interval
+
+
+class RateLimiter:
+    """Pace queries to ``qps`` overall and ``nameserver_qps`` per server.
+
+    Either limit may be ``None``; the per-nameserver one only applies to
+    queries whose server is known (the ``"udp"`` backend and dnspython
+    with health tracking). Safe to share across threads and event loops.
+    """
+
+    def __init__(
+        self,
+        qps: Optional[float] = None,
+        nameserver_qps: Optional[float] = None,
+        burst: float = DEFAULT_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if qps is None and nameserver_qps is None:
+            raise ValueError("qps or nameserver_qps is required.")
+        for name, value in (("qps", qps), ("nameserver_qps", nameserver_qps)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be greater than 0.")
+        if burst < 1:
+            raise ValueError("burst must be at least 1.")
+
+        self.qps = qps
+        self.nameserver_qps = nameserver_qps
+        self.burst = burst
+        self._clock = clock
+        self._total = TokenBucket(qps, burst) if qps is not None else None
+        self._servers: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _buckets(self, server: Optional[str]) -> List[TokenBucket]:
+        # Callers hold ``self._lock``.
+        buckets = [self._total] if self._total is not None else []
+        if server is not None and self.nameserver_qps is not None:
+            bucket = self._servers.get(server)
+            if bucket is None:
+                bucket = self._servers[server] = TokenBucket(
+                    self.nameserver_qps, self.burst
+                )
+            buckets.append(bucket)
+        return buckets
+
+    def delay(self, server: Optional[str] = None) -> float:
+        """Seconds until a query to ``server`` may be sent; claims nothing.
+
+        Handy as a sort key to prefer the server that is free soonest.
+        """
+
+        with self._lock:
+            now = self._clock()
+            return max(
+                (bucket.delay(now) for bucket in self._buckets(server)),
+                default=0.0,
+            )
+
+    def reserve(
+        self, server: Optional[str] = None, limit: float = float("inf")
+    ) -> Optional[float]:
+        """Claim the next slot for a query to ``server``.
+
+        Returns how many seconds to wait before sending it, or ``None``
+        (claiming nothing) if that would be longer than ``limit``.
+        """
+
+        with self._lock:
+            now = self._clock()
+            buckets = self._buckets(server)
+            wait = max((bucket.delay(now) for bucket in buckets), default=0.0)
+            if wait > limit:
+                return None
+            for bucket in buckets:
+                bucket.take(now + wait)
+        if wait:
+            get_metrics().observe("rate_limit_wait_seconds", wait)
+        return wait
+
+    def charge(self, server: Optional[str] = None) -> None:
+        """Count a query that is sent now regardless, e.g. a retransmit.
+
+        It does not wait, but later queries do until the debt is paid.
+        """
+
+        with self._lock:
+            now = self._clock()
+            for bucket in self._buckets(server):
+                bucket.take(now)
+
+    def acquire(
+        self, server: Optional[str] = None, timeout: float = float("inf")
+    ) -> bool:
+        """Block until a query to ``server`` may be sent.
+
+        Returns ``False`` at once if that would take longer than
+        ``timeout`` seconds.
+        """
+
+        wait = self.reserve(server, timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(
+        self, server: Optional[str] = None, timeout: float = float("inf")
+    ) -> bool:
+        """Awaitable :meth:`acquire`."""
+
+        import asyncio
+
+        wait = self.reserve(server, timeout)
+        if wait is None:
+            return False
+        if wait:
+            await asyncio.sleep(wait)
+        return True
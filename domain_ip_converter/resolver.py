@@ -1,113 +1,1691 @@
-"""DNS resolver implementation with dnspython preference."""
+"""DNS resolver implementation with dnspython preference.
+
+Forward lookups (:func:`resolve_host`) return A/AAAA addresses; reverse
+lookups (:func:`resolve_reverse`) return the PTR names of an address.
+Both run on the same backends, caches and coalescing.
+
+dnspython is only looked for at import time; its modules are imported by
+the first lookup that needs them, which is also when the ``"auto"``
+backend settles on it or, if the import fails, on ``getaddrinfo``.
+"""
 
 from __future__ import annotations
 
+import copy
+import functools
 import importlib
+import importlib.util
 import ipaddress
 import socket
-from dataclasses import dataclass
-from typing import Any, Iterable, List, Optional, Set
+import threading
+import time
+from contextvars import ContextVar
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from .errors import DNSTimeoutError, ResolutionError
+from .cache import CacheBackend, get_installed_cache
+from .errors import (
+    DNSTimeoutError,
+    DomainIPConverterError,
+    InvalidInputError,
+    NXDomainError,
+    ResolutionError,
+)
+from .health import NameserverHealth, NameserverStats
+from .hedge import DEFAULT_HEDGE_MAX_RATE, check_hedge
+from .hosts import HostsIndex
+from .metrics import Labels, get_metrics
+from .ratelimit import RateLimiter
+from .results import ResolveResult, pack_addresses
+from .singleflight import FlightStats, SingleFlight
 from .validate import is_ip_address
+from .wire import (
+    RCODE_NOERROR,
+    RCODE_NXDOMAIN,
+    TYPE_A,
+    TYPE_AAAA,
+    TYPE_PTR,
+    TYPE_SOA,
+    Message,
+)
+
+if TYPE_CHECKING:
+    from .udp import UDPEngine
 
-dns_exception: Optional[Any]
-dns_resolver: Optional[Any]
-try:  # pragma: no cover - import presence tested via monkeypatch
-    dns_exception = importlib.import_module("dns.exception")
-    dns_resolver = importlib.import_module("dns.resolver")
-    HAS_DNSPYTHON = True
-except Exception:  # pragma: no cover
-    dns_exception = None
-    dns_resolver = None
+# Filled in by _load_dnspython() on first use.
+dns_exception: Optional[Any] = None
+dns_resolver: Optional[Any] = None
+dns_asyncresolver: Optional[Any] = None
+dns_name: Optional[Any] = None
+try:
+    HAS_DNSPYTHON = importlib.util.find_spec("dns") is not None
+except (ImportError, ValueError):  # pragma: no cover
     HAS_DNSPYTHON = False
+_dnspython_lock = threading.Lock()
+
+DEFAULT_ASYNC_CONCURRENCY = 256
+PARALLEL_QUERY_WORKERS = 256
+GETADDRINFO_WORKERS = 64
+GETADDRINFO_MAX_ABANDONED = 64
+
+BACKENDS = ("auto", "dnspython", "socket", "udp")
+
+# Set by every lookup for its thread or asyncio task; see answered_locally().
+_answered_locally: ContextVar[bool] = ContextVar(
+    "answered_locally", default=False
+)
+
+_RECORD_TYPES = {4: "A", 6: "AAAA"}
+_RECORD_CODES = {4: TYPE_A, 6: TYPE_AAAA}
+_SOCKET_FAMILIES = {
+    None: socket.AF_UNSPEC,
+    4: socket.AF_INET,
+    6: socket.AF_INET6,
+}
+
+
+class _Lookup(NamedTuple):
+    result: ResolveResult
+    ttl: Optional[float]
+
+
+# A health tracker plus one single-nameserver resolver per server name.
+_Routes = Tuple[NameserverHealth, Dict[str, Any]]
+
+_T = TypeVar("_T")
+
+
+def _packed_unique(family: int, ips: Iterable[str]) -> bytes:
+    # Packed addresses sort numerically, just like ipaddress objects.
+    unique = {pack_addresses(family, [ip]) for ip in ips}
+    return b"".join(sorted(unique))
+
+
+def _sorted_unique(ipv4: Iterable[str], ipv6: Iterable[str]) -> ResolveResult:
+    return ResolveResult.from_packed(
+        _packed_unique(socket.AF_INET, ipv4),
+        _packed_unique(socket.AF_INET6, ipv6),
+    )
+
+
+def _literal_result(host: str) -> Optional[ResolveResult]:
+    if not is_ip_address(host):
+        return None
+    ip_obj = ipaddress.ip_address(host)
+    if ip_obj.version == 4:
+        return ResolveResult(ipv4=[str(ip_obj)], ipv6=[])
+    return ResolveResult(ipv4=[], ipv6=[str(ip_obj)])
+
+
+def _load_dnspython() -> bool:
+    """Import the dnspython modules still missing; return availability."""
+
+    global HAS_DNSPYTHON, dns_exception, dns_resolver, dns_asyncresolver
+    global dns_name
+    if not HAS_DNSPYTHON:
+        return False
+    if None not in (dns_exception, dns_resolver, dns_asyncresolver, dns_name):
+        return True
+    with _dnspython_lock:
+        try:
+            modules = [
+                importlib.import_module(f"dns.{name}")
+                for name in ("exception", "resolver", "asyncresolver", "name")
+            ]
+        except Exception:
+            HAS_DNSPYTHON = False
+            return False
+        # Only the missing ones, so modules already set are kept.
+        dns_exception = dns_exception or modules[0]
+        dns_resolver = dns_resolver or modules[1]
+        dns_asyncresolver = dns_asyncresolver or modules[2]
+        dns_name = dns_name or modules[3]
+    return True
+
+
+def _translate_dns_error(host: str, exc: BaseException) -> ResolutionError:
+    assert dns_exception is not None and dns_resolver is not None
+    if isinstance(exc, dns_exception.Timeout):
+        return DNSTimeoutError(f"DNS resolution timed out for '{host}'.")
+    if isinstance(exc, dns_resolver.NXDOMAIN):
+        return NXDomainError(host, _soa_negative_ttl(exc))
+    if isinstance(exc, dns_resolver.NoNameservers):
+        return ResolutionError(f"No nameservers available for '{host}'.")
+    return ResolutionError(f"DNS resolution failed for '{host}'.")
+
+
+def _soa_negative_ttl(exc: BaseException) -> Optional[float]:
+    # NXDOMAIN carries one response per name tried, NoAnswer just one;
+    # RFC 2308 caps the SOA minimum at the SOA record's own TTL.
+    kwargs = getattr(exc, "kwargs", None) or {}
+    responses = list((kwargs.get("responses") or {}).values())
+    if kwargs.get("response") is not None:
+        responses.append(kwargs["response"])
+    ttls: List[Optional[float]] = []
+    for response in responses:
+        for rrset in getattr(response, "authority", ()):
+            if rrset.rdtype == TYPE_SOA:
+                ttls.extend(
+                    float(min(rrset.ttl, rdata.minimum)) for rdata in rrset
+                )
+    return _min_ttl(ttls)
+
+
+def _collect_addresses(
+    answers: Iterable[Any], bucket: Set[str]
+) -> Optional[float]:
+    for item in answers:
+        address = getattr(item, "address", None)
+        if address is not None:
+            bucket.add(str(address))
+    ttl = getattr(getattr(answers, "rrset", None), "ttl", None)
+    return float(ttl) if ttl is not None else None
+
+
+def _min_ttl(ttls: Iterable[Optional[float]]) -> Optional[float]:
+    known = [ttl for ttl in ttls if ttl is not None]
+    return min(known) if known else None
+
+
+def _families(family: Optional[int]) -> Tuple[int, ...]:
+    if family is None:
+        return (4, 6)
+    if family not in _RECORD_TYPES:
+        raise ValueError("family must be 4, 6 or None.")
+    return (family,)
+
+
+def _dns_outcome(exc: BaseException) -> str:
+    if dns_exception is not None and isinstance(exc, dns_exception.Timeout):
+        return "timeout"
+    if dns_resolver is not None and isinstance(exc, dns_resolver.NXDOMAIN):
+        return "nxdomain"
+    return "error"
+
+
+def _error_outcome(exc: BaseException) -> str:
+    return "timeout" if isinstance(exc, DNSTimeoutError) else "error"
+
+
+def _record_query(rdtype: str, outcome: str, started: float) -> None:
+    metrics = get_metrics()
+    metrics.incr(
+        "dns_queries_total", labels=(("rdtype", rdtype), ("outcome", outcome))
+    )
+    metrics.observe(
+        "dns_query_seconds",
+        time.perf_counter() - started,
+        (("rdtype", rdtype),),
+    )
+
+
+def _record_lookup(
+    backend: str, outcome: str, started: float, shared: bool = False
+) -> None:
+    metrics = get_metrics()
+    labels: Labels = (("backend", backend),)
+    metrics.incr("lookups_total", labels=labels + (("outcome", outcome),))
+    metrics.observe("lookup_seconds", time.perf_counter() - started, labels)
+    if shared:
+        metrics.incr("coalesced_lookups_total", labels=labels)
+
+
+def _cache_get(
+    cache: CacheBackend, host: str, family: Optional[int]
+) -> Optional[ResolveResult]:
+    return _counted_get(lambda: cache.get(host, family=family))
+
+
+def _counted_get(get: Callable[[], Optional[_T]]) -> Optional[_T]:
+    try:
+        cached = get()
+    except NXDomainError:
+        get_metrics().incr(
+            "cache_requests_total", labels=(("result", "hit"),)
+        )
+        raise
+    result = "miss" if cached is None else "hit"
+    get_metrics().incr("cache_requests_total", labels=(("result", result),))
+    return cached
+
+
+def _timeout_error(host: str) -> DNSTimeoutError:
+    return DNSTimeoutError(f"DNS resolution timed out for '{host}'.")
+
+
+_Answer = Tuple[Set[str], Optional[float]]
+
+
+def _pace(limiter: Optional[RateLimiter], name: str, deadline: float) -> None:
+    # For queries whose nameserver is not ours to pick: overall limit only.
+    if limiter is not None and not limiter.acquire(
+        None, deadline - time.monotonic()
+    ):
+        raise _timeout_error(name)
+
+
+async def _pace_async(
+    limiter: Optional[RateLimiter], name: str, deadline: float
+) -> None:
+    if limiter is not None and not await limiter.acquire_async(
+        None, deadline - time.monotonic()
+    ):
+        raise _timeout_error(name)
+
+
+def _build_lookup(answers: Dict[int, _Answer]) -> _Lookup:
+    ipv4, ipv4_ttl = answers.get(4, (set(), None))
+    ipv6, ipv6_ttl = answers.get(6, (set(), None))
+    if ipv4 or ipv6:
+        # The negative TTL of an empty family only bounds an empty result.
+        ttl = _min_ttl(
+            [ipv4_ttl if ipv4 else None, ipv6_ttl if ipv6 else None]
+        )
+    else:
+        ttl = _min_ttl([ipv4_ttl, ipv6_ttl])
+    return _Lookup(
+        _sorted_unique(ipv4, ipv6),
+        ttl,
+    )
+
+
+_query_pool: Optional[ThreadPoolExecutor] = None
+_QUERY_POOL_LABELS: Labels = (("pool", "query"),)
+_query_pool_lock = threading.Lock()
+
+
+def _get_query_pool() -> ThreadPoolExecutor:
+    global _query_pool
+    if _query_pool is None:
+        with _query_pool_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(
+                    max_workers=PARALLEL_QUERY_WORKERS,
+                    thread_name_prefix="dns-query",
+                )
+    return _query_pool
+
+
+class ResolverSession:
+    """Reusable DNS resolver configuration.
+
+    The dnspython resolvers are built once, on first use, instead of
+    re-reading ``/etc/resolv.conf`` for every lookup. A session is safe to
+    share across threads and event loops. ``timeout`` bounds each attempt
+    against a single nameserver; the ``timeout`` given to
+    :func:`resolve_host` still bounds the whole lookup. ``family`` (4 or 6)
+    restricts lookups to A or AAAA records unless overridden per call.
+
+    ``backend`` picks the lookup implementation: ``"dnspython"``, the
+    ``"socket"`` (``getaddrinfo``) fallback, or the built-in pipelined
+    ``"udp"`` engine, which needs no third-party package and does not
+    apply search domains. ``"auto"`` prefers dnspython when installed.
+
+    With ``coalesce`` (the default), concurrent lookups of the same host
+    and family through this session share one set of DNS queries; callers
+    that join an in-flight lookup get its result or exception, bounded by
+    the first caller's timeout.
+
+    ``hedge_delay`` and/or ``hedge_percentile`` enable hedged queries on
+    the ``"udp"`` backend: a query the first nameserver has not answered
+    in time is also sent to the next one, at most ``hedge_max_rate`` of
+    queries (see :class:`~domain_ip_converter.udp.UDPEngine`).
+
+    With ``track_health`` (the default), the ``"dnspython"`` and ``"udp"``
+    backends send each query to the fastest healthy nameserver first and
+    temporarily eject servers that keep failing (see
+    :class:`~domain_ip_converter.health.NameserverHealth`); the state is
+    available from :meth:`nameserver_stats`. Without it, dnspython tries
+    nameservers in configured order and the UDP engine rotates.
+
+    ``hosts_files`` are hosts-style files of static overrides, loaded into
+    :attr:`hosts` (a :class:`~domain_ip_converter.hosts.HostsIndex`) when
+    the session is built; pinned names and addresses are answered from it
+    before the cache or any query. Raises :class:`OSError` if one cannot
+    be read.
+
+    ``qps`` caps queries per second across everything using the session
+    and ``nameserver_qps`` caps each nameserver (see
+    :class:`~domain_ip_converter.ratelimit.RateLimiter`, available as
+    :attr:`rate_limiter`). Queries are paced evenly rather than sent in
+    bursts, and a lookup that cannot get a slot before its timeout fails
+    with :class:`DNSTimeoutError`. Per-nameserver limits need a backend
+    that picks the server itself: ``"udp"``, or ``"dnspython"`` with
+    ``track_health``; those also send a query to the server free soonest.
+    """
 
+    def __init__(
+        self,
+        nameservers: Optional[Sequence[str]] = None,
+        timeout: float = 5.0,
+        search: Optional[Sequence[str]] = None,
+        port: int = 53,
+        family: Optional[int] = None,
+        backend: str = "auto",
+        coalesce: bool = True,
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_max_rate: float = DEFAULT_HEDGE_MAX_RATE,
+        track_health: bool = True,
+        hosts_files: Optional[Sequence[str]] = None,
+        qps: Optional[float] = None,
+        nameserver_qps: Optional[float] = None,
+    ) -> None:
+        if timeout <= 0:
+            raise ValueError("timeout must be greater than 0.")
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}.")
+        _families(family)
+        check_hedge(hedge_delay, hedge_percentile, hedge_max_rate)
+        hedging = hedge_delay is not None or hedge_percentile is not None
+        if hedging and backend != "udp":
+            raise ValueError("Hedged queries require backend='udp'.")
 
-@dataclass(frozen=True)
-class ResolveResult:
-    ipv4: List[str]
-    ipv6: List[str]
+        self.nameservers = list(nameservers) if nameservers else None
+        self.timeout = timeout
+        self.search = list(search) if search else None
+        self.port = port
+        self.family = family
+        self.backend = backend
+        self.coalesce = coalesce
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_max_rate = hedge_max_rate
+        self.track_health = track_health
+        self.hosts_files = list(hosts_files) if hosts_files else None
+        self.qps = qps
+        self.nameserver_qps = nameserver_qps
+        self.rate_limiter = (
+            RateLimiter(qps, nameserver_qps)
+            if qps is not None or nameserver_qps is not None
+            else None
+        )
+        self.hosts = HostsIndex(self.hosts_files) if self.hosts_files else None
+        self._lock = threading.Lock()
+        self._resolver: Optional[Any] = None
+        self._async_resolver: Optional[Any] = None
+        self._routes: Dict[bool, Optional[_Routes]] = {}
+        self._health: Optional[NameserverHealth] = None
+        self._udp_engine: Optional[UDPEngine] = None
 
+    def backend_name(self) -> str:
+        """Return the backend lookups will use right now."""
 
-def _sorted_unique(ips: Iterable[str]) -> List[str]:
-    unique = {str(ipaddress.ip_address(ip)) for ip in ips}
-    return sorted(unique, key=lambda ip: ipaddress.ip_address(ip))
+        if self.backend != "auto":
+            return self.backend
+        return "dnspython" if _load_dnspython() else "socket"
 
+    def _configure(self, factory: Callable[..., Any]) -> Any:
+        if self.nameservers is None:
+            resolver = factory()
+        else:
+            resolver = factory(configure=False)
+            resolver.nameservers = list(self.nameservers)
+        resolver.port = self.port
+        resolver.timeout = self.timeout
+        resolver.lifetime = self.timeout
+        if self.search is not None and dns_name is not None:
+            resolver.search = [dns_name.from_text(x) for x in self.search]
+            resolver.use_search_by_default = True
+        return resolver
 
-def _resolve_with_dnspython(host: str, timeout: float) -> ResolveResult:
-    if not HAS_DNSPYTHON or dns_exception is None or dns_resolver is None:
+    def sync_resolver(self) -> Any:
+        """Return the shared ``dns.resolver.Resolver`` for this session."""
+
+        if not _load_dnspython() or dns_resolver is None:
+            raise ResolutionError("dnspython is not available.")
+        if self._resolver is None:
+            with self._lock:
+                if self._resolver is None:
+                    self._resolver = self._configure(dns_resolver.Resolver)
+        return self._resolver
+
+    def async_resolver(self) -> Any:
+        """Return the shared asyncio resolver for this session."""
+
+        if not _load_dnspython() or dns_asyncresolver is None:
+            raise ResolutionError("dnspython is not available.")
+        if self._async_resolver is None:
+            with self._lock:
+                if self._async_resolver is None:
+                    self._async_resolver = self._configure(
+                        dns_asyncresolver.Resolver
+                    )
+        return self._async_resolver
+
+    def _health_for(self, nameservers: Sequence[str]) -> NameserverHealth:
+        # Callers hold ``self._lock``.
+        if self._health is None or self._health.servers != list(
+            dict.fromkeys(nameservers)
+        ):
+            self._health = NameserverHealth(nameservers)
+        return self._health
+
+    def _dnspython_routes(self, use_async: bool = False) -> Optional[_Routes]:
+        """Return the health tracker and per-nameserver resolvers.
+
+        Each resolver is a copy of the shared one restricted to a single
+        nameserver. Returns ``None`` when health tracking is off.
+        """
+
+        if not self.track_health:
+            return None
+        if use_async not in self._routes:
+            base = self.async_resolver() if use_async else self.sync_resolver()
+            with self._lock:
+                if use_async not in self._routes:
+                    resolvers: Dict[str, Any] = {}
+                    for nameserver in base.nameservers:
+                        single = copy.copy(base)
+                        single.nameservers = [nameserver]
+                        resolvers.setdefault(str(nameserver), single)
+                    self._routes[use_async] = (
+                        (self._health_for(list(resolvers)), resolvers)
+                        if resolvers
+                        else None
+                    )
+        return self._routes[use_async]
+
+    def udp_engine(self) -> UDPEngine:
+        """Return the shared pipelined UDP engine for this session."""
+
+        if self._udp_engine is None:
+            from .udp import UDPEngine, system_nameservers
+
+            with self._lock:
+                if self._udp_engine is None:
+                    nameservers = list(
+                        dict.fromkeys(
+                            self.nameservers or system_nameservers()
+                        )
+                    )
+                    self._udp_engine = UDPEngine(
+                        nameservers,
+                        port=self.port,
+                        hedge_delay=self.hedge_delay,
+                        hedge_percentile=self.hedge_percentile,
+                        hedge_max_rate=self.hedge_max_rate,
+                        health=(
+                            self._health_for(nameservers)
+                            if self.track_health
+                            else None
+                        ),
+                        limiter=self.rate_limiter,
+                    )
+        return self._udp_engine
+
+    def nameserver_stats(self) -> List[NameserverStats]:
+        """Return per-nameserver health, empty before the first lookup."""
+
+        health = self._health
+        return health.stats() if health is not None else []
+
+    def close(self) -> None:
+        """Release sockets and threads held by the UDP engine, if any."""
+
+        with self._lock:
+            engine, self._udp_engine = self._udp_engine, None
+        if engine is not None:
+            engine.close()
+
+
+_default_session: Optional[ResolverSession] = None
+_flights: SingleFlight[_Lookup] = SingleFlight()
+_default_session_lock = threading.Lock()
+
+
+def answered_locally() -> bool:
+    """Return whether the last lookup of this thread or task sent no query.
+
+    True when it was answered from the hosts files, the cache or an IP
+    literal, or rejected before reaching the network; its latency then
+    says nothing about the upstream resolver.
+    """
+
+    return _answered_locally.get()
+
+
+def coalesce_stats() -> FlightStats:
+    """Return how many lookups ran and how many joined one in flight."""
+
+    return _flights.stats()
+
+
+def install_session(
+    session: Optional[ResolverSession],
+) -> Optional[ResolverSession]:
+    """Install ``session`` as the process-wide default and return the old one.
+
+    Passing ``None`` reverts to a lazily created session using the system
+    resolver configuration.
+    """
+
+    global _default_session
+    with _default_session_lock:
+        previous = _default_session
+        _default_session = session
+    return previous
+
+
+def get_session() -> ResolverSession:
+    """Return the default session, creating it on first use."""
+
+    global _default_session
+    session = _default_session
+    if session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = ResolverSession()
+            session = _default_session
+    return session
+
+
+def _resolve_with_dnspython(
+    host: str, timeout: float, session: ResolverSession, family: Optional[int]
+) -> _Lookup:
+    if not _load_dnspython() or dns_exception is None or dns_resolver is None:
         raise ResolutionError("dnspython is not available.")
 
-    resolver = dns_resolver.Resolver()
-    resolver.timeout = timeout
-    resolver.lifetime = timeout
+    resolver = session.sync_resolver()
+    routes = session._dnspython_routes()
+    deadline = time.monotonic() + timeout
 
-    ipv4: Set[str] = set()
-    ipv6: Set[str] = set()
+    def _query(version: int, queued_at: Optional[float] = None) -> _Answer:
+        if queued_at is not None:
+            get_metrics().observe(
+                "queue_wait_seconds",
+                time.perf_counter() - queued_at,
+                _QUERY_POOL_LABELS,
+            )
+        if routes is None:
+            _pace(session.rate_limiter, host, deadline)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise _timeout_error(host)
+        rdtype = _RECORD_TYPES[version]
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            if routes is None:
+                answers = resolver.resolve(host, rdtype, lifetime=remaining)
+            else:
+                answers = _resolve_routed(
+                    routes,
+                    host,
+                    rdtype,
+                    deadline,
+                    session.timeout,
+                    session.rate_limiter,
+                )
+            outcome = "noerror"
+        except dns_resolver.NoAnswer as exc:
+            outcome = "no_answer"
+            return set(), _soa_negative_ttl(exc)
+        except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+            outcome = _dns_outcome(exc)
+            raise _translate_dns_error(host, exc) from exc
+        finally:
+            _record_query(rdtype, outcome, started)
+
+        bucket: Set[str] = set()
+        return bucket, _collect_addresses(answers, bucket)
 
-    def _query(record_type: str, bucket: Set[str]) -> None:
+    first, *rest = _families(family)
+    # The second record type runs on the shared pool so both queries are
+    # in flight together; errors still surface in A-then-AAAA order.
+    pending: Dict[int, "Future[_Answer]"] = {
+        version: _get_query_pool().submit(
+            _query, version, time.perf_counter()
+        )
+        for version in rest
+    }
+    answers: Dict[int, _Answer] = {}
+    try:
+        answers[first] = _query(first)
+    except BaseException:
+        for future in pending.values():
+            future.cancel()
+        raise
+
+    for version, future in pending.items():
         try:
-            answers = resolver.resolve(host, record_type, lifetime=timeout)
-        except dns_exception.Timeout as exc:
-            raise DNSTimeoutError(
-                f"DNS resolution timed out for '{host}'."
-            ) from exc
-        except dns_resolver.NXDOMAIN as exc:
-            raise ResolutionError(
-                f"Domain does not exist: '{host}'."
-            ) from exc
-        except dns_resolver.NoAnswer:
-            return
-        except dns_resolver.NoNameservers as exc:
-            raise ResolutionError(
-                f"No nameservers available for '{host}'."
-            ) from exc
-        except dns_exception.DNSException as exc:
-            raise ResolutionError(
-                f"DNS resolution failed for '{host}'."
-            ) from exc
+            answers[version] = future.result(
+                timeout=max(deadline - time.monotonic(), 0.0)
+            )
+        except FutureTimeoutError as exc:
+            future.cancel()
+            raise _timeout_error(host) from exc
+
+    return _build_lookup(answers)
+
+
+def _route_lifetime(
+    deadline: float, attempt_timeout: float, last: bool
+) -> float:
+    # Each server gets one attempt; the last one gets whatever is left,
+    # so dnspython's own retransmits still use the whole budget.
+    remaining = deadline - time.monotonic()
+    return remaining if last else min(remaining, attempt_timeout)
+
+
+def _resolve_routed(
+    routes: _Routes,
+    host: str,
+    rdtype: str,
+    deadline: float,
+    attempt_timeout: float,
+    limiter: Optional[RateLimiter] = None,
+) -> Any:
+    assert dns_exception is not None and dns_resolver is not None
+    health, resolvers = routes
+    order = health.order()
+    if limiter is not None:
+        order = sorted(order, key=limiter.delay)
+    error: Optional[BaseException] = None
+    for position, server in enumerate(order):
+        if limiter is not None and not limiter.acquire(
+            server, deadline - time.monotonic()
+        ):
+            break
+        lifetime = _route_lifetime(
+            deadline, attempt_timeout, position == len(order) - 1
+        )
+        if lifetime <= 0:
+            break
+        started = time.perf_counter()
+        try:
+            answers = resolvers[server].resolve(
+                host, rdtype, lifetime=lifetime
+            )
+        except (dns_resolver.NXDOMAIN, dns_resolver.NoAnswer):
+            health.record_success(server, time.perf_counter() - started)
+            raise
+        except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+            health.record_failure(server)
+            error = exc
+            continue
+        health.record_success(server, time.perf_counter() - started)
+        return answers
+    raise error or dns_exception.Timeout()
+
+
+def _udp_outcome(message: Message, rdtype: int) -> str:
+    if message.rcode == RCODE_NXDOMAIN:
+        return "nxdomain"
+    if message.rcode != RCODE_NOERROR:
+        return "error"
+    if any(record.rdtype == rdtype for record in message.answers):
+        return "noerror"
+    return "no_answer"
+
+
+def _submit_udp(
+    engine: UDPEngine, host: str, version: int, timeout: float
+) -> "Future[Message]":
+    return _submit_query(
+        engine, host, _RECORD_TYPES[version], _RECORD_CODES[version], timeout
+    )
+
+
+def _submit_query(
+    engine: UDPEngine, name: str, rdtype: str, code: int, timeout: float
+) -> "Future[Message]":
+    started = time.perf_counter()
 
-        for item in answers:
-            address = getattr(item, "address", None)
-            if address is not None:
-                bucket.add(str(address))
+    def _done(future: "Future[Message]") -> None:
+        if future.cancelled():
+            outcome = "cancelled"
+        else:
+            exc = future.exception()
+            if exc is None:
+                outcome = _udp_outcome(future.result(), code)
+            else:
+                outcome = _error_outcome(exc)
+        _record_query(rdtype, outcome, started)
 
-    _query("A", ipv4)
-    _query("AAAA", ipv6)
+    future = engine.submit(name, code, timeout)
+    future.add_done_callback(_done)
+    return future
 
-    return ResolveResult(ipv4=_sorted_unique(ipv4), ipv6=_sorted_unique(ipv6))
 
+def _udp_answer(host: str, message: Message, rdtype: int) -> _Answer:
+    if message.rcode == RCODE_NXDOMAIN:
+        negative_ttl = message.negative_ttl()
+        raise NXDomainError(
+            host, float(negative_ttl) if negative_ttl is not None else None
+        )
+    if message.rcode != RCODE_NOERROR:
+        raise ResolutionError(f"DNS resolution failed for '{host}'.")
 
-def _resolve_with_socket(host: str) -> ResolveResult:
+    bucket: Set[str] = set()
+    ttls: List[Optional[float]] = []
+    for record in message.answers:
+        # An empty value is a malformed address record; skip it.
+        if record.rdtype == rdtype and record.value:
+            bucket.add(record.value)
+            ttls.append(float(record.ttl))
+    if not bucket:
+        negative_ttl = message.negative_ttl()
+        if negative_ttl is not None:
+            ttls.append(float(negative_ttl))
+    return bucket, _min_ttl(ttls)
+
+
+def _resolve_with_udp(
+    host: str, timeout: float, session: ResolverSession, family: Optional[int]
+) -> _Lookup:
+    engine = session.udp_engine()
+    deadline = time.monotonic() + timeout
+    futures = {
+        version: _submit_udp(engine, host, version, timeout)
+        for version in _families(family)
+    }
+    answers: Dict[int, _Answer] = {}
+    try:
+        for version, future in futures.items():
+            try:
+                message = future.result(
+                    timeout=max(deadline - time.monotonic(), 0.0)
+                )
+            except FutureTimeoutError as exc:
+                raise _timeout_error(host) from exc
+            answers[version] = _udp_answer(
+                host, message, _RECORD_CODES[version]
+            )
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+    return _build_lookup(answers)
+
+
+def _getaddrinfo_lookup(host: str, family: Optional[int] = None) -> _Lookup:
     ipv4: Set[str] = set()
     ipv6: Set[str] = set()
 
+    started = time.perf_counter()
     try:
-        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        infos = socket.getaddrinfo(
+            host,
+            None,
+            family=_SOCKET_FAMILIES[family],
+            proto=socket.IPPROTO_TCP,
+        )
     except socket.gaierror as exc:
+        outcome = "nxdomain" if exc.errno == socket.EAI_NONAME else "error"
+        _record_query("getaddrinfo", outcome, started)
         raise ResolutionError(
             f"DNS resolution failed for '{host}'."
         ) from exc
+    _record_query(
+        "getaddrinfo", "noerror" if infos else "no_answer", started
+    )
 
-    for family, _, _, _, sockaddr in infos:
-        if family == socket.AF_INET:
+    for info_family, _, _, _, sockaddr in infos:
+        if info_family == socket.AF_INET:
             ipv4.add(str(sockaddr[0]))
-        elif family == socket.AF_INET6:
-            ipv6.add(str(sockaddr[0]))
+        elif info_family == socket.AF_INET6:
+            # Link-local answers carry a "%scope" suffix; keep the address.
+            ipv6.add(str(sockaddr[0]).partition("%")[0])
+
+    return _Lookup(
+        _sorted_unique(ipv4, ipv6),
+        None,
+    )
+
+
+class _AddrinfoPool:
+    """Bounded thread pool for blocking ``getaddrinfo`` calls.
+
+    ``getaddrinfo`` cannot be interrupted, so a lookup whose caller hit
+    its deadline keeps its worker until the system resolver returns. Such
+    abandoned lookups are counted; once ``max_abandoned`` are stuck, new
+    lookups fail fast instead of queueing behind them.
+    """
+
+    def __init__(self, workers: int, max_abandoned: int) -> None:
+        self.max_abandoned = max_abandoned
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="getaddrinfo"
+        )
+        self._lock = threading.Lock()
+        self._abandoned = 0
+
+    @property
+    def abandoned(self) -> int:
+        with self._lock:
+            return self._abandoned
+
+    def submit(self, host: str, family: Optional[int]) -> "Future[_Lookup]":
+        return self.call(host, _getaddrinfo_lookup, host, family)
+
+    def call(
+        self, host: str, func: Callable[..., _T], *args: Any
+    ) -> "Future[_T]":
+        """Run ``func(*args)``, a blocking system lookup of ``host``."""
+
+        with self._lock:
+            if self._abandoned >= self.max_abandoned:
+                raise ResolutionError(
+                    f"System resolver is unresponsive; not resolving '{host}'."
+                )
+        return self._executor.submit(func, *args)
+
+    def abandon(self, future: "Future[Any]") -> None:
+        """Give up on ``future``; cancel it if it has not started yet."""
 
-    return ResolveResult(ipv4=_sorted_unique(ipv4), ipv6=_sorted_unique(ipv6))
+        if future.cancel():
+            return
+        with self._lock:
+            self._abandoned += 1
+        get_metrics().incr("getaddrinfo_abandoned_total")
+        future.add_done_callback(self._release)
+
+    def _release(self, _future: "Future[Any]") -> None:
+        with self._lock:
+            self._abandoned -= 1
+
+
+_addrinfo_pool: Optional[_AddrinfoPool] = None
+
+
+def _get_addrinfo_pool() -> _AddrinfoPool:
+    global _addrinfo_pool
+    if _addrinfo_pool is None:
+        with _query_pool_lock:
+            if _addrinfo_pool is None:
+                _addrinfo_pool = _AddrinfoPool(
+                    GETADDRINFO_WORKERS, GETADDRINFO_MAX_ABANDONED
+                )
+    return _addrinfo_pool
+
+
+def _resolve_with_socket(
+    host: str,
+    timeout: float,
+    family: Optional[int] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> _Lookup:
+    deadline = time.monotonic() + timeout
+    _pace(limiter, host, deadline)
+    pool = _get_addrinfo_pool()
+    future = pool.submit(host, family)
+    try:
+        return future.result(timeout=deadline - time.monotonic())
+    except FutureTimeoutError as exc:
+        pool.abandon(future)
+        raise _timeout_error(host) from exc
+
+
+def resolve_host(
+    host: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+    family: Optional[int] = None,
+) -> ResolveResult:
+    """Resolve a hostname or literal IP to IPv4/IPv6 addresses.
+
+    A and AAAA queries are sent in parallel and share one ``timeout``
+    deadline; ``family`` (4 or 6) skips the other record type and defaults
+    to the session's setting. When ``cache`` is given, or a cache was
+    installed with :func:`~domain_ip_converter.cache.install_cache`,
+    results are served from it until their DNS TTL expires. Names pinned
+    in the session's hosts files are answered before the cache is read.
+    ``session`` defaults to the process-wide session (see
+    :func:`install_session`).
+    """
+
+    _answered_locally.set(True)
+    session = session or get_session()
+    if family is None:
+        family = session.family
+    _families(family)
+
+    started = time.perf_counter()
+    if session.hosts is not None:
+        pinned = session.hosts.lookup(host, family)
+        if pinned is not None:
+            _record_lookup("hosts", "ok", started)
+            return pinned
+
+    literal = _literal_result(host)
+    if literal is not None:
+        return literal
+
+    if cache is None:
+        cache = get_installed_cache()
+    if cache is not None:
+        try:
+            cached = _cache_get(cache, host, family)
+        except NXDomainError:
+            _record_lookup("cache", "error", started)
+            raise
+        if cached is not None:
+            _record_lookup("cache", "ok", started)
+            return cached
+
+    _answered_locally.set(False)
+    backend = session.backend_name()
+    executed = False
+
+    def _lookup() -> _Lookup:
+        nonlocal executed
+        executed = True
+        try:
+            if backend == "dnspython":
+                lookup = _resolve_with_dnspython(
+                    host, timeout, session, family
+                )
+            elif backend == "udp":
+                lookup = _resolve_with_udp(host, timeout, session, family)
+            else:
+                lookup = _resolve_with_socket(
+                    host, timeout, family, session.rate_limiter
+                )
+        except NXDomainError as exc:
+            if cache is not None:
+                cache.set_nxdomain(host, exc.ttl, family=family)
+            raise
+        if cache is not None:
+            cache.set(host, lookup.result, lookup.ttl, family=family)
+        return lookup
+
+    try:
+        if session.coalesce:
+            lookup = _flights.do((session, host, family), _lookup)
+        else:
+            lookup = _lookup()
+    except DomainIPConverterError as exc:
+        _record_lookup(backend, _error_outcome(exc), started, not executed)
+        raise
+    _record_lookup(backend, "ok", started, not executed)
+    return lookup.result
+
+
+async def _resolve_with_dnspython_async(
+    host: str, timeout: float, session: ResolverSession, family: Optional[int]
+) -> _Lookup:
+    import asyncio
+
+    if (
+        not _load_dnspython()
+        or dns_exception is None
+        or dns_resolver is None
+        or dns_asyncresolver is None
+    ):
+        raise ResolutionError("dnspython is not available.")
+
+    resolver = session.async_resolver()
+    routes = session._dnspython_routes(use_async=True)
+    deadline = time.monotonic() + timeout
+
+    async def _query(version: int) -> _Answer:
+        rdtype = _RECORD_TYPES[version]
+        if routes is None:
+            await _pace_async(session.rate_limiter, host, deadline)
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            if routes is None:
+                answers = await resolver.resolve(
+                    host, rdtype, lifetime=deadline - time.monotonic()
+                )
+            else:
+                answers = await _resolve_routed_async(
+                    routes,
+                    host,
+                    rdtype,
+                    deadline,
+                    session.timeout,
+                    session.rate_limiter,
+                )
+            outcome = "noerror"
+        except dns_resolver.NoAnswer as exc:
+            outcome = "no_answer"
+            return set(), _soa_negative_ttl(exc)
+        except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+            outcome = _dns_outcome(exc)
+            raise _translate_dns_error(host, exc) from exc
+        finally:
+            _record_query(rdtype, outcome, started)
+
+        bucket: Set[str] = set()
+        return bucket, _collect_addresses(answers, bucket)
+
+    tasks = {
+        version: asyncio.ensure_future(_query(version))
+        for version in _families(family)
+    }
+    answers: Dict[int, _Answer] = {}
+    try:
+        for version, task in tasks.items():
+            answers[version] = await task
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+    return _build_lookup(answers)
+
+
+async def _resolve_routed_async(
+    routes: _Routes,
+    host: str,
+    rdtype: str,
+    deadline: float,
+    attempt_timeout: float,
+    limiter: Optional[RateLimiter] = None,
+) -> Any:
+    assert dns_exception is not None and dns_resolver is not None
+    health, resolvers = routes
+    order = health.order()
+    if limiter is not None:
+        order = sorted(order, key=limiter.delay)
+    error: Optional[BaseException] = None
+    for position, server in enumerate(order):
+        if limiter is not None and not await limiter.acquire_async(
+            server, deadline - time.monotonic()
+        ):
+            break
+        lifetime = _route_lifetime(
+            deadline, attempt_timeout, position == len(order) - 1
+        )
+        if lifetime <= 0:
+            break
+        started = time.perf_counter()
+        try:
+            answers = await resolvers[server].resolve(
+                host, rdtype, lifetime=lifetime
+            )
+        except (dns_resolver.NXDOMAIN, dns_resolver.NoAnswer):
+            health.record_success(server, time.perf_counter() - started)
+            raise
+        except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+            health.record_failure(server)
+            error = exc
+            continue
+        health.record_success(server, time.perf_counter() - started)
+        return answers
+    raise error or dns_exception.Timeout()
+
+
+async def _resolve_with_udp_async(
+    host: str, timeout: float, session: ResolverSession, family: Optional[int]
+) -> _Lookup:
+    import asyncio
+
+    engine = session.udp_engine()
+    futures = {
+        version: asyncio.wrap_future(
+            _submit_udp(engine, host, version, timeout)
+        )
+        for version in _families(family)
+    }
+    answers: Dict[int, _Answer] = {}
+    try:
+        for version, future in futures.items():
+            answers[version] = _udp_answer(
+                host, await future, _RECORD_CODES[version]
+            )
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+    return _build_lookup(answers)
+
+
+async def _resolve_with_socket_async(
+    host: str,
+    timeout: float,
+    family: Optional[int],
+    limiter: Optional[RateLimiter] = None,
+) -> _Lookup:
+    import asyncio
+
+    deadline = time.monotonic() + timeout
+    await _pace_async(limiter, host, deadline)
+    pool = _get_addrinfo_pool()
+    future = pool.submit(host, family)
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)),
+            deadline - time.monotonic(),
+        )
+    except asyncio.TimeoutError as exc:
+        pool.abandon(future)
+        raise _timeout_error(host) from exc
+
+
+async def resolve_host_async(
+    host: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+    family: Optional[int] = None,
+) -> ResolveResult:
+    """Resolve a hostname or literal IP without blocking the event loop.
+
+    Uses dnspython's asyncio resolver when available; otherwise the
+    ``getaddrinfo`` fallback runs on the shared bounded resolver pool.
+    ``family`` and caching behave as in :func:`resolve_host`.
+    """
+
+    _answered_locally.set(True)
+    session = session or get_session()
+    if family is None:
+        family = session.family
+    _families(family)
+
+    started = time.perf_counter()
+    if session.hosts is not None:
+        pinned = session.hosts.lookup(host, family)
+        if pinned is not None:
+            _record_lookup("hosts", "ok", started)
+            return pinned
+
+    literal = _literal_result(host)
+    if literal is not None:
+        return literal
+
+    if cache is None:
+        cache = get_installed_cache()
+    if cache is not None:
+        try:
+            cached = _cache_get(cache, host, family)
+        except NXDomainError:
+            _record_lookup("cache", "error", started)
+            raise
+        if cached is not None:
+            _record_lookup("cache", "ok", started)
+            return cached
+
+    _answered_locally.set(False)
+    backend = session.backend_name()
+    executed = False
+
+    async def _lookup() -> _Lookup:
+        nonlocal executed
+        executed = True
+        try:
+            if backend == "dnspython":
+                lookup = await _resolve_with_dnspython_async(
+                    host, timeout, session, family
+                )
+            elif backend == "udp":
+                lookup = await _resolve_with_udp_async(
+                    host, timeout, session, family
+                )
+            else:
+                lookup = await _resolve_with_socket_async(
+                    host, timeout, family, session.rate_limiter
+                )
+        except NXDomainError as exc:
+            if cache is not None:
+                cache.set_nxdomain(host, exc.ttl, family=family)
+            raise
+        if cache is not None:
+            cache.set(host, lookup.result, lookup.ttl, family=family)
+        return lookup
+
+    try:
+        if session.coalesce:
+            lookup = await _flights.do_async((session, host, family), _lookup)
+        else:
+            lookup = await _lookup()
+    except DomainIPConverterError as exc:
+        _record_lookup(backend, _error_outcome(exc), started, not executed)
+        raise
+    _record_lookup(backend, "ok", started, not executed)
+    return lookup.result
+
+
+async def resolve_many_async(
+    hosts: Iterable[str],
+    timeout: float = 5.0,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+    family: Optional[int] = None,
+) -> List[Union[ResolveResult, DomainIPConverterError]]:
+    """Resolve many hosts concurrently on the running event loop.
+
+    At most ``concurrency`` lookups are in flight at once and duplicate
+    hosts are looked up once. The returned list is aligned with ``hosts``;
+    failed lookups are returned as the raised
+    :class:`DomainIPConverterError` instead of aborting the batch.
+    """
+
+    def _resolve(host: str) -> Awaitable[ResolveResult]:
+        return resolve_host_async(
+            host, timeout=timeout, cache=cache, session=session, family=family
+        )
+
+    return await _gather_unique(hosts, concurrency, _resolve)
+
+
+async def _gather_unique(
+    keys: Iterable[str],
+    concurrency: int,
+    resolve: Callable[[str], Awaitable[_T]],
+) -> List[Union[_T, DomainIPConverterError]]:
+    import asyncio
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+
+    async def _bounded(key: str) -> Union[_T, DomainIPConverterError]:
+        async with semaphore:
+            try:
+                return await resolve(key)
+            except DomainIPConverterError as exc:
+                return exc
+
+    keys = list(keys)
+    unique = list(dict.fromkeys(keys))
+    outcomes = await asyncio.gather(*(_bounded(key) for key in unique))
+    by_key = dict(zip(unique, outcomes))
+    return [by_key[key] for key in keys]
+
+
+# h_errno for an address with no name (netdb.h HOST_NOT_FOUND).
+_HOST_NOT_FOUND = 1
+
+
+class _Names(NamedTuple):
+    names: Tuple[str, ...]
+    ttl: Optional[float]
+
+
+def reverse_name(address: str) -> str:
+    """Return the reverse DNS name of the IP ``address``.
+
+    ``192.0.2.1`` maps to ``1.2.0.192.in-addr.arpa``; an IPv6 address maps
+    to its 32 nibbles, last first, under ``ip6.arpa``. Raises
+    :class:`InvalidInputError` if ``address`` is not an IP literal.
+    """
+
+    try:
+        if ":" in address:
+            packed = socket.inet_pton(socket.AF_INET6, address)
+            return ".".join(reversed(packed.hex())) + ".ip6.arpa"
+        packed = socket.inet_pton(socket.AF_INET, address)
+    except (OSError, ValueError):
+        raise InvalidInputError(
+            f"Invalid IP address: '{address}'."
+        ) from None
+    return f"{packed[3]}.{packed[2]}.{packed[1]}.{packed[0]}.in-addr.arpa"
+
+
+def _host_names(names: Iterable[str]) -> Tuple[str, ...]:
+    unique = {name.rstrip(".").lower() for name in names}
+    unique.discard("")
+    return tuple(sorted(unique))
+
+
+def _collect_names(answers: Iterable[Any]) -> _Names:
+    names = [str(getattr(item, "target", "")) for item in answers]
+    ttl = getattr(getattr(answers, "rrset", None), "ttl", None)
+    return _Names(_host_names(names), float(ttl) if ttl is not None else None)
+
+
+def _reverse_with_dnspython(
+    name: str, timeout: float, session: ResolverSession
+) -> _Names:
+    if not _load_dnspython() or dns_exception is None or dns_resolver is None:
+        raise ResolutionError("dnspython is not available.")
+
+    resolver = session.sync_resolver()
+    routes = session._dnspython_routes()
+    deadline = time.monotonic() + timeout
+    if routes is None:
+        _pace(session.rate_limiter, name, deadline)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        if routes is None:
+            answers = resolver.resolve(
+                name, "PTR", lifetime=deadline - time.monotonic()
+            )
+        else:
+            answers = _resolve_routed(
+                routes,
+                name,
+                "PTR",
+                deadline,
+                session.timeout,
+                session.rate_limiter,
+            )
+        outcome = "noerror"
+    except dns_resolver.NoAnswer as exc:
+        outcome = "no_answer"
+        return _Names((), _soa_negative_ttl(exc))
+    except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+        outcome = _dns_outcome(exc)
+        raise _translate_dns_error(name, exc) from exc
+    finally:
+        _record_query("PTR", outcome, started)
+    return _collect_names(answers)
+
+
+async def _reverse_with_dnspython_async(
+    name: str, timeout: float, session: ResolverSession
+) -> _Names:
+    if (
+        not _load_dnspython()
+        or dns_exception is None
+        or dns_resolver is None
+        or dns_asyncresolver is None
+    ):
+        raise ResolutionError("dnspython is not available.")
+
+    resolver = session.async_resolver()
+    routes = session._dnspython_routes(use_async=True)
+    deadline = time.monotonic() + timeout
+    if routes is None:
+        await _pace_async(session.rate_limiter, name, deadline)
+    started = time.perf_counter()
+    outcome = "cancelled"
+    try:
+        if routes is None:
+            answers = await resolver.resolve(
+                name, "PTR", lifetime=deadline - time.monotonic()
+            )
+        else:
+            answers = await _resolve_routed_async(
+                routes,
+                name,
+                "PTR",
+                deadline,
+                session.timeout,
+                session.rate_limiter,
+            )
+        outcome = "noerror"
+    except dns_resolver.NoAnswer as exc:
+        outcome = "no_answer"
+        return _Names((), _soa_negative_ttl(exc))
+    except (dns_exception.Timeout, dns_exception.DNSException) as exc:
+        outcome = _dns_outcome(exc)
+        raise _translate_dns_error(name, exc) from exc
+    finally:
+        _record_query("PTR", outcome, started)
+    return _collect_names(answers)
+
+
+def _udp_names(name: str, message: Message) -> _Names:
+    names, ttl = _udp_answer(name, message, TYPE_PTR)
+    return _Names(_host_names(names), ttl)
+
+
+def _reverse_with_udp(
+    name: str, timeout: float, session: ResolverSession
+) -> _Names:
+    engine = session.udp_engine()
+    future = _submit_query(engine, name, "PTR", TYPE_PTR, timeout)
+    try:
+        message = future.result(timeout=timeout)
+    except FutureTimeoutError as exc:
+        raise _timeout_error(name) from exc
+    finally:
+        future.cancel()
+    return _udp_names(name, message)
+
+
+async def _reverse_with_udp_async(
+    name: str, timeout: float, session: ResolverSession
+) -> _Names:
+    import asyncio
+
+    engine = session.udp_engine()
+    future = asyncio.wrap_future(
+        _submit_query(engine, name, "PTR", TYPE_PTR, timeout)
+    )
+    try:
+        message = await future
+    finally:
+        future.cancel()
+    return _udp_names(name, message)
+
+
+def _gethostbyaddr_lookup(address: str, name: str) -> _Names:
+    started = time.perf_counter()
+    try:
+        host, aliases, _ = socket.gethostbyaddr(address)
+    except socket.herror as exc:
+        if exc.errno == _HOST_NOT_FOUND:
+            _record_query("gethostbyaddr", "nxdomain", started)
+            raise NXDomainError(name) from exc
+        _record_query("gethostbyaddr", "error", started)
+        raise ResolutionError(f"DNS resolution failed for '{name}'.") from exc
+    except OSError as exc:
+        _record_query("gethostbyaddr", "error", started)
+        raise ResolutionError(f"DNS resolution failed for '{name}'.") from exc
+    _record_query("gethostbyaddr", "noerror", started)
+    return _Names(_host_names([host, *aliases]), None)
+
+
+def _reverse_with_socket(
+    address: str,
+    name: str,
+    timeout: float,
+    limiter: Optional[RateLimiter] = None,
+) -> _Names:
+    deadline = time.monotonic() + timeout
+    _pace(limiter, name, deadline)
+    pool = _get_addrinfo_pool()
+    future = pool.call(name, _gethostbyaddr_lookup, address, name)
+    try:
+        return future.result(timeout=deadline - time.monotonic())
+    except FutureTimeoutError as exc:
+        pool.abandon(future)
+        raise _timeout_error(name) from exc
+
+
+async def _reverse_with_socket_async(
+    address: str,
+    name: str,
+    timeout: float,
+    limiter: Optional[RateLimiter] = None,
+) -> _Names:
+    import asyncio
+
+    deadline = time.monotonic() + timeout
+    await _pace_async(limiter, name, deadline)
+    pool = _get_addrinfo_pool()
+    future = pool.call(name, _gethostbyaddr_lookup, address, name)
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)),
+            deadline - time.monotonic(),
+        )
+    except asyncio.TimeoutError as exc:
+        pool.abandon(future)
+        raise _timeout_error(name) from exc
+
+
+_reverse_flights: SingleFlight[_Names] = SingleFlight()
+
+
+def resolve_reverse(
+    address: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+) -> List[str]:
+    """Look up the host names (PTR records) of the IP ``address``.
+
+    The query for :func:`reverse_name` goes through the session's backend
+    (``gethostbyaddr`` for the socket fallback) with the same deadline,
+    caching, coalescing and metrics as :func:`resolve_host`. Returns the
+    names sorted, lowercase and without the trailing dot; an empty list
+    when the reverse name has no PTR records. Raises
+    :class:`~domain_ip_converter.errors.NXDomainError` when it does not
+    exist and :class:`InvalidInputError` if ``address`` is not an IP.
+    Addresses pinned in the session's hosts files return their names.
+    """
+
+    _answered_locally.set(True)
+    session = session or get_session()
+    name = reverse_name(address)
+
+    started = time.perf_counter()
+    if session.hosts is not None:
+        pinned_names = session.hosts.names(address)
+        if pinned_names is not None:
+            _record_lookup("hosts", "ok", started)
+            return pinned_names
+    if cache is None:
+        cache = get_installed_cache()
+    if cache is not None:
+        try:
+            cached = _counted_get(functools.partial(cache.get_names, name))
+        except NXDomainError:
+            _record_lookup("cache", "error", started)
+            raise
+        if cached is not None:
+            _record_lookup("cache", "ok", started)
+            return cached
+
+    _answered_locally.set(False)
+    backend = session.backend_name()
+    executed = False
+
+    def _lookup() -> _Names:
+        nonlocal executed
+        executed = True
+        try:
+            if backend == "dnspython":
+                lookup = _reverse_with_dnspython(name, timeout, session)
+            elif backend == "udp":
+                lookup = _reverse_with_udp(name, timeout, session)
+            else:
+                lookup = _reverse_with_socket(
+                    address, name, timeout, session.rate_limiter
+                )
+        except NXDomainError as exc:
+            if cache is not None:
+                cache.set_names(name, None, exc.ttl)
+            raise
+        if cache is not None:
+            cache.set_names(name, lookup.names, lookup.ttl)
+        return lookup
+
+    try:
+        if session.coalesce:
+            lookup = _reverse_flights.do((session, name), _lookup)
+        else:
+            lookup = _lookup()
+    except DomainIPConverterError as exc:
+        _record_lookup(backend, _error_outcome(exc), started, not executed)
+        raise
+    _record_lookup(backend, "ok", started, not executed)
+    return list(lookup.names)
+
+
+async def resolve_reverse_async(
+    address: str,
+    timeout: float = 5.0,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+) -> List[str]:
+    """Look up the PTR names of ``address`` without blocking the loop.
+
+    Behaves like :func:`resolve_reverse`.
+    """
+
+    _answered_locally.set(True)
+    session = session or get_session()
+    name = reverse_name(address)
+
+    started = time.perf_counter()
+    if session.hosts is not None:
+        pinned_names = session.hosts.names(address)
+        if pinned_names is not None:
+            _record_lookup("hosts", "ok", started)
+            return pinned_names
+    if cache is None:
+        cache = get_installed_cache()
+    if cache is not None:
+        try:
+            cached = _counted_get(functools.partial(cache.get_names, name))
+        except NXDomainError:
+            _record_lookup("cache", "error", started)
+            raise
+        if cached is not None:
+            _record_lookup("cache", "ok", started)
+            return cached
+
+    _answered_locally.set(False)
+    backend = session.backend_name()
+    executed = False
+
+    async def _lookup() -> _Names:
+        nonlocal executed
+        executed = True
+        try:
+            if backend == "dnspython":
+                lookup = await _reverse_with_dnspython_async(
+                    name, timeout, session
+                )
+            elif backend == "udp":
+                lookup = await _reverse_with_udp_async(name, timeout, session)
+            else:
+                lookup = await _reverse_with_socket_async(
+                    address, name, timeout, session.rate_limiter
+                )
+        except NXDomainError as exc:
+            if cache is not None:
+                cache.set_names(name, None, exc.ttl)
+            raise
+        if cache is not None:
+            cache.set_names(name, lookup.names, lookup.ttl)
+        return lookup
+
+    try:
+        if session.coalesce:
+            lookup = await _reverse_flights.do_async((session, name), _lookup)
+        else:
+            lookup = await _lookup()
+    except DomainIPConverterError as exc:
+        _record_lookup(backend, _error_outcome(exc), started, not executed)
+        raise
+    _record_lookup(backend, "ok", started, not executed)
+    return list(lookup.names)
 
 
-def resolve_host(host: str, timeout: float = 5.0) -> ResolveResult:
-    """Resolve a hostname or literal IP to IPv4/IPv6 addresses."""
+async def resolve_reverse_many_async(
+    addresses: Iterable[str],
+    timeout: float = 5.0,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+    cache: Optional[CacheBackend] = None,
+    session: Optional[ResolverSession] = None,
+) -> List[Union[List[str], DomainIPConverterError]]:
+    """Look up the PTR names of many addresses on the running event loop.
 
-    if is_ip_address(host):
-        ip_obj = ipaddress.ip_address(host)
-        if ip_obj.version == 4:
-            return ResolveResult(ipv4=[str(ip_obj)], ipv6=[])
-        return ResolveResult(ipv4=[], ipv6=[str(ip_obj)])
+    Concurrency, de-duplication and error handling are as in
+    :func:`resolve_many_async`; the result is aligned with ``addresses``.
+    """
 
-    if HAS_DNSPYTHON:
-        return _resolve_with_dnspython(host, timeout)
+    def _resolve(address: str) -> Awaitable[List[str]]:
+        return resolve_reverse_async(
+            address, timeout=timeout, cache=cache, session=session
+        )
 
-    return _resolve_with_socket(host)
+    return await _gather_unique(addresses, concurrency, _resolve)
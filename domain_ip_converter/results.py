@@ -0,0 +1,257 @@
+"""Compact containers for resolved addresses.
+
+:class:`ResolveResult` keeps each family's addresses packed into one
+``bytes`` object (4 bytes per IPv4 address, 16 per IPv6 address) and only
+builds the familiar lists of strings when :attr:`~ResolveResult.ipv4` or
+:attr:`~ResolveResult.ipv6` is read. :class:`ResultSet` goes further for
+bulk runs and stores every entry's addresses column-wise in two shared
+buffers, so a million results cost a few dozen bytes each instead of a
+dict and two lists of strings.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import socket
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .errors import DomainIPConverterError
+
+_IPV4_SIZE = 4
+_IPV6_SIZE = 16
+
+# What a ResultSet entry holds: the addresses, the host names found by a
+# reverse lookup, or the failure's message.
+Entry = Union["ResolveResult", List[str], str]
+
+
+def pack_addresses(family: int, addresses: Iterable[str]) -> bytes:
+    """Pack ``addresses`` of ``family`` (``AF_INET``/``AF_INET6``) in order.
+
+    Raises :class:`ValueError` if any address is not a valid literal of
+    that family.
+    """
+
+    try:
+        return b"".join(socket.inet_pton(family, ip) for ip in addresses)
+    except (OSError, TypeError) as exc:
+        version = 4 if family == socket.AF_INET else 6
+        raise ValueError(f"Invalid IPv{version} address: {exc}") from exc
+
+
+def _ipv4_strings(packed: bytes) -> List[str]:
+    return [
+        socket.inet_ntoa(packed[start:start + _IPV4_SIZE])
+        for start in range(0, len(packed), _IPV4_SIZE)
+    ]
+
+
+def _ipv6_strings(packed: bytes) -> List[str]:
+    # ipaddress, not inet_ntop, so the text matches what it always was
+    # (e.g. "::ffff:1.2.3.4" rather than a platform-specific spelling).
+    return [
+        str(ipaddress.IPv6Address(packed[start:start + _IPV6_SIZE]))
+        for start in range(0, len(packed), _IPV6_SIZE)
+    ]
+
+
+class ResolveResult:
+    """IPv4 and IPv6 addresses resolved for one host.
+
+    Addresses are stored packed and decoded on access: :attr:`ipv4` and
+    :attr:`ipv6` return a new list of strings each time. Instances are
+    immutable, hashable, compare equal when they hold the same addresses
+    in the same order and pickle to their packed form.
+    """
+
+    __slots__ = ("_ipv4", "_ipv6")
+
+    _ipv4: bytes
+    _ipv6: bytes
+
+    def __init__(
+        self, ipv4: Iterable[str] = (), ipv6: Iterable[str] = ()
+    ) -> None:
+        object.__setattr__(
+            self, "_ipv4", pack_addresses(socket.AF_INET, ipv4)
+        )
+        object.__setattr__(
+            self, "_ipv6", pack_addresses(socket.AF_INET6, ipv6)
+        )
+
+    @classmethod
+    def from_packed(
+        cls, ipv4: bytes = b"", ipv6: bytes = b""
+    ) -> "ResolveResult":
+        """Build a result from already packed addresses."""
+
+        if len(ipv4) % _IPV4_SIZE or len(ipv6) % _IPV6_SIZE:
+            raise ValueError("Packed addresses have a truncated entry.")
+        result = cls.__new__(cls)
+        object.__setattr__(result, "_ipv4", bytes(ipv4))
+        object.__setattr__(result, "_ipv6", bytes(ipv6))
+        return result
+
+    @property
+    def ipv4(self) -> List[str]:
+        return _ipv4_strings(self._ipv4)
+
+    @property
+    def ipv6(self) -> List[str]:
+        return _ipv6_strings(self._ipv6)
+
+    @property
+    def packed_ipv4(self) -> bytes:
+        """The IPv4 addresses, 4 bytes each, in order."""
+
+        return self._ipv4
+
+    @property
+    def packed_ipv6(self) -> bytes:
+        """The IPv6 addresses, 16 bytes each, in order."""
+
+        return self._ipv6
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ResolveResult is immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("ResolveResult is immutable.")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ResolveResult):
+            return NotImplemented
+        return self._ipv4 == other._ipv4 and self._ipv6 == other._ipv6
+
+    def __hash__(self) -> int:
+        return hash((self._ipv4, self._ipv6))
+
+    def __repr__(self) -> str:
+        return f"ResolveResult(ipv4={self.ipv4!r}, ipv6={self.ipv6!r})"
+
+    def __reduce__(self) -> Tuple[Any, Tuple[bytes, bytes]]:
+        return (_from_packed, (self._ipv4, self._ipv6))
+
+
+def _from_packed(ipv4: bytes, ipv6: bytes) -> ResolveResult:
+    return ResolveResult.from_packed(ipv4, ipv6)
+
+
+class ResultSet:
+    """Outcomes of a bulk run, keyed by host and kept in insertion order.
+
+    Each entry is a key with a :class:`ResolveResult`, a list of host
+    names (reverse lookups) or an error message. Addresses live in two
+    shared buffers with one end offset per entry; names, error messages
+    and raw inputs are only stored for the entries that have them.
+    :meth:`get` and :meth:`items` rebuild a :class:`ResolveResult` on
+    demand. Not thread-safe.
+    """
+
+    __slots__ = (
+        "_index",
+        "_ipv4",
+        "_ipv6",
+        "_ipv4_ends",
+        "_ipv6_ends",
+        "_names",
+        "_errors",
+        "_inputs",
+    )
+
+    def __init__(self) -> None:
+        # Key -> position; the dict's own order is the insertion order.
+        self._index: Dict[str, int] = {}
+        self._ipv4 = bytearray()
+        self._ipv6 = bytearray()
+        self._ipv4_ends = array("Q")
+        self._ipv6_ends = array("Q")
+        self._names: Dict[int, Tuple[str, ...]] = {}
+        self._errors: Dict[int, str] = {}
+        self._inputs: Dict[int, List[str]] = {}
+
+    def add(
+        self,
+        key: str,
+        outcome: Union[Entry, DomainIPConverterError],
+        inputs: Optional[List[str]] = None,
+    ) -> bool:
+        """Store ``outcome`` for ``key`` unless it already has one.
+
+        Exceptions are kept as their message; ``inputs`` are the raw
+        inputs behind ``key``, if they are being reported. Returns
+        ``False`` and leaves the existing entry alone when ``key`` is
+        already present.
+        """
+
+        if key in self._index:
+            return False
+        position = len(self._index)
+        self._index[key] = position
+        if isinstance(outcome, ResolveResult):
+            self._ipv4 += outcome.packed_ipv4
+            self._ipv6 += outcome.packed_ipv6
+        elif isinstance(outcome, list):
+            self._names[position] = tuple(outcome)
+        else:
+            self._errors[position] = str(outcome)
+        if inputs is not None:
+            self._inputs[position] = inputs
+        self._ipv4_ends.append(len(self._ipv4))
+        self._ipv6_ends.append(len(self._ipv6))
+        return True
+
+    def add_input(self, key: str, raw: str) -> None:
+        """Record ``raw`` as one of the inputs that produced ``key``."""
+
+        self._inputs.setdefault(self._index[key], []).append(raw)
+
+    def get(self, key: str) -> Entry:
+        """Return the result, names or error message stored for ``key``."""
+
+        return self._entry(self._index[key])
+
+    def inputs(self, key: str) -> Optional[List[str]]:
+        """Return the raw inputs recorded for ``key``, if any were."""
+
+        return self._inputs.get(self._index[key])
+
+    def items(self) -> Iterator[Tuple[str, Entry]]:
+        for position, key in enumerate(self._index):
+            yield key, self._entry(position)
+
+    def _entry(self, position: int) -> Entry:
+        error = self._errors.get(position)
+        if error is not None:
+            return error
+        names = self._names.get(position)
+        if names is not None:
+            return list(names)
+        return ResolveResult.from_packed(
+            self._slice(self._ipv4, self._ipv4_ends, position),
+            self._slice(self._ipv6, self._ipv6_ends, position),
+        )
+
+    @staticmethod
+    def _slice(buffer: bytearray, ends: "array[int]", position: int) -> bytes:
+        start = ends[position - 1] if position else 0
+        return bytes(buffer[start:ends[position]])
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
@@ -0,0 +1,577 @@
+"""Bulk resolution sharded across worker processes.
+
+A single process runs out of CPU -- normalization, sorting addresses and
+encoding output all hold the GIL -- long before the network is saturated.
+:func:`resolve_sharded` splits the input across worker processes, each
+with its own resolver session and thread pool (or event loop), and merges
+the results they stream back in batches over pipes.
+"""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from .batch import (
+    DEFAULT_WORKERS,
+    Outcome,
+    ReverseOutcome,
+    lookup_outcome,
+    plan_inputs,
+    reverse_outcome,
+)
+from .cache import (
+    DEFAULT_MAX_NEGATIVE_TTL,
+    CacheBackend,
+    ResolverCache,
+    install_cache,
+)
+from .errors import (
+    DomainIPConverterError,
+    InvalidInputError,
+    ResolutionError,
+)
+from .metrics import MetricsSnapshot, get_metrics
+from .resolver import (
+    ResolverSession,
+    install_session,
+    resolve_host_async,
+    resolve_reverse_async,
+)
+from .store import PersistentCache
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+DEFAULT_BATCH_SIZE = 1024
+# Per-worker in-memory cache used unless the caller configures one, so a
+# host repeated across batches is looked up once by the worker owning it.
+DEFAULT_SHARD_CACHE_SIZE = 65536
+# Input batches a worker may hold at once; one is resolving while the
+# next ones wait in its queue, so workers never idle between batches.
+BATCHES_PER_WORKER = 4
+
+# Inputs travel as (indices, lines) and results as (indices, payloads):
+# two flat lists pickle much smaller than a list of pairs.
+_Batch = Tuple[List[int], List[Any]]
+
+_T = TypeVar("_T")
+
+# Host part of a hostname or URL: after any scheme and userinfo, up to a
+# port, path, query or fragment; bracketed IPv6 literals keep their colons.
+_HOST_TEXT = re.compile(
+    r"(?:[A-Za-z][A-Za-z0-9+.-]*://)?(?:[^@/?#]*@)?"
+    r"(?:\[([^\]]*)\]|([^:/?#\s]*))"
+)
+
+
+@dataclass(frozen=True)
+class ShardResult:
+    """Outcome for one input line.
+
+    ``host`` is the normalized host, or ``None`` when the input was invalid
+    (``outcome`` is then the :class:`InvalidInputError`). For reverse
+    lookups ``host`` is the normalized address and a successful
+    ``outcome`` its list of host names.
+    """
+
+    index: int
+    input: str
+    host: Optional[str]
+    outcome: Union[Outcome, ReverseOutcome]
+
+
+class _Done(NamedTuple):
+    metrics: MetricsSnapshot
+
+
+class _Crash(NamedTuple):
+    message: str
+
+
+@dataclass(frozen=True)
+class _ShardOptions:
+    session: Dict[str, Any]
+    timeout: float
+    workers: int
+    use_async: bool
+    cache_size: int
+    cache_file: Optional[str]
+    render: Optional[Callable[[ShardResult], Any]]
+    max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL
+    reverse: bool = False
+
+
+def _session_args(
+    session: ResolverSession, processes: int = 1
+) -> Dict[str, Any]:
+    # Every process gets its own session, so rate limits are split.
+    return {
+        "nameservers": session.nameservers,
+        "timeout": session.timeout,
+        "search": session.search,
+        "port": session.port,
+        "family": session.family,
+        "backend": session.backend,
+        "coalesce": session.coalesce,
+        "hedge_delay": session.hedge_delay,
+        "hedge_percentile": session.hedge_percentile,
+        "hedge_max_rate": session.hedge_max_rate,
+        "track_health": session.track_health,
+        "hosts_files": session.hosts_files,
+        "qps": _share(session.qps, processes),
+        "nameserver_qps": _share(session.nameserver_qps, processes),
+    }
+
+
+def _share(rate: Optional[float], processes: int) -> Optional[float]:
+    return None if rate is None else rate / processes
+
+
+def _results(
+    options: _ShardOptions,
+    indices: List[int],
+    lines: List[str],
+    normalized: Sequence[Union[str, InvalidInputError]],
+    outcomes: Dict[str, Union[Outcome, ReverseOutcome]],
+) -> _Batch:
+    render = options.render
+    payloads: List[Any] = []
+    for index, raw, host in zip(indices, lines, normalized):
+        if isinstance(host, InvalidInputError):
+            result = ShardResult(index, raw, None, host)
+        else:
+            result = ShardResult(index, raw, host, outcomes[host])
+        payloads.append(result if render is None else render(result))
+    return indices, payloads
+
+
+def _serve_threaded(
+    inbox: Connection, outbox: Connection, options: _ShardOptions
+) -> None:
+    send_lock = threading.Lock()
+
+    def _send(message: object) -> None:
+        with send_lock:
+            outbox.send(message)
+
+    lookup: Callable[[str, float], Union[Outcome, ReverseOutcome]]
+    lookup = reverse_outcome if options.reverse else lookup_outcome
+
+    def _start(indices: List[int], lines: List[str]) -> None:
+        plan = plan_inputs(lines, options.reverse)
+        outcomes: Dict[str, Union[Outcome, ReverseOutcome]] = {}
+        count_lock = threading.Lock()
+
+        def _finish() -> None:
+            _send(_results(options, indices, lines, plan.normalized, outcomes))
+
+        def _done(
+            host: str, future: "Future[Union[Outcome, ReverseOutcome]]"
+        ) -> None:
+            try:
+                with count_lock:
+                    outcomes[host] = future.result()
+                    last = len(outcomes) == len(plan.hosts)
+                if last:
+                    _finish()
+            except Exception:
+                _send(_Crash(traceback.format_exc()))
+
+        if not plan.hosts:
+            _finish()
+        for host in plan.hosts:
+            future = executor.submit(lookup, host, options.timeout)
+            future.add_done_callback(functools.partial(_done, host))
+
+    with ThreadPoolExecutor(
+        max_workers=options.workers, thread_name_prefix="shard-lookup"
+    ) as executor:
+        while True:
+            message = inbox.recv()
+            if message is None:
+                break
+            _start(*message)
+
+
+async def _serve_async(
+    inbox: Connection, outbox: Connection, options: _ShardOptions
+) -> None:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(options.workers)
+    tasks: Set["asyncio.Future[None]"] = set()
+
+    async def _one(host: str) -> Union[Outcome, ReverseOutcome]:
+        async with semaphore:
+            try:
+                if options.reverse:
+                    return await resolve_reverse_async(host, options.timeout)
+                return await resolve_host_async(host, options.timeout)
+            except DomainIPConverterError as exc:
+                return exc
+
+    async def _batch(indices: List[int], lines: List[str]) -> None:
+        plan = plan_inputs(lines, options.reverse)
+        hosts = list(plan.hosts)
+        outcomes = dict(zip(hosts, await asyncio.gather(*map(_one, hosts))))
+        outbox.send(
+            _results(options, indices, lines, plan.normalized, outcomes)
+        )
+
+    while True:
+        message = await loop.run_in_executor(None, inbox.recv)
+        if message is None:
+            break
+        task = asyncio.ensure_future(_batch(*message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+
+
+def _serve(
+    inbox: Connection, outbox: Connection, options: _ShardOptions
+) -> None:
+    """Worker process entry point."""
+
+    # Ctrl+C reaches the whole process group; the parent stops workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    session = ResolverSession(**options.session)
+    cache: Optional[CacheBackend] = None
+    if options.cache_file:
+        cache = PersistentCache(
+            options.cache_file, max_negative_ttl=options.max_negative_ttl
+        )
+    elif options.cache_size:
+        cache = ResolverCache(
+            options.cache_size, max_negative_ttl=options.max_negative_ttl
+        )
+    install_session(session)
+    install_cache(cache)
+    try:
+        if options.use_async:
+            import asyncio
+
+            asyncio.run(_serve_async(inbox, outbox, options))
+        else:
+            _serve_threaded(inbox, outbox, options)
+        outbox.send(_Done(get_metrics().snapshot()))
+    except Exception:
+        outbox.send(_Crash(traceback.format_exc()))
+    finally:
+        session.close()
+        if isinstance(cache, PersistentCache):
+            cache.close()
+
+
+def _shard_key(raw: str, reverse: bool) -> str:
+    """Return a cheap stand-in for the host ``raw`` is looked up as.
+
+    Common spellings of one host (case, trailing dot, URL scheme, port or
+    path) share a worker, whose batch planning and cache then look the
+    host up once. There is no IDNA or validation: the parent routes every
+    line, so this must stay far cheaper than the workers' normalization.
+    """
+
+    text = raw.strip()
+    url = "/" in text or "@" in text or "[" in text
+    if reverse or (not url and text.count(":") > 1):
+        # An address, possibly a bare IPv6 literal.
+        return text.strip("[]").partition("%")[0].lower()
+    if not url and ":" not in text:
+        return text.rstrip(".").lower()
+    match = _HOST_TEXT.match(text)
+    host = (match.group(1) or match.group(2)) if match else None
+    return (host or text).rstrip(".").lower()
+
+
+class _Worker:
+    __slots__ = ("process", "inbox", "outbox", "indices", "lines", "queued")
+
+    def __init__(
+        self,
+        process: multiprocessing.process.BaseProcess,
+        inbox: Connection,
+        outbox: Connection,
+    ) -> None:
+        self.process = process
+        self.inbox = inbox
+        self.outbox = outbox
+        self.indices: List[int] = []
+        self.lines: List[str] = []
+        self.queued = 0
+
+
+class _ShardPool:
+    """Feeds workers, bounds buffered input and merges their results."""
+
+    def __init__(
+        self,
+        processes: int,
+        options: _ShardOptions,
+        ordered: bool,
+        batch_size: int,
+        start_method: Optional[str],
+    ) -> None:
+        self._ordered = ordered
+        self._reverse = options.reverse
+        self._batch_size = batch_size
+        self._held: Dict[int, Any] = {}
+        self._next_index = 0
+        self._emitted = 0
+        self._workers: List[_Worker] = []
+        self._by_outbox: Dict[Connection, _Worker] = {}
+        context = multiprocessing.get_context(start_method)
+        try:
+            for number in range(processes):
+                inbox_reader, inbox_writer = context.Pipe(duplex=False)
+                outbox_reader, outbox_writer = context.Pipe(duplex=False)
+                process = context.Process(  # type: ignore[attr-defined]
+                    target=_serve,
+                    args=(inbox_reader, outbox_writer, options),
+                    name=f"resolve-shard-{number}",
+                    daemon=True,
+                )
+                process.start()
+                inbox_reader.close()
+                outbox_writer.close()
+                worker = _Worker(process, inbox_writer, outbox_reader)
+                self._workers.append(worker)
+                self._by_outbox[outbox_reader] = worker
+        except BaseException:
+            self.close()
+            raise
+
+    def run(self, inputs: Iterable[str]) -> Iterator[Any]:
+        workers = self._workers
+        count = len(workers)
+        reverse = self._reverse
+        batch_size = self._batch_size
+        # Bound on lines read but not yet emitted, held results included.
+        limit = count * BATCHES_PER_WORKER * batch_size
+        read = 0
+        since_flush = 0
+        for raw in inputs:
+            worker = workers[hash(_shard_key(raw, reverse)) % count]
+            worker.indices.append(read)
+            worker.lines.append(raw)
+            read += 1
+            since_flush += 1
+            if len(worker.lines) >= batch_size:
+                yield from self._send(worker)
+            if since_flush >= count * batch_size or (
+                read - self._emitted >= limit
+            ):
+                # Ship partial batches so no line waits on later input.
+                yield from self._flush()
+                since_flush = 0
+            while read - self._emitted >= limit:
+                yield from self._receive()
+        yield from self._flush()
+        while any(worker.queued for worker in workers):
+            yield from self._receive()
+        for worker in workers:
+            worker.inbox.send(None)
+        while self._by_outbox:
+            yield from self._receive()
+        for worker in workers:
+            worker.process.join()
+
+    def _flush(self) -> Iterator[Any]:
+        for worker in self._workers:
+            if worker.lines:
+                yield from self._send(worker)
+
+    def _send(self, worker: _Worker) -> Iterator[Any]:
+        while worker.queued >= BATCHES_PER_WORKER:
+            yield from self._receive()
+        worker.inbox.send((worker.indices, worker.lines))
+        worker.indices, worker.lines = [], []
+        worker.queued += 1
+
+    def _receive(self) -> Iterator[Any]:
+        for connection in wait(list(self._by_outbox)):
+            assert isinstance(connection, Connection)
+            worker = self._by_outbox[connection]
+            try:
+                message = connection.recv()
+            except EOFError:
+                raise ResolutionError(
+                    f"Worker process {worker.process.name} exited "
+                    f"unexpectedly (code {worker.process.exitcode})."
+                ) from None
+            if isinstance(message, _Done):
+                get_metrics().merge(message.metrics)
+                del self._by_outbox[connection]
+            elif isinstance(message, _Crash):
+                raise ResolutionError(
+                    f"Worker process {worker.process.name} failed:\n"
+                    f"{message.message}"
+                )
+            else:
+                worker.queued -= 1
+                yield from self._emit(*message)
+
+    def _emit(self, indices: List[int], payloads: List[Any]) -> Iterator[Any]:
+        if not self._ordered:
+            self._emitted += len(payloads)
+            yield from payloads
+            return
+        held = self._held
+        held.update(zip(indices, payloads))
+        while self._next_index in held:
+            payload = held.pop(self._next_index)
+            self._next_index += 1
+            self._emitted += 1
+            yield payload
+
+    def close(self) -> None:
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.process.join()
+            worker.inbox.close()
+            worker.outbox.close()
+
+
+def _run_shards(
+    inputs: Iterable[str],
+    processes: int,
+    options: _ShardOptions,
+    ordered: bool,
+    batch_size: int,
+    start_method: Optional[str],
+) -> Iterator[Any]:
+    pool = _ShardPool(processes, options, ordered, batch_size, start_method)
+    try:
+        yield from pool.run(inputs)
+    finally:
+        pool.close()
+
+
+@overload
+def resolve_sharded(
+    inputs: Iterable[str],
+    processes: int = DEFAULT_PROCESSES,
+    timeout: float = 5.0,
+    workers: int = DEFAULT_WORKERS,
+    use_async: bool = False,
+    ordered: bool = False,
+    session: Optional[ResolverSession] = None,
+    cache_size: Optional[int] = None,
+    cache_file: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_method: Optional[str] = "spawn",
+    max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    reverse: bool = False,
+    *,
+    render: None = None,
+) -> Iterator[ShardResult]: ...
+
+
+@overload
+def resolve_sharded(
+    inputs: Iterable[str],
+    processes: int = DEFAULT_PROCESSES,
+    timeout: float = 5.0,
+    workers: int = DEFAULT_WORKERS,
+    use_async: bool = False,
+    ordered: bool = False,
+    session: Optional[ResolverSession] = None,
+    cache_size: Optional[int] = None,
+    cache_file: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_method: Optional[str] = "spawn",
+    max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    reverse: bool = False,
+    *,
+    render: Callable[[ShardResult], _T],
+) -> Iterator[_T]: ...
+
+
+def resolve_sharded(
+    inputs: Iterable[str],
+    processes: int = DEFAULT_PROCESSES,
+    timeout: float = 5.0,
+    workers: int = DEFAULT_WORKERS,
+    use_async: bool = False,
+    ordered: bool = False,
+    session: Optional[ResolverSession] = None,
+    cache_size: Optional[int] = None,
+    cache_file: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_method: Optional[str] = "spawn",
+    max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    reverse: bool = False,
+    *,
+    render: Optional[Callable[[ShardResult], Any]] = None,
+) -> Iterator[Any]:
+    """Resolve raw inputs on ``processes`` worker processes.
+
+    ``inputs`` is consumed lazily and one :class:`ShardResult` is yielded
+    per input line, as batches complete or, with ``ordered``, in input
+    order. Each worker resolves with ``workers`` threads (or that many
+    in-flight lookups with ``use_async``) using a copy of ``session``'s
+    configuration. Inputs are assigned to workers by host, ignoring case,
+    a trailing dot and URL parts, so each worker's in-memory cache of
+    ``cache_size`` entries (default ``DEFAULT_SHARD_CACHE_SIZE``, 0
+    disables it) or the shared on-disk ``cache_file`` serves repeated
+    hosts however they are commonly spelled; both keep NXDOMAIN and empty
+    answers for at most ``max_negative_ttl`` seconds. Worker metrics are
+    merged into :func:`~domain_ip_converter.get_metrics` when the run
+    completes. With ``reverse`` the inputs are IP addresses and their
+    host names (PTR records) are looked up instead.
+
+    With ``render``, each worker passes its results through this
+    picklable callable and its return values are yielded instead, so
+    per-result work such as encoding output also runs in the workers.
+
+    Memory stays bounded: at most ``BATCHES_PER_WORKER`` batches of
+    ``batch_size`` lines per worker are read ahead of the results.
+    """
+
+    if processes < 1:
+        raise ValueError("processes must be at least 1.")
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    options = _ShardOptions(
+        _session_args(
+            session or ResolverSession(timeout=timeout), processes
+        ),
+        timeout,
+        workers,
+        use_async,
+        DEFAULT_SHARD_CACHE_SIZE if cache_size is None else cache_size,
+        cache_file,
+        render,
+        max_negative_ttl,
+        reverse,
+    )
+    return _run_shards(
+        inputs, processes, options, ordered, batch_size, start_method
+    )
@@ -0,0 +1,107 @@
+"""Coalesce concurrent calls that share a key into one execution.
+
+The first caller for a key runs the work; callers arriving while it is in
+flight wait for the same outcome, including any exception. Nothing is
+remembered once the call completes -- caching is a separate concern.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    NamedTuple,
+    Tuple,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+class FlightStats(NamedTuple):
+    executed: int
+    shared: int
+
+
+class SingleFlight(Generic[T]):
+    """Duplicate-call suppression for threads and asyncio tasks.
+
+    Threaded callers (:meth:`do`) and coroutines (:meth:`do_async`) are
+    tracked separately; coroutines only share work with other coroutines
+    on the same event loop. A cancelled waiter does not cancel the shared
+    call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[T]"] = {}
+        self._tasks: Dict[Tuple[int, Hashable], "asyncio.Future[T]"] = {}
+        self._executed = 0
+        self._shared = 0
+
+    def stats(self) -> FlightStats:
+        """Return how many calls ran and how many piggybacked on them."""
+
+        with self._lock:
+            return FlightStats(self._executed, self._shared)
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                self._executed += 1
+                leader = True
+            else:
+                self._shared += 1
+                leader = False
+        if not leader:
+            return call.result()
+
+        try:
+            result = func()
+        except BaseException as exc:
+            call.set_exception(exc)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(
+        self, key: Hashable, func: Callable[[], Awaitable[T]]
+    ) -> T:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = asyncio.ensure_future(func())
+                self._tasks[task_key] = task
+                self._executed += 1
+
+                def _done(finished: "asyncio.Future[T]") -> None:
+                    with self._lock:
+                        self._tasks.pop(task_key, None)
+                    if not finished.cancelled():
+                        # Mark the exception retrieved even if every
+                        # waiter was cancelled before it arrived.
+                        finished.exception()
+
+                task.add_done_callback(_done)
+            else:
+                self._shared += 1
+        return await asyncio.shield(task)
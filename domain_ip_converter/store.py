@@ -0,0 +1,326 @@
+"""Persistent SQLite-backed resolution cache shared across runs."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from types import TracebackType
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from .cache import (
+    DEFAULT_MAX_NEGATIVE_TTL,
+    DEFAULT_MAX_TTL,
+    DEFAULT_NEGATIVE_TTL,
+    DEFAULT_TTL,
+    cache_key,
+    is_negative,
+    names_key,
+)
+from .errors import NXDomainError
+from .results import ResolveResult
+
+DEFAULT_BATCH_SIZE = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    host TEXT PRIMARY KEY,
+    ipv4 TEXT NOT NULL,
+    ipv6 TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    nxdomain INTEGER NOT NULL DEFAULT 0,
+    names TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID
+"""
+# Columns that older databases lack, with the statement adding each:
+# nxdomain came with negative caching, names with reverse lookups.
+_MIGRATIONS = {
+    "nxdomain": (
+        "ALTER TABLE results ADD COLUMN nxdomain INTEGER NOT NULL DEFAULT 0"
+    ),
+    "names": "ALTER TABLE results ADD COLUMN names TEXT NOT NULL DEFAULT ''",
+}
+
+_Row = Tuple[str, str, str, float, int, str]
+
+
+def _join(ips: List[str]) -> str:
+    return " ".join(ips)
+
+
+def _split(value: str) -> List[str]:
+    return value.split() if value else []
+
+
+class PersistentCache:
+    """On-disk cache of :class:`ResolveResult` entries with expiry times.
+
+    Host names from reverse lookups are stored alongside, keyed as in
+    :class:`~domain_ip_converter.cache.ResolverCache`.
+
+    The database runs in WAL mode so any number of threads and processes
+    can read concurrently. Each thread gets its own read connection;
+    writes are buffered and committed in a single transaction once
+    ``batch_size`` entries are pending, or on :meth:`flush`/:meth:`close`.
+    A batch is swapped out of the buffer before it is written, so lookups
+    never wait for a commit.
+    Expiry timestamps use wall-clock time so they survive restarts.
+    Negative answers are stored too, for their SOA negative TTL (or
+    ``default_negative_ttl``) capped at ``max_negative_ttl``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        default_ttl: float = DEFAULT_TTL,
+        max_ttl: float = DEFAULT_MAX_TTL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        clock: Callable[[], float] = time.time,
+        default_negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_negative_ttl: float = DEFAULT_MAX_NEGATIVE_TTL,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.default_negative_ttl = default_negative_ttl
+        self.max_negative_ttl = max_negative_ttl
+        self.batch_size = batch_size
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # _pending_lock guards the buffers and is all readers take;
+        # _commit_lock serializes use of the writer connection.
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pending: Dict[str, _Row] = {}
+        self._flushing: Dict[str, _Row] = {}
+        self._closed = False
+
+        writer = self._connect()
+        writer.execute("PRAGMA journal_mode=WAL")
+        writer.execute("PRAGMA synchronous=NORMAL")
+        writer.execute(_SCHEMA)
+        columns = {
+            row[1] for row in writer.execute("PRAGMA table_info(results)")
+        }
+        for column, migration in _MIGRATIONS.items():
+            if column not in columns:
+                writer.execute(migration)
+        writer.commit()
+        self._writer = writer
+
+    def __enter__(self) -> "PersistentCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, timeout=30.0, check_same_thread=False
+        )
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection]
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def _row(self, host: str, key: str) -> Optional[_Row]:
+        """Return the unexpired row stored under ``key``, if any.
+
+        Raises :class:`~domain_ip_converter.errors.NXDomainError` if the
+        row records that ``host`` does not exist.
+        """
+
+        with self._pending_lock:
+            row: Optional[_Row] = self._pending.get(key)
+            if row is None:
+                row = self._flushing.get(key)
+        if row is None:
+            row = self._reader().execute(
+                "SELECT host, ipv4, ipv6, expires_at, nxdomain, names "
+                "FROM results WHERE host = ?",
+                (key,),
+            ).fetchone()
+        if row is None or row[3] <= self._clock():
+            return None
+        if row[4]:
+            raise NXDomainError(host)
+        return row
+
+    def get(
+        self, host: str, family: Optional[int] = None
+    ) -> Optional[ResolveResult]:
+        """Return the unexpired stored result for ``host``, if any.
+
+        Raises :class:`~domain_ip_converter.errors.NXDomainError` while
+        ``host`` is stored as nonexistent.
+        """
+
+        row = self._row(host, cache_key(host, family))
+        if row is None:
+            return None
+        return ResolveResult(ipv4=_split(row[1]), ipv6=_split(row[2]))
+
+    def get_names(self, name: str) -> Optional[List[str]]:
+        """Return the stored host names for reverse ``name``, if any.
+
+        Raises :class:`~domain_ip_converter.errors.NXDomainError` while
+        ``name`` is stored as nonexistent.
+        """
+
+        row = self._row(name, names_key(name))
+        return None if row is None else _split(row[5])
+
+    def set(
+        self,
+        host: str,
+        result: ResolveResult,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        """Queue ``result`` for ``host``; it is written with the next batch."""
+
+        if is_negative(result):
+            ttl = self._negative_ttl(ttl)
+        else:
+            ttl = min(self.default_ttl if ttl is None else ttl, self.max_ttl)
+        self._queue(
+            cache_key(host, family),
+            ttl,
+            ipv4=_join(result.ipv4),
+            ipv6=_join(result.ipv6),
+        )
+
+    def set_nxdomain(
+        self,
+        host: str,
+        ttl: Optional[float] = None,
+        family: Optional[int] = None,
+    ) -> None:
+        """Queue a record that ``host`` does not exist."""
+
+        self._queue(
+            cache_key(host, family), self._negative_ttl(ttl), nxdomain=True
+        )
+
+    def set_names(
+        self,
+        name: str,
+        names: Optional[Sequence[str]],
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Queue the host ``names`` of reverse ``name``.
+
+        ``None`` records that ``name`` does not exist.
+        """
+
+        if names:
+            ttl = min(self.default_ttl if ttl is None else ttl, self.max_ttl)
+        else:
+            ttl = self._negative_ttl(ttl)
+        self._queue(
+            names_key(name),
+            ttl,
+            nxdomain=names is None,
+            names=_join(list(names or ())),
+        )
+
+    def _negative_ttl(self, ttl: Optional[float]) -> float:
+        if ttl is None:
+            ttl = self.default_negative_ttl
+        return min(ttl, self.max_negative_ttl)
+
+    def _queue(
+        self,
+        key: str,
+        ttl: float,
+        ipv4: str = "",
+        ipv6: str = "",
+        nxdomain: bool = False,
+        names: str = "",
+    ) -> None:
+        if ttl <= 0:
+            return
+
+        expires_at = self._clock() + ttl
+        row = (key, ipv4, ipv6, expires_at, int(nxdomain), names)
+        with self._pending_lock:
+            self._pending[key] = row
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._flush(self.batch_size)
+
+    def _flush(self, min_rows: int = 1) -> None:
+        """Commit the buffer if it holds at least ``min_rows`` entries.
+
+        The batch stays visible to readers in ``_flushing`` until it is
+        committed; if the write fails it goes back into the buffer.
+        """
+
+        with self._commit_lock:
+            with self._pending_lock:
+                if len(self._pending) < min_rows:
+                    return
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            try:
+                with self._writer:
+                    self._writer.executemany(
+                        "INSERT OR REPLACE INTO results "
+                        "(host, ipv4, ipv6, expires_at, nxdomain, names) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        list(batch.values()),
+                    )
+            except BaseException:
+                with self._pending_lock:
+                    for key, row in batch.items():
+                        self._pending.setdefault(key, row)
+                raise
+            finally:
+                with self._pending_lock:
+                    self._flushing = {}
+
+    def flush(self) -> None:
+        """Commit all buffered writes."""
+
+        self._flush()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows and return how many were removed."""
+
+        with self._commit_lock:
+            with self._writer:
+                cursor = self._writer.execute(
+                    "DELETE FROM results WHERE expires_at <= ?",
+                    (self._clock(),),
+                )
+        return int(cursor.rowcount)
+
+    def close(self) -> None:
+        """Flush pending writes, drop expired rows and close connections."""
+
+        if self._closed:
+            return
+        self.flush()
+        self.purge_expired()
+        self._closed = True
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
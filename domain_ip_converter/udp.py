@@ -0,0 +1,667 @@
+"""Pipelined DNS client multiplexing many queries over a few UDP sockets.
+
+A single dispatcher thread owns the sockets: callers submit queries from
+any thread and get a :class:`concurrent.futures.Future` back, so thousands
+of lookups can be in flight without one thread (or one socket) per query.
+Responses are matched by socket, transaction ID, source address and
+question; lost datagrams are retransmitted with exponential backoff,
+rotating across nameservers, and truncated answers are retried over TCP.
+Optionally, a query the first nameserver has not answered within a hedge
+delay is also sent to the next one, and the first answer wins. With a
+:class:`~domain_ip_converter.health.NameserverHealth` tracker, each query
+tries the nameservers in health order instead of round-robin. With a
+:class:`~domain_ip_converter.ratelimit.RateLimiter`, first attempts wait
+for their slot on a timer instead of leaving in a burst.
+"""
+
+from __future__ import annotations
+
+import heapq
+import ipaddress
+import itertools
+import queue
+import secrets
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from .errors import DNSTimeoutError, ResolutionError
+from .health import NameserverHealth
+from .hedge import DEFAULT_HEDGE_MAX_RATE, check_hedge
+from .metrics import get_metrics
+from .ratelimit import RateLimiter
+from .wire import (
+    RCODE_REFUSED,
+    RCODE_SERVFAIL,
+    Message,
+    WireFormatError,
+    decode_message,
+    encode_query,
+)
+
+DEFAULT_MAX_IN_FLIGHT = 512
+DEFAULT_RETRY_INTERVAL = 0.5
+DEFAULT_SOCKETS = 2
+# Unused hedge budget carried over, in queries.
+HEDGE_BURST = 10.0
+# First-attempt latencies kept for percentile-based hedge delays, and
+# how many must be seen before the percentile is trusted.
+HEDGE_SAMPLES = 1024
+HEDGE_MIN_SAMPLES = 64
+RESOLV_CONF = "/etc/resolv.conf"
+
+_MAX_PENDING_PER_SOCKET = 60000
+_RECV_SIZE = 65535
+_TCP_WORKERS = 8
+
+_Address = Tuple[str, int]
+_Key = Tuple[int, int]
+# (when, sequence, query, is_hedge)
+_Timer = Tuple[float, int, "_Query", bool]
+# (send at, sequence, query) for first attempts waiting on the limiter.
+_Paced = Tuple[float, int, "_Query"]
+
+
+def system_nameservers(path: str = RESOLV_CONF) -> List[str]:
+    """Return the ``nameserver`` entries of ``path`` (loopback if none)."""
+
+    servers: List[str] = []
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    servers.append(parts[1].split("%")[0])
+    except OSError:
+        pass
+    return servers or ["127.0.0.1"]
+
+
+class _Query:
+    __slots__ = (
+        "name",
+        "rdtype",
+        "future",
+        "deadline",
+        "interval",
+        "attempts",
+        "keys",
+        "via_tcp",
+        "active",
+        "route",
+        "targets",
+        "judged",
+        "sent_at",
+        "hedged",
+    )
+
+    def __init__(
+        self, name: str, rdtype: int, deadline: float, interval: float
+    ) -> None:
+        self.name = name
+        self.rdtype = rdtype
+        self.future: "Future[Message]" = Future()
+        self.deadline = deadline
+        self.interval = interval
+        self.attempts = 0
+        self.keys: List[_Key] = []
+        self.via_tcp = False
+        self.active = False
+        self.route: Sequence[int] = ()
+        # (server index, send time) per entry of ``keys``.
+        self.targets: List[Tuple[int, float]] = []
+        self.judged = 0
+        self.sent_at = 0.0
+        self.hedged = False
+
+
+def _settle(
+    query: _Query,
+    result: Optional[Message] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    try:
+        if error is not None:
+            query.future.set_exception(error)
+        else:
+            query.future.set_result(result)  # type: ignore[arg-type]
+    except InvalidStateError:
+        pass  # Already settled or cancelled by the caller.
+
+
+def _count_hedge(result: str) -> None:
+    get_metrics().incr("hedged_queries_total", labels=(("result", result),))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Connection closed by nameserver.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def tcp_query(wire: bytes, server: _Address, timeout: float) -> bytes:
+    """Send ``wire`` over TCP (RFC 1035 4.2.2) and return the response."""
+
+    with socket.create_connection(server, timeout=timeout) as sock:
+        sock.sendall(struct.pack("!H", len(wire)) + wire)
+        (length,) = struct.unpack("!H", _recv_exact(sock, 2))
+        return _recv_exact(sock, length)
+
+
+class UDPEngine:
+    """Asynchronous DNS query engine backed by one dispatcher thread.
+
+    ``sockets`` UDP sockets are opened per address family in use; each can
+    carry up to ~60k outstanding transaction IDs. ``retry_interval`` is
+    the first retransmit delay and doubles on every retry until the
+    query's deadline. At most ``max_in_flight`` queries are on the wire
+    at once; later submissions wait in a FIFO queue so a large burst does
+    not overrun the nameserver's receive buffer and trigger a storm of
+    retransmits. A query's timeout includes its time in that queue.
+
+    With ``hedge_delay`` (seconds) or ``hedge_percentile`` (of recent
+    first-attempt latencies, floored at ``hedge_delay`` when both are
+    given), a query still unanswered after that long is sent to the next
+    nameserver too, and whichever answers first wins. Hedges are capped
+    at ``hedge_max_rate`` of queries sent, with a small carried-over
+    budget, so a slow upstream cannot double the query load.
+
+    Without ``health``, first attempts rotate across the nameservers. With
+    it, every query walks the servers in the tracker's current order and
+    each attempt's latency, timeout or SERVFAIL/REFUSED is reported back;
+    the tracker must cover exactly ``nameservers``.
+
+    With a ``limiter``, each query claims a slot for its first attempt and
+    is sent when the slot comes up, to the server free soonest among the
+    first in its route; a query that could not be sent before its
+    deadline fails at once with :class:`DNSTimeoutError`. Queries waiting
+    for their slot count against ``max_in_flight``. Retransmits and
+    hedges are sent without waiting but still count against the limits.
+    """
+
+    def __init__(
+        self,
+        nameservers: Sequence[str],
+        port: int = 53,
+        sockets: int = DEFAULT_SOCKETS,
+        retry_interval: float = DEFAULT_RETRY_INTERVAL,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_max_rate: float = DEFAULT_HEDGE_MAX_RATE,
+        health: Optional[NameserverHealth] = None,
+        limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        if not nameservers:
+            raise ValueError("At least one nameserver is required.")
+        if sockets < 1:
+            raise ValueError("sockets must be at least 1.")
+        if retry_interval <= 0:
+            raise ValueError("retry_interval must be greater than 0.")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        check_hedge(hedge_delay, hedge_percentile, hedge_max_rate)
+        if health is not None and health.servers != list(nameservers):
+            raise ValueError("health must track the same nameservers.")
+
+        self.servers: List[_Address] = [
+            (str(ipaddress.ip_address(server)), port) for server in nameservers
+        ]
+        self.retry_interval = retry_interval
+        self.max_in_flight = max_in_flight
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_max_rate = hedge_max_rate
+        self.health = health
+        self.limiter = limiter
+        self._names = list(nameservers)
+        self._name_index = {name: i for i, name in enumerate(self._names)}
+        count = len(self.servers)
+        self._rotations = [
+            tuple((start + step) % count for step in range(count))
+            for start in range(count)
+        ]
+        self._server_set = set(self.servers)
+        self._hedging = len(self.servers) > 1 and (
+            hedge_delay is not None or hedge_percentile is not None
+        )
+        self._hedge_budget = HEDGE_BURST
+        self._latencies: Deque[float] = deque(maxlen=HEDGE_SAMPLES)
+        self._fresh_samples = 0
+        self._percentile_delay: Optional[float] = None
+
+        self._selector = selectors.DefaultSelector()
+        self._sockets: List[socket.socket] = []
+        self._socket_load: List[int] = []
+        self._family_sockets: Dict[int, List[int]] = {}
+        families = {
+            socket.AF_INET6 if ":" in host else socket.AF_INET
+            for host, _ in self.servers
+        }
+        for family in sorted(families):
+            for _ in range(sockets):
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                sock.bind(("::" if family == socket.AF_INET6 else "", 0))
+                index = len(self._sockets)
+                self._sockets.append(sock)
+                self._socket_load.append(0)
+                self._family_sockets.setdefault(family, []).append(index)
+                self._selector.register(sock, selectors.EVENT_READ, index)
+
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._selector.register(
+            self._wake_reader, selectors.EVENT_READ, None
+        )
+
+        self._submissions: "queue.SimpleQueue[_Query]" = queue.SimpleQueue()
+        self._finished: "queue.SimpleQueue[_Query]" = queue.SimpleQueue()
+        self._waiting: Deque[_Query] = deque()
+        self._in_flight = 0
+        self._wake_pending = False
+        self._pending: Dict[_Key, _Query] = {}
+        self._timers: List[_Timer] = []
+        self._paced: List[_Paced] = []
+        self._sequence = itertools.count()
+        self._next_socket = itertools.count()
+        self._server_offset = itertools.count()
+        self._tcp_pool: Optional[ThreadPoolExecutor] = None
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dns-udp-engine", daemon=True
+        )
+        self._thread.start()
+
+    def submit(
+        self, name: str, rdtype: int, timeout: float
+    ) -> "Future[Message]":
+        """Queue a query; the future resolves to the decoded response.
+
+        The future fails with :class:`DNSTimeoutError` once ``timeout``
+        seconds pass without a usable answer.
+        """
+
+        if self._closed.is_set():
+            raise ResolutionError("UDP engine is closed.")
+        query = _Query(
+            name.rstrip(".").lower(),
+            rdtype,
+            time.monotonic() + timeout,
+            self.retry_interval,
+        )
+        self._submissions.put(query)
+        if not self._wake_pending:
+            self._wake_pending = True
+            self._wake()
+        return query.future
+
+    def query(self, name: str, rdtype: int, timeout: float) -> Message:
+        """Blocking helper around :meth:`submit`."""
+
+        return self.submit(name, rdtype, timeout).result()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake()
+        self._thread.join()
+        if self._tcp_pool is not None:
+            self._tcp_pool.shutdown(wait=False)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_writer.send(b"\x00")
+        except (BlockingIOError, OSError):
+            pass  # A wake-up is already pending or the engine is closing.
+
+    def _run(self) -> None:
+        try:
+            while not self._closed.is_set():
+                delay = None
+                due = [
+                    heap[0][0] for heap in (self._timers, self._paced) if heap
+                ]
+                if due:
+                    delay = max(min(due) - time.monotonic(), 0.0)
+                for key, _ in self._selector.select(delay):
+                    if key.data is None:
+                        self._drain_wakeups()
+                    else:
+                        self._drain_socket(key.data)
+                self._fire_timers()
+                self._send_paced()
+                self._start_submissions()
+        finally:
+            self._shutdown()
+
+    def _drain_wakeups(self) -> None:
+        # Read the wake-up bytes, then clear the flag, then read the
+        # queues. A submission racing with this either lands before the
+        # flag is cleared, and is picked up by this loop iteration, or
+        # after it and sends a fresh byte; clearing first would let the
+        # reads swallow that byte and leave the flag stuck.
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        self._wake_pending = False
+        while True:
+            try:
+                self._release(self._finished.get_nowait())
+            except queue.Empty:
+                break
+
+    def _start_submissions(self) -> None:
+        while True:
+            try:
+                self._waiting.append(self._submissions.get_nowait())
+            except queue.Empty:
+                break
+        now = time.monotonic()
+        while self._waiting and self._in_flight < self.max_in_flight:
+            query = self._waiting.popleft()
+            if query.future.done():
+                continue
+            if query.deadline <= now:
+                _settle(query, error=self._timeout(query))
+                continue
+            query.active = True
+            self._in_flight += 1
+            query.route = self._route()
+            if self.limiter is not None:
+                wait = self._reserve(query, now)
+                if wait is None:
+                    self._release(query)
+                    _settle(query, error=self._timeout(query))
+                    continue
+                if wait > 0:
+                    heapq.heappush(
+                        self._paced, (now + wait, next(self._sequence), query)
+                    )
+                    continue
+            self._start(query)
+
+    def _reserve(self, query: _Query, now: float) -> Optional[float]:
+        limiter = self.limiter
+        assert limiter is not None
+        query.route = sorted(
+            query.route, key=lambda target: limiter.delay(self._names[target])
+        )
+        return limiter.reserve(
+            self._names[query.route[0]], query.deadline - now
+        )
+
+    def _send_paced(self) -> None:
+        now = time.monotonic()
+        while self._paced and self._paced[0][0] <= now:
+            _, _, query = heapq.heappop(self._paced)
+            if query.future.done():
+                self._release(query)  # Cancelled while it waited.
+            else:
+                self._start(query)
+
+    def _start(self, query: _Query) -> None:
+        self._send(query)
+        self._schedule(query.deadline, query)
+        if self._hedging:
+            delay = self._current_hedge_delay()
+            if delay is not None:
+                self._schedule(query.sent_at + delay, query, hedge=True)
+
+    def _schedule(
+        self, when: float, query: _Query, hedge: bool = False
+    ) -> None:
+        heapq.heappush(
+            self._timers, (when, next(self._sequence), query, hedge)
+        )
+
+    def _current_hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return self.hedge_delay
+        if self._fresh_samples >= HEDGE_MIN_SAMPLES:
+            self._fresh_samples = 0
+            ordered = sorted(self._latencies)
+            rank = int(len(ordered) * self.hedge_percentile / 100)
+            self._percentile_delay = ordered[min(rank, len(ordered) - 1)]
+        if self._percentile_delay is None:
+            return self.hedge_delay
+        return max(self._percentile_delay, self.hedge_delay or 0.0)
+
+    def _hedge(self, query: _Query) -> None:
+        # Only hedge a first attempt; a retransmit already moved on.
+        if query.via_tcp or query.attempts != 1:
+            return
+        if self._hedge_budget < 1:
+            _count_hedge("capped")
+            return
+        self._hedge_budget -= 1
+        query.hedged = True
+        _count_hedge("sent")
+        self._send(query, retry=False)
+
+    def _allocate(self, family: int) -> Optional[_Key]:
+        candidates = self._family_sockets[family]
+        for _ in range(len(candidates)):
+            index = candidates[next(self._next_socket) % len(candidates)]
+            if self._socket_load[index] >= _MAX_PENDING_PER_SOCKET:
+                continue  # pragma: no cover - needs 60k in-flight queries
+            while True:
+                key = (index, secrets.randbits(16))
+                if key not in self._pending:
+                    return key
+        return None  # pragma: no cover
+
+    def _route(self) -> Sequence[int]:
+        if self.health is None:
+            offset = next(self._server_offset) % len(self.servers)
+            return self._rotations[offset]
+        return [self._name_index[name] for name in self.health.order()]
+
+    def _send(self, query: _Query, retry: bool = True) -> None:
+        if query.attempts == 0:
+            query.sent_at = time.monotonic()
+            self._hedge_budget = min(
+                self._hedge_budget + self.hedge_max_rate, HEDGE_BURST
+            )
+        target = query.route[query.attempts % len(query.route)]
+        server = self.servers[target]
+        if query.attempts and self.limiter is not None:
+            self.limiter.charge(self._names[target])
+        query.attempts += 1
+        family = socket.AF_INET6 if ":" in server[0] else socket.AF_INET
+        key = self._allocate(family)
+        if key is None:  # pragma: no cover
+            error = ResolutionError("Too many DNS queries in flight.")
+            self._release(query)
+            _settle(query, error=error)
+            return
+
+        try:
+            wire = encode_query(key[1], query.name, query.rdtype)
+        except (WireFormatError, UnicodeError) as exc:
+            error = ResolutionError(
+                f"DNS resolution failed for '{query.name}'."
+            )
+            error.__cause__ = exc
+            self._release(query)
+            _settle(query, error=error)
+            return
+
+        self._pending[key] = query
+        self._socket_load[key[0]] += 1
+        query.keys.append(key)
+        query.targets.append((target, time.monotonic()))
+        try:
+            self._sockets[key[0]].sendto(wire, server)
+        except OSError:
+            pass  # Treated like a lost datagram: the retry timer resends.
+
+        if not retry:
+            return
+        retry_at = time.monotonic() + query.interval
+        query.interval *= 2
+        if retry_at < query.deadline:
+            self._schedule(retry_at, query)
+
+    def _drain_socket(self, index: int) -> None:
+        sock = self._sockets[index]
+        while True:
+            try:
+                data, address = sock.recvfrom(_RECV_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return  # e.g. ICMP port unreachable surfaced on Linux.
+            if len(data) < 2 or (address[0], address[1]) not in (
+                self._server_set
+            ):
+                continue
+            txid = struct.unpack("!H", data[:2])[0]
+            query = self._pending.get((index, txid))
+            if query is None or query.future.done():
+                continue
+            try:
+                message = decode_message(data)
+            except WireFormatError:
+                continue
+            if not message.is_response or message.question != (
+                query.name,
+                query.rdtype,
+            ):
+                continue
+            self._judge(query, (index, txid), message.rcode)
+            if message.truncated:
+                self._fallback_to_tcp(query, address)
+                continue
+            self._observe(query, (index, txid))
+            self._release(query)
+            _settle(query, message)
+
+    def _observe(self, query: _Query, key: _Key) -> None:
+        if key == query.keys[0]:
+            self._latencies.append(time.monotonic() - query.sent_at)
+            self._fresh_samples += 1
+        elif query.hedged and key == query.keys[1]:
+            _count_hedge("won")
+
+    def _judge(self, query: _Query, key: _Key, rcode: int) -> None:
+        if self.health is None or query.judged >= len(query.targets):
+            return
+        target, sent = query.targets[query.keys.index(key)]
+        query.judged = len(query.targets)
+        name = self._names[target]
+        if rcode in (RCODE_SERVFAIL, RCODE_REFUSED):
+            self.health.record_failure(name)
+        else:
+            self.health.record_success(name, time.monotonic() - sent)
+
+    def _expire(self, query: _Query) -> None:
+        # Every attempt still unanswered when the query retries or gives
+        # up counts as a timeout against the server it went to.
+        if self.health is None:
+            return
+        for target, _ in query.targets[query.judged:]:
+            self.health.record_failure(self._names[target])
+        query.judged = len(query.targets)
+
+    def _fallback_to_tcp(self, query: _Query, address: _Address) -> None:
+        if query.via_tcp:
+            return
+        query.via_tcp = True
+        if self._tcp_pool is None:
+            self._tcp_pool = ThreadPoolExecutor(
+                max_workers=_TCP_WORKERS, thread_name_prefix="dns-tcp"
+            )
+        self._tcp_pool.submit(self._query_tcp, query, address[:2])
+
+    def _query_tcp(self, query: _Query, server: _Address) -> None:
+        remaining = query.deadline - time.monotonic()
+        if remaining <= 0:
+            return  # The deadline timer reports the timeout.
+        txid = secrets.randbits(16)
+        try:
+            data = tcp_query(
+                encode_query(txid, query.name, query.rdtype), server, remaining
+            )
+            message = decode_message(data)
+        except (OSError, WireFormatError, struct.error):
+            return  # Let the deadline timer fail the query.
+        if message.txid == txid:
+            _settle(query, message)
+            # Hand the slot back on the dispatcher thread, which owns it.
+            self._finished.put(query)
+            self._wake_pending = True
+            self._wake()
+
+    def _release(self, query: _Query) -> None:
+        for key in query.keys:
+            if self._pending.pop(key, None) is not None:
+                self._socket_load[key[0]] -= 1
+        query.keys.clear()
+        query.targets.clear()
+        query.judged = 0
+        if query.active:
+            query.active = False
+            self._in_flight -= 1
+
+    @staticmethod
+    def _timeout(query: _Query) -> DNSTimeoutError:
+        return DNSTimeoutError(f"DNS resolution timed out for '{query.name}'.")
+
+    def _fire_timers(self) -> None:
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            when, _, query, hedge = heapq.heappop(self._timers)
+            if query.future.done():
+                self._release(query)
+                continue
+            if hedge:
+                self._hedge(query)
+            elif when >= query.deadline:
+                if not query.via_tcp:
+                    self._expire(query)
+                self._release(query)
+                _settle(query, error=self._timeout(query))
+            elif not query.via_tcp:
+                self._expire(query)
+                self._send(query)
+
+    def _shutdown(self) -> None:
+        error = ResolutionError("UDP engine is closed.")
+        while True:
+            try:
+                self._waiting.append(self._submissions.get_nowait())
+            except queue.Empty:
+                break
+        for query in self._waiting:
+            _settle(query, error=error)
+        self._waiting.clear()
+        for _, _, query in self._paced:
+            _settle(query, error=error)
+        self._paced.clear()
+        pending: Set[int] = set()
+        for query in list(self._pending.values()):
+            if id(query) not in pending:
+                pending.add(id(query))
+                _settle(query, error=error)
+        self._pending.clear()
+        self._timers.clear()
+        self._selector.close()
+        for sock in self._sockets:
+            sock.close()
+        self._wake_reader.close()
+        self._wake_writer.close()
@@ -4,12 +4,19 @@ from __future__ import annotations
 
 import ipaddress
 import re
-from typing import Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urlsplit
 
 from .errors import InvalidInputError
 
 _HOST_LABEL_RE = re.compile(r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)$")
+# A whole LDH hostname in one pass; labels as in _HOST_LABEL_RE.
+_HOSTNAME_RE = re.compile(
+    r"(?:(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.)*(?!-)[A-Za-z0-9-]{1,63}(?<!-)",
+    re.ASCII,
+)
+
+DEFAULT_MEMO_SIZE = 65536
 
 
 def _split_url(value: str) -> Tuple[str, str]:
@@ -46,15 +53,22 @@ def is_ip_address(value: str) -> bool:
     return True
 
 
-def normalize_domain(raw: str) -> str:
-    """Normalize a raw input into a hostname or literal IP string.
+def _fast_host(raw: str) -> Optional[str]:
+    """Normalize a plain ASCII hostname without URL parsing or IDNA.
 
-    Accepts:
-        - Hostnames (including IDNs)
-        - IPv4 / IPv6 literal addresses
-        - http/https URLs (with credentials, port, path)
+    Returns ``None`` when ``raw`` needs the full path. Dotted-quad inputs
+    take this path too: they come out unchanged either way.
     """
 
+    host = raw.strip()
+    if host.endswith("."):
+        host = host[:-1]
+    if len(host) > 253 or not _HOSTNAME_RE.fullmatch(host):
+        return None
+    return host.lower()
+
+
+def _normalize_full(raw: str) -> str:
     host, _scheme = _split_url(raw)
     host = host.strip().rstrip(".")
     if host.startswith("[") and host.endswith("]"):
@@ -63,8 +77,11 @@ def normalize_domain(raw: str) -> str:
     if not host:
         raise InvalidInputError("Host is empty after normalization.")
 
-    if is_ip_address(host):
-        return str(ipaddress.ip_address(host))
+    if ":" in host or host[0].isdigit():
+        try:
+            return str(ipaddress.ip_address(host))
+        except ValueError:
+            pass
 
     try:
         ascii_host = (
@@ -78,6 +95,10 @@ def normalize_domain(raw: str) -> str:
     if len(ascii_host) > 253:
         raise InvalidInputError("Hostname exceeds 253 characters.")
 
+    if _HOSTNAME_RE.fullmatch(ascii_host):
+        return ascii_host
+
+    # Invalid: find the offending label for the error message.
     labels = ascii_host.split(".")
     if any(not label for label in labels):
         raise InvalidInputError("Hostname contains empty labels.")
@@ -89,3 +110,87 @@ def normalize_domain(raw: str) -> str:
             )
 
     return ascii_host
+
+
+def normalize_domain(raw: str) -> str:
+    """Normalize a raw input into a hostname or literal IP string.
+
+    Accepts:
+        - Hostnames (including IDNs)
+        - IPv4 / IPv6 literal addresses
+        - http/https URLs (with credentials, port, path)
+    """
+
+    fast = _fast_host(raw)
+    if fast is not None:
+        return fast
+    return _normalize_full(raw)
+
+
+def normalize_many(
+    values: Iterable[str], memo_size: int = DEFAULT_MEMO_SIZE
+) -> List[Union[str, InvalidInputError]]:
+    """Normalize many raw inputs, as :func:`normalize_domain` would.
+
+    The returned list is aligned with ``values``; invalid inputs are
+    returned as the :class:`InvalidInputError` instead of aborting the
+    batch. Results for repeated inputs are memoized, up to ``memo_size``
+    distinct values at a time.
+    """
+
+    memo: Dict[str, Union[str, InvalidInputError]] = {}
+    normalized: List[Union[str, InvalidInputError]] = []
+    for raw in values:
+        result = memo.get(raw)
+        if result is None:
+            result = _fast_host(raw)
+            if result is None:
+                try:
+                    result = _normalize_full(raw)
+                except InvalidInputError as exc:
+                    result = exc
+            if len(memo) >= memo_size:
+                memo.clear()
+            memo[raw] = result
+        normalized.append(result)
+    return normalized
+
+
+def normalize_address(raw: str) -> str:
+    """Normalize a raw input into a canonical IPv4 or IPv6 address.
+
+    Surrounding whitespace and IPv6 brackets are stripped, and so is a
+    zone index (``fe80::1%eth0``), which has no place in a reverse name.
+    """
+
+    value = raw.strip()
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    try:
+        return str(ipaddress.ip_address(value.partition("%")[0]))
+    except ValueError:
+        raise InvalidInputError(f"Invalid IP address: '{value}'.") from None
+
+
+def normalize_addresses(
+    values: Iterable[str], memo_size: int = DEFAULT_MEMO_SIZE
+) -> List[Union[str, InvalidInputError]]:
+    """Normalize many raw inputs, as :func:`normalize_address` would.
+
+    Aligned with ``values`` and memoized like :func:`normalize_many`.
+    """
+
+    memo: Dict[str, Union[str, InvalidInputError]] = {}
+    normalized: List[Union[str, InvalidInputError]] = []
+    for raw in values:
+        result = memo.get(raw)
+        if result is None:
+            try:
+                result = normalize_address(raw)
+            except InvalidInputError as exc:
+                result = exc
+            if len(memo) >= memo_size:
+                memo.clear()
+            memo[raw] = result
+        normalized.append(result)
+    return normalized
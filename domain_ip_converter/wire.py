@@ -0,0 +1,260 @@
+"""Minimal DNS wire-format encoding and decoding (RFC 1035).
+
+Only what the built-in UDP engine needs is supported: single-question
+queries with an EDNS0 OPT record, and responses carrying A, AAAA, CNAME,
+PTR and SOA records. Other record types are kept as raw rdata.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import struct
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_CNAME = 5
+TYPE_SOA = 6
+TYPE_PTR = 12
+TYPE_AAAA = 28
+TYPE_OPT = 41
+
+CLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_FORMERR = 1
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_RA = 0x0080
+
+EDNS_PAYLOAD_SIZE = 1232
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR_FIXED = struct.Struct("!HHIH")
+_QUESTION_FIXED = struct.Struct("!HH")
+_SOA_TIMERS = struct.Struct("!IIIII")
+_MAX_POINTER_HOPS = 64
+_NAME_TYPES = (TYPE_NS, TYPE_CNAME, TYPE_PTR)
+
+
+class WireFormatError(ValueError):
+    """Raised when a DNS message cannot be encoded or decoded."""
+
+
+class Record(NamedTuple):
+    """One resource record.
+
+    ``value`` is the address or name for A, AAAA, NS, CNAME and PTR
+    records, and empty for other types or an A/AAAA record whose data
+    has the wrong length.
+    """
+
+    name: str
+    rdtype: int
+    ttl: int
+    value: str
+    rdata: bytes = b""
+
+
+class Message(NamedTuple):
+    txid: int
+    flags: int
+    question: Optional[Tuple[str, int]]
+    answers: Sequence[Record] = ()
+    authority: Sequence[Record] = ()
+
+    @property
+    def rcode(self) -> int:
+        return self.flags & 0x000F
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.flags & FLAG_TC)
+
+    @property
+    def is_response(self) -> bool:
+        return bool(self.flags & FLAG_QR)
+
+    def negative_ttl(self) -> Optional[int]:
+        """Return the RFC 2308 negative-caching TTL from the SOA, if any."""
+
+        for record in self.authority:
+            if record.rdtype == TYPE_SOA and len(record.rdata) >= 4:
+                minimum = int(struct.unpack("!I", record.rdata[-4:])[0])
+                return min(record.ttl, minimum)
+        return None
+
+
+def encode_name(name: str) -> bytes:
+    name = name.rstrip(".")
+    if not name:
+        return b"\x00"
+    parts = []
+    for label in name.split("."):
+        raw = label.encode("ascii")
+        if not raw or len(raw) > 63:
+            raise WireFormatError(f"Invalid DNS label in '{name}'.")
+        parts.append(bytes((len(raw),)) + raw)
+    encoded = b"".join(parts) + b"\x00"
+    if len(encoded) > 255:
+        raise WireFormatError(f"DNS name too long: '{name}'.")
+    return encoded
+
+
+def encode_query(txid: int, name: str, rdtype: int) -> bytes:
+    """Encode a recursive query with an EDNS0 OPT record."""
+
+    header = _HEADER.pack(txid, FLAG_RD, 1, 0, 0, 1)
+    question = encode_name(name) + _QUESTION_FIXED.pack(rdtype, CLASS_IN)
+    opt = b"\x00" + _RR_FIXED.pack(TYPE_OPT, EDNS_PAYLOAD_SIZE, 0, 0)
+    return header + question + opt
+
+
+def _encode_rdata(rdtype: int, value: str) -> bytes:
+    if rdtype == TYPE_A:
+        return ipaddress.IPv4Address(value).packed
+    if rdtype == TYPE_AAAA:
+        return ipaddress.IPv6Address(value).packed
+    if rdtype in _NAME_TYPES:
+        return encode_name(value)
+    return value.encode("ascii")
+
+
+def encode_response(
+    query: Message,
+    answers: Sequence[Tuple[int, int, str]] = (),
+    rcode: int = RCODE_NOERROR,
+    truncated: bool = False,
+    negative_ttl: Optional[int] = None,
+) -> bytes:
+    """Encode a response to ``query``.
+
+    ``answers`` holds ``(rdtype, ttl, value)`` tuples owned by the question
+    name. When ``negative_ttl`` is set an SOA record carrying it is added
+    to the authority section. Intended for test and benchmark servers.
+    """
+
+    if query.question is None:
+        raise WireFormatError("Query has no question.")
+    qname, qtype = query.question
+    owner = encode_name(qname)
+
+    flags = FLAG_QR | FLAG_RD | FLAG_RA | (rcode & 0x000F)
+    if truncated:
+        flags |= FLAG_TC
+        answers = ()
+
+    body = [owner + _QUESTION_FIXED.pack(qtype, CLASS_IN)]
+    for rdtype, ttl, value in answers:
+        rdata = _encode_rdata(rdtype, value)
+        body.append(
+            owner + _RR_FIXED.pack(rdtype, CLASS_IN, ttl, len(rdata)) + rdata
+        )
+
+    authority = 0
+    if negative_ttl is not None:
+        rdata = (
+            encode_name("ns." + qname)
+            + encode_name("hostmaster." + qname)
+            + _SOA_TIMERS.pack(1, 3600, 600, 86400, negative_ttl)
+        )
+        body.append(
+            owner
+            + _RR_FIXED.pack(TYPE_SOA, CLASS_IN, negative_ttl, len(rdata))
+            + rdata
+        )
+        authority = 1
+
+    header = _HEADER.pack(query.txid, flags, 1, len(answers), authority, 0)
+    return header + b"".join(body)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    labels: List[str] = []
+    end = -1
+    hops = 0
+    while True:
+        if offset >= len(data):
+            raise WireFormatError("Name runs past end of message.")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise WireFormatError("Truncated compression pointer.")
+            if end < 0:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            hops += 1
+            if hops > _MAX_POINTER_HOPS:
+                raise WireFormatError("Compression pointer loop.")
+            continue
+        if length & 0xC0:
+            raise WireFormatError("Unsupported label type.")
+        offset += 1
+        if length == 0:
+            break
+        label = data[offset:offset + length]
+        if len(label) != length:
+            raise WireFormatError("Label runs past end of message.")
+        labels.append(label.decode("ascii", "replace").lower())
+        offset += length
+    return ".".join(labels), (end if end >= 0 else offset)
+
+
+def _read_record(data: bytes, offset: int) -> Tuple[Record, int]:
+    name, offset = _read_name(data, offset)
+    if offset + _RR_FIXED.size > len(data):
+        raise WireFormatError("Truncated resource record.")
+    rdtype, _rdclass, ttl, rdlength = _RR_FIXED.unpack_from(data, offset)
+    offset += _RR_FIXED.size
+    end = offset + rdlength
+    if end > len(data):
+        raise WireFormatError("Truncated record data.")
+    rdata = data[offset:end]
+
+    value = ""
+    if rdtype == TYPE_A and rdlength == 4:
+        value = str(ipaddress.IPv4Address(rdata))
+    elif rdtype == TYPE_AAAA and rdlength == 16:
+        value = str(ipaddress.IPv6Address(rdata))
+    elif rdtype in _NAME_TYPES:
+        value, _ = _read_name(data, offset)
+    elif rdtype == TYPE_SOA:
+        # Keep only the fixed timers; the two names may be compressed.
+        rdata = rdata[-_SOA_TIMERS.size:]
+    return Record(name, rdtype, ttl, value, rdata), end
+
+
+def decode_message(data: bytes) -> Message:
+    """Decode a DNS message, skipping the additional section."""
+
+    if len(data) < _HEADER.size:
+        raise WireFormatError("Message shorter than header.")
+    txid, flags, qdcount, ancount, nscount, _ = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+
+    question: Optional[Tuple[str, int]] = None
+    for _ in range(qdcount):
+        qname, offset = _read_name(data, offset)
+        if offset + _QUESTION_FIXED.size > len(data):
+            raise WireFormatError("Truncated question.")
+        qtype, _qclass = _QUESTION_FIXED.unpack_from(data, offset)
+        offset += _QUESTION_FIXED.size
+        if question is None:
+            question = (qname, qtype)
+
+    answers: List[Record] = []
+    for _ in range(ancount):
+        record, offset = _read_record(data, offset)
+        answers.append(record)
+
+    authority: List[Record] = []
+    for _ in range(nscount):
+        record, offset = _read_record(data, offset)
+        authority.append(record)
+
+    return Message(txid, flags, question, answers, authority)
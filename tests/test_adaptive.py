@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+from domain_ip_converter import adaptive
+from domain_ip_converter.adaptive import AdaptiveConcurrency
+from domain_ip_converter.metrics import Metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch: pytest.MonkeyPatch) -> Metrics:
+    registry = Metrics()
+    monkeypatch.setattr(adaptive, "get_metrics", lambda: registry)
+    return registry
+
+
+def _window(
+    controller: AdaptiveConcurrency, latency: float, timeouts: int = 0
+) -> None:
+    size = max(controller.limit, adaptive.MIN_WINDOW)
+    for index in range(size):
+        controller.record(latency, timed_out=index < timeouts)
+
+
+def test_slow_start_doubles_up_to_maximum(metrics: Metrics) -> None:
+    controller = AdaptiveConcurrency(minimum=2, maximum=40, initial=5)
+    limits = []
+    for _ in range(5):
+        _window(controller, 0.01)
+        limits.append(controller.limit)
+    assert limits == [10, 20, 40, 40, 40]
+    assert metrics.snapshot().counter(
+        "concurrency_changes_total",
+        (("direction", "up"), ("reason", "slow_start")),
+    ) == 3
+
+
+def test_timeouts_cut_limit_then_grow_additively(
+    metrics: Metrics, caplog: pytest.LogCaptureFixture
+) -> None:
+    controller = AdaptiveConcurrency(minimum=4, maximum=100, initial=32)
+    with caplog.at_level(logging.INFO, logger=adaptive.__name__):
+        _window(controller, 0.01, timeouts=4)
+    assert controller.limit == 16
+    assert "concurrency 32 -> 16" in caplog.text
+    assert "timed out" in caplog.text
+
+    with caplog.at_level(logging.INFO, logger=adaptive.__name__):
+        _window(controller, 0.01)
+    assert controller.limit == 17
+    assert "concurrency 16 -> 17" in caplog.text
+    for _ in range(5):
+        _window(controller, 0.01, timeouts=10)
+    assert controller.limit == 4
+
+
+def test_latency_rise_cuts_limit(metrics: Metrics) -> None:
+    controller = AdaptiveConcurrency(maximum=64, initial=16)
+    _window(controller, 0.01)
+    assert controller.limit == 32
+    _window(controller, 0.05)
+    assert controller.limit == 16
+    assert metrics.snapshot().counter(
+        "concurrency_changes_total",
+        (("direction", "down"), ("reason", "latency")),
+    ) == 1
+
+
+def test_invalid_settings() -> None:
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(minimum=0)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(minimum=10, maximum=5)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(decrease=1.0)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(latency_tolerance=1.0)
+    assert AdaptiveConcurrency(minimum=3, maximum=5, initial=100).limit == 5
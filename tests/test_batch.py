@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from domain_ip_converter import batch
+from domain_ip_converter.errors import InvalidInputError, ResolutionError
+from domain_ip_converter.resolver import ResolveResult
+
+
+def test_plan_inputs_groups_by_normalized_host() -> None:
+    plan = batch.plan_inputs(
+        [
+            "Example.com",
+            "https://example.com/a",
+            "http://-bad.host/",
+            "example.org",
+            "example.com.",
+        ]
+    )
+    assert list(plan.hosts) == ["example.com", "example.org"]
+    assert plan.hosts["example.com"] == [
+        "Example.com",
+        "https://example.com/a",
+        "example.com.",
+    ]
+    assert isinstance(plan.normalized[2], InvalidInputError)
+
+
+def test_resolve_many_resolves_each_host_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = []
+    lock = threading.Lock()
+
+    def fake_resolve(host: str, **kwargs) -> ResolveResult:
+        with lock:
+            calls.append(host)
+        if host == "missing.example":
+            raise ResolutionError("Domain does not exist.")
+        return ResolveResult(ipv4=["203.0.113.5"], ipv6=[])
+
+    monkeypatch.setattr(batch, "resolve_host", fake_resolve)
+    inputs = ["https://example.com/x"] * 50 + [
+        "EXAMPLE.com",
+        "missing.example",
+        "bad..host",
+        "missing.example",
+    ]
+
+    outcomes = batch.resolve_many(inputs, workers=8)
+
+    assert sorted(calls) == ["example.com", "missing.example"]
+    assert len(outcomes) == len(inputs)
+    assert outcomes[0] is outcomes[50]
+    assert outcomes[0].ipv4 == ["203.0.113.5"]
+    assert isinstance(outcomes[51], ResolutionError)
+    assert isinstance(outcomes[52], InvalidInputError)
+    assert outcomes[53] is outcomes[51]
+
+
+def test_resolve_many_empty_and_invalid_workers() -> None:
+    assert batch.resolve_many([]) == []
+    with pytest.raises(ValueError):
+        batch.resolve_many(["example.com"], workers=0)
+
+
+def test_resolve_reverse_many_looks_up_each_address_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = []
+
+    def fake_reverse(address: str, **kwargs) -> list:
+        calls.append(address)
+        return [f"host-{address.replace(':', '-')}.example"]
+
+    monkeypatch.setattr(batch, "resolve_reverse", fake_reverse)
+    inputs = ["192.0.2.1", " 192.0.2.1 ", "[2001:DB8::1]", "example.com"]
+
+    outcomes = batch.resolve_reverse_many(inputs, workers=2)
+
+    assert sorted(calls) == ["192.0.2.1", "2001:db8::1"]
+    assert outcomes[0] == ["host-192.0.2.1.example"]
+    assert outcomes[1] is outcomes[0]
+    assert outcomes[2] == ["host-2001-db8--1.example"]
+    assert isinstance(outcomes[3], InvalidInputError)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from domain_ip_converter import cache as cache_module
+from domain_ip_converter.cache import ResolverCache, install_cache
+from domain_ip_converter.errors import NXDomainError
+from domain_ip_converter.resolver import ResolveResult
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _result(ip: str) -> ResolveResult:
+    return ResolveResult(ipv4=[ip], ipv6=[])
+
+
+def test_cache_hit_and_normalized_key() -> None:
+    cache = ResolverCache()
+    cache.set("Example.COM.", _result("203.0.113.1"), ttl=60)
+
+    assert cache.get("example.com") == _result("203.0.113.1")
+    assert cache.hits == 1
+    assert cache.get("example.org") is None
+    assert cache.misses == 1
+
+
+def test_cache_respects_ttl() -> None:
+    clock = _Clock()
+    cache = ResolverCache(clock=clock)
+    cache.set("example.com", _result("203.0.113.1"), ttl=30)
+
+    clock.now += 29
+    assert cache.get("example.com") is not None
+    clock.now += 2
+    assert cache.get("example.com") is None
+    assert len(cache) == 0
+
+
+def test_cache_clamps_ttl_and_uses_default() -> None:
+    clock = _Clock()
+    cache = ResolverCache(default_ttl=10, min_ttl=5, max_ttl=20, clock=clock)
+    cache.set("short.example", _result("203.0.113.1"), ttl=1)
+    cache.set("long.example", _result("203.0.113.2"), ttl=3600)
+    cache.set("unknown.example", _result("203.0.113.3"))
+
+    clock.now += 4
+    assert cache.get("short.example") is not None
+    clock.now += 2
+    assert cache.get("short.example") is None
+    assert cache.get("unknown.example") is not None
+    clock.now += 5
+    assert cache.get("unknown.example") is None
+    assert cache.get("long.example") is not None
+    clock.now += 10
+    assert cache.get("long.example") is None
+
+
+def test_cache_zero_ttl_is_not_stored() -> None:
+    cache = ResolverCache()
+    cache.set("example.com", _result("203.0.113.1"), ttl=0)
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction() -> None:
+    cache = ResolverCache(max_entries=2)
+    cache.set("a.example", _result("203.0.113.1"), ttl=60)
+    cache.set("b.example", _result("203.0.113.2"), ttl=60)
+    assert cache.get("a.example") is not None
+    cache.set("c.example", _result("203.0.113.3"), ttl=60)
+
+    assert cache.get("b.example") is None
+    assert cache.get("a.example") is not None
+    assert cache.get("c.example") is not None
+
+
+def test_cache_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        ResolverCache(max_entries=0)
+    with pytest.raises(ValueError):
+        ResolverCache(min_ttl=10, max_ttl=5)
+    with pytest.raises(ValueError):
+        ResolverCache(max_negative_entries=0)
+    with pytest.raises(ValueError):
+        ResolverCache(max_negative_ttl=-1)
+
+
+def test_cache_negative_entries() -> None:
+    clock = _Clock()
+    cache = ResolverCache(max_negative_ttl=120, clock=clock)
+    empty = ResolveResult(ipv4=[], ipv6=[])
+    cache.set_nxdomain("Gone.example", ttl=30)
+    cache.set("empty.example", empty, ttl=3600)
+    cache.set("default.example", empty)
+
+    with pytest.raises(NXDomainError, match="gone.example"):
+        cache.get("gone.example")
+    assert cache.get("empty.example") == empty
+    assert cache.hits == 2
+
+    clock.now += 31
+    assert cache.get("gone.example") is None
+    assert cache.get("default.example") is not None
+    clock.now += cache_module.DEFAULT_NEGATIVE_TTL
+    assert cache.get("default.example") is None
+    assert cache.get("empty.example") is not None  # Capped at 120s.
+    clock.now += 60
+    assert cache.get("empty.example") is None
+
+
+def test_cache_negative_entries_have_separate_capacity() -> None:
+    cache = ResolverCache(max_entries=2, max_negative_entries=1)
+    cache.set("a.example", _result("203.0.113.1"), ttl=60)
+    cache.set("b.example", _result("203.0.113.2"), ttl=60)
+    for index in range(5):
+        cache.set_nxdomain(f"dead{index}.example", ttl=60)
+
+    assert len(cache) == 3
+    assert cache.get("a.example") is not None
+    assert cache.get("b.example") is not None
+    assert cache.get("dead3.example") is None
+    with pytest.raises(NXDomainError):
+        cache.get("dead4.example")
+
+    cache.set("dead4.example", _result("203.0.113.4"), ttl=60)
+    assert cache.get("dead4.example") == _result("203.0.113.4")
+    cache.set_nxdomain("a.example", ttl=60)
+    with pytest.raises(NXDomainError):
+        cache.get("a.example")
+
+
+def test_cache_names_are_kept_apart_from_addresses() -> None:
+    clock = _Clock()
+    cache = ResolverCache(clock=clock)
+    name = "1.2.0.192.in-addr.arpa"
+    cache.set_names(name, ["host.example"], ttl=60)
+    cache.set_names("2.2.0.192.in-addr.arpa", None, ttl=60)
+    cache.set_names("3.2.0.192.in-addr.arpa", [], ttl=10)
+
+    assert cache.get_names(name.upper()) == ["host.example"]
+    assert cache.get(name) is None
+    with pytest.raises(NXDomainError):
+        cache.get_names("2.2.0.192.in-addr.arpa")
+    assert cache.get_names("3.2.0.192.in-addr.arpa") == []
+
+    cache.set(name, _result("203.0.113.1"), ttl=60)
+    assert cache.get_names(name) == ["host.example"]
+    clock.now += 11
+    assert cache.get_names("3.2.0.192.in-addr.arpa") is None
+
+
+def test_cache_thread_safety() -> None:
+    cache = ResolverCache(max_entries=50)
+
+    def worker(offset: int) -> None:
+        for index in range(500):
+            host = f"h{(index + offset) % 80}.example"
+            cache.set(host, _result("203.0.113.1"), ttl=60)
+            cache.get(host)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 50
+
+
+def test_install_cache_returns_previous() -> None:
+    first = ResolverCache()
+    assert install_cache(first) is None
+    try:
+        assert cache_module.get_installed_cache() is first
+        assert install_cache(None) is first
+    finally:
+        install_cache(None)
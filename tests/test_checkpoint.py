@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import pytest
+
+from domain_ip_converter.checkpoint import Checkpoint
+from domain_ip_converter.errors import (
+    CheckpointError,
+    DNSTimeoutError,
+    InvalidInputError,
+    NXDomainError,
+    ResolutionError,
+)
+from domain_ip_converter.results import ResolveResult
+
+
+def test_checkpoint_roundtrip(tmp_path) -> None:
+    path = str(tmp_path / "run.journal")
+    ok = ResolveResult(["192.0.2.1"], ["2001:db8::1"])
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.resumed == 0
+        checkpoint.record("a.example", ok)
+        checkpoint.record("b.example", "Domain does not exist: 'b.example'.")
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.resumed == 2
+        assert list(checkpoint.results.items()) == [
+            ("a.example", ok),
+            ("b.example", "Domain does not exist: 'b.example'."),
+        ]
+        checkpoint.record("c.example", ResolveResult())
+
+    with Checkpoint(path) as checkpoint:
+        assert len(checkpoint.results) == 3
+        assert checkpoint.results.get("c.example") == ResolveResult()
+
+
+def test_checkpoint_writes_in_batches(tmp_path) -> None:
+    path = tmp_path / "run.journal"
+    checkpoint = Checkpoint(str(path), batch_size=2, interval=3600)
+    header = path.read_text()
+
+    checkpoint.record("a.example", ResolveResult(["192.0.2.1"]))
+    assert path.read_text() == header
+    checkpoint.record("b.example", ResolveResult(["192.0.2.2"]))
+    assert len(path.read_text().splitlines()) == 3
+    checkpoint.record("c.example", ResolveResult(["192.0.2.3"]))
+    checkpoint.close()
+    checkpoint.close()
+    assert len(path.read_text().splitlines()) == 4
+
+
+def test_checkpoint_drops_torn_final_record(tmp_path) -> None:
+    path = tmp_path / "run.journal"
+    with Checkpoint(str(path), reverse=True) as checkpoint:
+        checkpoint.record("192.0.2.1", ["host.example"])
+    with path.open("a") as handle:
+        handle.write('{"host": "192.0.2.2", "na')
+
+    with Checkpoint(str(path), reverse=True) as checkpoint:
+        assert checkpoint.results.get("192.0.2.1") == ["host.example"]
+        assert "192.0.2.2" not in checkpoint.results
+        checkpoint.record("192.0.2.3", [])
+    with Checkpoint(str(path), reverse=True) as checkpoint:
+        assert list(checkpoint.results) == ["192.0.2.1", "192.0.2.3"]
+
+
+def test_checkpoint_rejects_other_runs_and_corruption(tmp_path) -> None:
+    path = tmp_path / "run.journal"
+    Checkpoint(str(path)).close()
+    with pytest.raises(CheckpointError, match="reverse run"):
+        Checkpoint(str(path), reverse=True)
+
+    with path.open("a") as handle:
+        handle.write("not json\n")
+    with pytest.raises(CheckpointError, match=":2: corrupt record"):
+        Checkpoint(str(path))
+
+    other = tmp_path / "other.txt"
+    other.write_text("example.com\n")
+    with pytest.raises(CheckpointError, match="not a checkpoint"):
+        Checkpoint(str(other))
+    with pytest.raises(ValueError):
+        Checkpoint(str(tmp_path / "new.journal"), batch_size=0)
+
+
+def test_checkpoint_skips_transient_failures(tmp_path) -> None:
+    path = str(tmp_path / "run.journal")
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record("slow.example", DNSTimeoutError("timed out"))
+        checkpoint.record("flaky.example", ResolutionError("SERVFAIL"))
+        checkpoint.record("gone.example", NXDomainError("gone.example"))
+        checkpoint.record("a..b", InvalidInputError("Invalid domain."))
+
+    with Checkpoint(path) as checkpoint:
+        assert list(checkpoint.results.items()) == [
+            ("gone.example", "Domain does not exist: 'gone.example'."),
+            ("a..b", "Invalid domain."),
+        ]
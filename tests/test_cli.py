@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import io
+import json
+import subprocess
 import sys
+import threading
+import time
 
 import pytest
 
-from domain_ip_converter import cli
+from domain_ip_converter import cli, resolver
+from domain_ip_converter.cache import get_installed_cache
+from domain_ip_converter.errors import (
+    DNSTimeoutError,
+    NXDomainError,
+    ResolutionError,
+)
 from domain_ip_converter.resolver import ResolveResult
 
 
@@ -25,6 +36,41 @@ def test_cli_json_output(
     assert "203.0.113.1" in output
 
 
+def test_cli_json_is_streamed_in_json_dumps_format(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        if host == "bad.example":
+            raise ResolutionError("DNS resolution failed for 'bad.example'.")
+        return ResolveResult(ipv4=["203.0.113.1"], ipv6=["2001:db8::1"])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    inputs = ["example.com", "bad.example", "Example.com", "a..b"]
+    assert cli.main(inputs + ["--json", "--emit-inputs"]) == 0
+    expected = {
+        "example.com": {
+            "ipv4": ["203.0.113.1"],
+            "ipv6": ["2001:db8::1"],
+            "inputs": ["example.com", "Example.com"],
+        },
+        "bad.example": {
+            "error": "DNS resolution failed for 'bad.example'.",
+            "inputs": ["bad.example"],
+        },
+    }
+    output = capsys.readouterr().out
+    results = json.loads(output)
+    assert results.pop("a..b")["inputs"] == ["a..b"]
+    assert results == expected
+    assert output == json.dumps(json.loads(output), indent=2) + "\n"
+
+    empty = io.StringIO()
+    cli._write_json(cli.ResultSet(), empty)
+    assert empty.getvalue() == json.dumps({}, indent=2) + "\n"
+
+
 def test_cli_text_output(
     monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
 ) -> None:
@@ -117,6 +163,60 @@ def test_cli_invalid_concurrency(
     assert "--concurrency must be at least 1" in err
 
 
+def test_cli_rate_limits(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    sessions = []
+    install = cli.install_session
+
+    def capture(session):
+        sessions.append(session)
+        return install(session)
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.1"], ipv6=[])
+
+    monkeypatch.setattr(cli, "install_session", capture)
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    args = ["example.com", "--qps", "50", "--nameserver-qps", "20"]
+    assert cli.main(args) == 0
+    limiter = sessions[0].rate_limiter
+    assert (limiter.qps, limiter.nameserver_qps) == (50, 20)
+
+    assert cli.main(["example.com", "--qps", "0"]) == 2
+    assert "--qps must be greater than 0" in capsys.readouterr().err
+    assert cli.main(["example.com", "--nameserver-qps", "-1"]) == 2
+    assert "--nameserver-qps must be" in capsys.readouterr().err
+
+
+def test_cli_processes_split_rate_limits(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from domain_ip_converter import shard
+
+    captured = []
+
+    class FakePool:
+        def __init__(self, processes, options, *args) -> None:
+            captured.append((processes, options.session))
+
+        def run(self, inputs):
+            return iter([])
+
+        def close(self) -> None:
+            pass
+
+    monkeypatch.setattr(shard, "_ShardPool", FakePool)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    args = ["example.com", "--processes", "4", "--json"]
+    assert cli.main(args + ["--qps", "100", "--nameserver-qps", "40"]) == 0
+    processes, session = captured[0]
+    assert processes == 4
+    assert (session["qps"], session["nameserver_qps"]) == (25, 10)
+
+
 def test_cli_file_input(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
     def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
         return ResolveResult(ipv4=["203.0.113.12"], ipv6=[])
@@ -132,3 +232,821 @@ def test_cli_file_input(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
 
     code = cli.main(["--file", str(file_path)])
     assert code == 0
+
+
+def test_cli_async_engine(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    async def fake_resolve_many(hosts, timeout: float = 5.0, concurrency=1):
+        assert concurrency == 500
+        return [ResolveResult(ipv4=["203.0.113.20"], ipv6=[]) for _ in hosts]
+
+    monkeypatch.setattr(cli, "resolve_many_async", fake_resolve_many)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        ["example.com", "http://-bad.host/", "--async", "--concurrency", "500"]
+    )
+    assert code == 0
+    output = capsys.readouterr().out
+    assert "203.0.113.20" in output
+    assert "Invalid hostname label" in output
+
+
+def test_cli_cache_size_shares_results(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    calls = []
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        installed = get_installed_cache()
+        assert installed is not None
+        cached = installed.get(host)
+        if cached is not None:
+            return cached
+        calls.append(host)
+        result = ResolveResult(ipv4=["203.0.113.30"], ipv6=[])
+        installed.set(host, result)
+        return result
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        ["example.com", "https://example.com/", "--cache-size", "10"]
+    )
+    assert code == 0
+    assert calls == ["example.com"]
+    assert get_installed_cache() is None
+
+
+def test_cli_invalid_cache_size(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    code = cli.main(["example.com", "--cache-size", "-1"])
+    assert code == 2
+    assert "--cache-size must not be negative" in capsys.readouterr().err
+
+
+def test_cli_cache_file_reused_across_runs(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    calls = []
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        installed = get_installed_cache()
+        assert installed is not None
+        cached = installed.get(host)
+        if cached is not None:
+            return cached
+        calls.append(host)
+        result = ResolveResult(ipv4=["203.0.113.40"], ipv6=[])
+        installed.set(host, result, 300)
+        return result
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    cache_file = str(tmp_path / "cache.sqlite")
+
+    assert cli.main(["example.com", "--cache-file", cache_file]) == 0
+    assert cli.main(["example.com", "--cache-file", cache_file]) == 0
+    assert calls == ["example.com"]
+
+
+def test_cli_cache_file_error(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    bad_path = str(tmp_path / "missing-dir" / "cache.sqlite")
+
+    code = cli.main(["example.com", "--cache-file", bad_path])
+    assert code == 2
+    assert "Cache error" in capsys.readouterr().err
+
+
+def test_cli_nameserver_installs_session(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    seen = []
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        seen.append(resolver.get_session())
+        return ResolveResult(ipv4=["203.0.113.50"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(cli, "HAS_DNSPYTHON", True)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    monkeypatch.setattr(resolver, "_default_session", None)
+
+    code = cli.main(
+        [
+            "example.com",
+            "example.org",
+            "--nameserver",
+            "192.0.2.53",
+            "--nameserver",
+            "192.0.2.54",
+        ]
+    )
+    assert code == 0
+    assert seen[0] is seen[1]
+    assert seen[0].nameservers == ["192.0.2.53", "192.0.2.54"]
+    assert resolver._default_session is None
+
+
+def test_cli_nameserver_requires_dnspython(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(cli, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(["example.com", "--nameserver", "192.0.2.53"])
+    assert code == 2
+    assert "--nameserver requires dnspython" in capsys.readouterr().err
+
+
+def test_cli_family_sets_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    families = []
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        families.append(resolver.get_session().family)
+        return ResolveResult(ipv4=["203.0.113.60"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    assert cli.main(["example.com", "--family", "4"]) == 0
+    assert families == [4]
+
+
+def test_cli_hosts_file_pins_names(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    path = tmp_path / "hosts"
+    path.write_text("192.0.2.80 pinned.example *.pinned.example\n")
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    inputs = ["pinned.example", "https://a.pinned.example/"]
+
+    assert cli.main(inputs + ["--hosts", str(path), "--json"]) == 0
+    single = json.loads(capsys.readouterr().out)
+    assert single["a.pinned.example"] == {"ipv4": ["192.0.2.80"], "ipv6": []}
+    code = cli.main(
+        inputs + ["--hosts", str(path), "--json", "--processes", "2"]
+    )
+    assert code == 0
+    assert json.loads(capsys.readouterr().out) == single
+
+    code = cli.main(["192.0.2.80", "--hosts", str(path), "--reverse"])
+    assert code == 0
+    assert "Names: pinned.example" in capsys.readouterr().out
+
+    assert cli.main(["x.example", "--hosts", str(tmp_path / "nope")]) == 2
+    assert "Hosts error" in capsys.readouterr().err
+
+
+def test_cli_checkpoint_resumes_after_a_crash(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    calls = []
+
+    def crashing_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        if host == "c.example":
+            raise RuntimeError("killed")
+        calls.append(host)
+        return ResolveResult(ipv4=["203.0.113.90"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", crashing_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    journal = str(tmp_path / "run.journal")
+    inputs = ["a.example", "B.example", "c.example", "d.example", "a..b"]
+    args = inputs + ["--json", "--concurrency", "1", "--checkpoint", journal]
+
+    with pytest.raises(RuntimeError):
+        cli.main(args)
+    assert calls == ["a.example", "b.example"]
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        calls.append(host)
+        return ResolveResult(ipv4=["203.0.113.91"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    assert cli.main(args + ["--emit-inputs"]) == 0
+    assert calls[2:] == ["c.example", "d.example"]
+    captured = capsys.readouterr()
+    assert "Resuming: 2 hosts already done." in captured.err
+    results = json.loads(captured.out)
+    assert list(results) == [
+        "a.example",
+        "b.example",
+        "c.example",
+        "d.example",
+        "a..b",
+    ]
+    assert results["b.example"] == {
+        "ipv4": ["203.0.113.90"],
+        "ipv6": [],
+        "inputs": ["B.example"],
+    }
+    assert results["d.example"]["ipv4"] == ["203.0.113.91"]
+
+    assert cli.main(inputs + ["--reverse", "--checkpoint", journal]) == 2
+    assert "Checkpoint error" in capsys.readouterr().err
+    assert cli.main(inputs + ["--stream", "--checkpoint", journal]) == 2
+    assert "--checkpoint does not support" in capsys.readouterr().err
+
+
+def test_cli_index_build_and_query(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    answers = {
+        "a.example": ResolveResult(["203.0.113.5"], ["2001:db8::5"]),
+        "b.example": ResolveResult(["203.0.113.5"]),
+        "c.example": ResolveResult(["198.51.100.1"]),
+    }
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return answers[host]
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    index = str(tmp_path / "run.index")
+    assert cli.main(list(answers) + ["--json", "--index", index]) == 0
+    capsys.readouterr()
+
+    query = ["--index", index, "--query-index", "203.0.113.0/24"]
+    assert cli.main(query + ["--query-index", "2001:db8::5", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {
+        "203.0.113.0/24": [
+            {"address": "203.0.113.5", "domains": ["a.example", "b.example"]}
+        ],
+        "2001:db8::5": [{"address": "2001:db8::5", "domains": ["a.example"]}],
+    }
+
+    assert cli.main(query + ["--query-index", "192.0.2.0/24"]) == 0
+    out = capsys.readouterr().out
+    assert "203.0.113.5: a.example, b.example" in out
+    assert "Network: 192.0.2.0/24\n  No matches" in out
+
+    assert cli.main(["--query-index", "192.0.2.1"]) == 2
+    assert cli.main(query[:2] + ["--query-index", "bogus"]) == 2
+    missing = str(tmp_path / "missing.index")
+    assert cli.main(["--index", missing, "--query-index", "192.0.2.1"]) == 2
+    assert cli.main(["a.example", "--stream", "--index", index]) == 2
+    assert "Index error" in capsys.readouterr().err
+
+
+def test_cli_checkpoint_retries_timeouts_on_resume(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    calls = []
+
+    def outage(host: str, timeout: float = 5.0) -> ResolveResult:
+        calls.append(host)
+        if host == "gone.example":
+            raise NXDomainError(host)
+        raise DNSTimeoutError(f"DNS resolution timed out for '{host}'.")
+
+    monkeypatch.setattr(cli, "resolve_host", outage)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    journal = str(tmp_path / "run.journal")
+    args = ["a.example", "gone.example", "--json", "--checkpoint", journal]
+    assert cli.main(args) == 0
+    assert "timed out" in json.loads(capsys.readouterr().out)["a.example"][
+        "error"
+    ]
+
+    def recovered(host: str, timeout: float = 5.0) -> ResolveResult:
+        calls.append(host)
+        return ResolveResult(ipv4=["203.0.113.93"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", recovered)
+    assert cli.main(args) == 0
+    assert sorted(calls) == ["a.example", "a.example", "gone.example"]
+    captured = capsys.readouterr()
+    assert "Resuming: 1 hosts already done." in captured.err
+    results = json.loads(captured.out)
+    assert results["a.example"]["ipv4"] == ["203.0.113.93"]
+    assert "does not exist" in results["gone.example"]["error"]
+
+
+def test_cli_checkpoint_async_journals_each_result(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    async def fake_resolve_async(
+        host: str, timeout: float = 5.0
+    ) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.92"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host_async", fake_resolve_async)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    journal = tmp_path / "run.journal"
+    inputs = [f"h{index}.example" for index in range(5)]
+
+    code = cli.main(inputs + ["--async", "--checkpoint", str(journal)])
+    assert code == 0
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    assert sorted(record["host"] for record in records[1:]) == inputs
+
+
+def test_cli_stream_ndjson_from_file(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.70"], ipv6=[])
+
+    file_path = tmp_path / "domains.txt"
+    file_path.write_text(
+        "example.com\n# comment\nhttp://-bad.host/\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: True)
+
+    code = cli.main(["--file", str(file_path), "example.org", "--stream"])
+    assert code == 0
+    lines = capsys.readouterr().out.splitlines()
+    records = {item["domain"]: item for item in map(json.loads, lines)}
+    assert len(lines) == 3
+    assert records["example.com"]["ipv4"] == ["203.0.113.70"]
+    assert records["example.org"]["ipv6"] == []
+    assert "error" in records["http://-bad.host/"]
+
+
+def test_cli_stream_reads_stdin_lazily(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    lines_read = []
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    class _Stdin:
+        def __iter__(self):
+            for index in range(50):
+                lines_read.append(index)
+                yield f"host{index}.example\n"
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.001)
+        with lock:
+            in_flight[0] -= 1
+        return ResolveResult(ipv4=["203.0.113.71"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys, "stdin", _Stdin())
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(["--file", "-", "--stream", "--concurrency", "3"])
+    assert code == 0
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == 50
+    assert len(lines_read) == 50
+    assert peak[0] <= 3
+
+
+def test_cli_stream_async(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    async def fake_resolve_async(
+        host: str, timeout: float = 5.0
+    ) -> ResolveResult:
+        if host == "missing.example":
+            raise ResolutionError("Domain does not exist: 'missing.example'.")
+        return ResolveResult(ipv4=[], ipv6=["2001:db8::72"])
+
+    monkeypatch.setattr(cli, "resolve_host_async", fake_resolve_async)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        [
+            "a.example",
+            "missing.example",
+            "http://-bad.host/",
+            "b.example",
+            "--stream",
+            "--async",
+            "--concurrency",
+            "2",
+        ]
+    )
+    assert code == 0
+    output = capsys.readouterr().out
+    records = [json.loads(line) for line in output.splitlines()]
+    by_domain = {item["domain"]: item for item in records}
+    assert by_domain["a.example"]["ipv6"] == ["2001:db8::72"]
+    assert "does not exist" in by_domain["missing.example"]["error"]
+    assert "error" in by_domain["http://-bad.host/"]
+    assert len(records) == 4
+
+
+def test_ndjson_writer_flushes_in_batches() -> None:
+    stream = io.StringIO()
+    writer = cli._NDJSONWriter(stream, batch_size=2, interval=3600)
+
+    writer.write("a.example", {"ipv4": [], "ipv6": []})
+    assert stream.getvalue() == ""
+    writer.write("b.example", {"error": "boom"})
+    assert stream.getvalue().count("\n") == 2
+    writer.write("c.example", {"ipv4": ["192.0.2.1"], "ipv6": []})
+    writer.flush()
+    assert json.loads(stream.getvalue().splitlines()[2]) == {
+        "domain": "c.example",
+        "ipv4": ["192.0.2.1"],
+        "ipv6": [],
+    }
+
+
+def test_cli_backend_sets_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    backends = []
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        backends.append(resolver.get_session().backend_name())
+        return ResolveResult(ipv4=["203.0.113.80"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(cli, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        ["example.com", "--backend", "udp", "--nameserver", "192.0.2.53"]
+    )
+    assert code == 0
+    assert backends == ["udp"]
+
+
+def test_cli_stats_and_metrics_file(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.90"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    path = tmp_path / "ip-converter.prom"
+
+    code = cli.main(
+        [
+            "a.example",
+            "b.example",
+            "--stats",
+            "--metrics-file",
+            str(path),
+            "--concurrency",
+            "2",
+        ]
+    )
+    assert code == 0
+    err = capsys.readouterr().err
+    assert "Resolution stats:" in err
+    assert 'queue_wait_seconds{pool="cli"}: n=2' in err
+    assert "domain_ip_converter_queue_wait_seconds_count" in path.read_text()
+
+
+def test_cli_metrics_file_error(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path,
+) -> None:
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.91"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    missing = tmp_path / "missing" / "out.prom"
+    code = cli.main(["a.example", "--metrics-file", str(missing)])
+    assert code == 2
+    assert "Metrics error" in capsys.readouterr().err
+
+
+def test_cli_resolves_duplicate_hosts_once(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    calls = []
+    lock = threading.Lock()
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        with lock:
+            calls.append(host)
+        return ResolveResult(ipv4=["203.0.113.100"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        [
+            "example.com",
+            "https://user@Example.com/a",
+            "http://example.com:8080/",
+            "example.org",
+            "http://-bad.host/",
+            "--json",
+            "--emit-inputs",
+            "--concurrency",
+            "4",
+        ]
+    )
+    assert code == 0
+    assert sorted(calls) == ["example.com", "example.org"]
+    results = json.loads(capsys.readouterr().out)
+    assert list(results) == ["example.com", "example.org", "http://-bad.host/"]
+    assert results["example.com"]["inputs"] == [
+        "example.com",
+        "https://user@Example.com/a",
+        "http://example.com:8080/",
+    ]
+    assert results["http://-bad.host/"]["inputs"] == ["http://-bad.host/"]
+
+
+def test_cli_emit_inputs_text_output(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.101"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(["Example.com", "example.com.", "--emit-inputs"])
+    assert code == 0
+    assert "Inputs: Example.com, example.com." in capsys.readouterr().out
+
+
+def test_cli_stream_shares_in_flight_lookups(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    calls = []
+    release = threading.Event()
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        calls.append(host)
+        release.wait(1.0)
+        return ResolveResult(ipv4=["203.0.113.102"], ipv6=[])
+
+    class _Stdin:
+        def __iter__(self):
+            for index in range(20):
+                yield f"https://example.com/page{index}\n"
+            release.set()
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(sys, "stdin", _Stdin())
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(["--file", "-", "--stream", "--emit-inputs"])
+    assert code == 0
+    records = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines()
+    ]
+    assert calls == ["example.com"]
+    assert len(records) == 20
+    assert {record["domain"] for record in records} == {"example.com"}
+    assert records[5]["input"].startswith("https://example.com/page")
+
+
+def test_cli_reverse_json_and_text(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    calls = []
+
+    def fake_reverse(address: str, timeout: float = 5.0) -> list:
+        calls.append(address)
+        if address == "192.0.2.9":
+            raise NXDomainError("9.2.0.192.in-addr.arpa")
+        return ["host.example"] if ":" not in address else []
+
+    monkeypatch.setattr(cli, "resolve_reverse", fake_reverse)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    inputs = ["192.0.2.1", "[2001:DB8::1]", "192.0.2.9", "example.com"]
+
+    assert cli.main(inputs + ["--reverse", "--json"]) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert results["192.0.2.1"] == {"names": ["host.example"]}
+    assert results["2001:db8::1"] == {"names": []}
+    assert "does not exist" in results["192.0.2.9"]["error"]
+    assert "Invalid IP address" in results["example.com"]["error"]
+    assert sorted(calls) == ["192.0.2.1", "192.0.2.9", "2001:db8::1"]
+
+    assert cli.main(["192.0.2.1", "2001:db8::1", "--reverse"]) == 0
+    output = capsys.readouterr().out
+    assert "Address: 192.0.2.1\n  Names: host.example" in output
+    assert "Address: 2001:db8::1\n  Names: none" in output
+
+
+def test_cli_reverse_stream_async(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    async def fake_reverse_async(address: str, timeout: float = 5.0) -> list:
+        return [f"host-{address}.example"]
+
+    monkeypatch.setattr(cli, "resolve_reverse_async", fake_reverse_async)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    code = cli.main(
+        ["192.0.2.1", " 192.0.2.1", "bogus", "--reverse", "--stream"]
+        + ["--async", "--emit-inputs"]
+    )
+    assert code == 0
+    records = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines()
+    ]
+    assert len(records) == 3
+    assert {
+        "address": "192.0.2.1",
+        "input": " 192.0.2.1",
+        "names": ["host-192.0.2.1.example"],
+    } in records
+    invalid = [record for record in records if "error" in record]
+    assert invalid[0]["address"] == "bogus"
+
+
+def test_cli_processes_stream_ordered(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    inputs = [f"198.51.100.{index}" for index in range(40)] + ["bad..example"]
+
+    code = cli.main(
+        inputs
+        + ["--stream", "--processes", "2", "--ordered", "--emit-inputs"]
+    )
+    assert code == 0
+    records = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines()
+    ]
+    assert [record["input"] for record in records] == inputs
+    assert records[3] == {
+        "domain": "198.51.100.3",
+        "input": "198.51.100.3",
+        "ipv4": ["198.51.100.3"],
+        "ipv6": [],
+    }
+    assert "error" in records[-1]
+
+
+def test_cli_processes_json_matches_single_process(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+    inputs = ["192.0.2.1", "http://192.0.2.1/", "2001:DB8::1", "bad..example"]
+
+    assert cli.main(inputs + ["--json", "--emit-inputs"]) == 0
+    single = json.loads(capsys.readouterr().out)
+    code = cli.main(inputs + ["--json", "--emit-inputs", "--processes", "2"])
+    assert code == 0
+    sharded = json.loads(capsys.readouterr().out)
+    assert sharded == single
+    assert list(sharded) == list(single)
+    assert sharded["192.0.2.1"]["inputs"] == ["192.0.2.1", "http://192.0.2.1/"]
+
+
+def test_cli_ordered_requires_processes(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    assert cli.main(["example.com", "--stream", "--ordered"]) == 2
+    assert "--ordered requires --processes" in capsys.readouterr().err
+    assert cli.main(["example.com", "--processes", "0"]) == 2
+
+
+def test_cli_concurrency_auto_backs_off_on_timeouts(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def fake_resolve(host: str, timeout: float = 5.0) -> ResolveResult:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            crowded = in_flight[0] > 8
+        time.sleep(0.001)
+        with lock:
+            in_flight[0] -= 1
+        if crowded:
+            raise DNSTimeoutError(f"DNS resolution timed out for '{host}'.")
+        return ResolveResult(ipv4=["203.0.113.120"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host", fake_resolve)
+    monkeypatch.setattr(cli, "answered_locally", lambda: False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    hosts = [f"host{index}.example" for index in range(400)]
+    code = cli.main(
+        hosts
+        + ["--json", "--concurrency", "auto", "--max-concurrency", "32"]
+    )
+    assert code == 0
+    captured = capsys.readouterr()
+    assert len(json.loads(captured.out)) == 400
+    assert peak[0] <= 32
+    assert "concurrency 8 -> 16" in captured.err
+    assert "timed out" in captured.err
+
+
+def test_cli_concurrency_auto_stream_async(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    async def fake_resolve_async(
+        host: str, timeout: float = 5.0
+    ) -> ResolveResult:
+        return ResolveResult(ipv4=["203.0.113.121"], ipv6=[])
+
+    monkeypatch.setattr(cli, "resolve_host_async", fake_resolve_async)
+    monkeypatch.setattr(cli, "answered_locally", lambda: False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    hosts = [f"host{index}.example" for index in range(100)]
+    code = cli.main(hosts + ["--stream", "--async", "--concurrency", "auto"])
+    assert code == 0
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 100
+    assert "concurrency 8 -> 16" in captured.err
+
+
+def test_cli_concurrency_auto_ignores_local_answers(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    samples = []
+
+    class RecordingConcurrency(cli.AdaptiveConcurrency):
+        def record(self, seconds: float, timed_out: bool = False) -> None:
+            samples.append(seconds)
+            super().record(seconds, timed_out)
+
+    monkeypatch.setattr(cli, "AdaptiveConcurrency", RecordingConcurrency)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: False)
+
+    hosts = [f"192.0.2.{index}" for index in range(1, 51)]
+    assert cli.main(hosts + ["--json", "--concurrency", "auto"]) == 0
+    assert len(json.loads(capsys.readouterr().out)) == 50
+    assert samples == []
+
+
+def test_cli_concurrency_auto_validation(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    with pytest.raises(SystemExit):
+        cli.main(["example.com", "--concurrency", "lots"])
+    assert "integer or 'auto'" in capsys.readouterr().err
+    args = ["example.com", "--concurrency", "auto"]
+    bounds = ["--min-concurrency", "9", "--max-concurrency", "3"]
+    assert cli.main(args + bounds) == 2
+    assert cli.main(args + ["--processes", "2"]) == 2
+
+
+def test_cli_hedging_requires_udp_backend(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    assert cli.main(["example.com", "--hedge-delay", "0.05"]) == 2
+    assert "require --backend udp" in capsys.readouterr().err
+    args = ["example.com", "--backend", "udp", "--hedge-max-rate", "3"]
+    assert cli.main(args) == 2
+    assert "hedge_max_rate" in capsys.readouterr().err
+
+
+def test_cli_nameserver_rejects_socket_backend(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    args = ["example.com", "--nameserver", "192.0.2.53"]
+    assert cli.main(args + ["--backend", "socket"]) == 2
+    assert "not supported by --backend socket" in capsys.readouterr().err
+
+
+def test_cli_import_defers_optional_modules() -> None:
+    code = (
+        "import sys, domain_ip_converter.cli\n"
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    loaded = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    for module in (
+        "asyncio",
+        "dataclasses",
+        "dns.resolver",
+        "domain_ip_converter.udp",
+        "multiprocessing",
+        "sqlite3",
+    ):
+        assert module not in loaded
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import pytest
+
+from domain_ip_converter import health
+from domain_ip_converter.health import NameserverHealth
+from domain_ip_converter.metrics import Metrics
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def metrics(monkeypatch: pytest.MonkeyPatch) -> Metrics:
+    registry = Metrics()
+    monkeypatch.setattr(health, "get_metrics", lambda: registry)
+    return registry
+
+
+def test_order_prefers_fastest_and_tries_unmeasured_first() -> None:
+    tracker = NameserverHealth(["192.0.2.1", "192.0.2.2", "192.0.2.3"])
+    assert tracker.order() == ["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+
+    tracker.record_success("192.0.2.1", 0.050)
+    tracker.record_success("192.0.2.2", 0.010)
+    assert tracker.order() == ["192.0.2.3", "192.0.2.2", "192.0.2.1"]
+
+    tracker.record_success("192.0.2.3", 0.030)
+    assert tracker.order() == ["192.0.2.2", "192.0.2.3", "192.0.2.1"]
+
+
+def test_latency_and_failure_rate_are_moving_averages() -> None:
+    tracker = NameserverHealth(["192.0.2.1", "192.0.2.2"], alpha=0.5)
+    tracker.record_success("192.0.2.1", 0.010)
+    tracker.record_success("192.0.2.1", 0.030)
+    tracker.record_failure("192.0.2.1")
+    tracker.record_success("192.0.2.2", 0.015)
+
+    first, second = tracker.stats()
+    assert first.latency == pytest.approx(0.020)
+    assert first.failure_rate == pytest.approx(0.5)
+    assert (first.queries, first.failures) == (3, 1)
+    assert first.consecutive_failures == 1
+    # 20ms inflated by a 50% failure rate ranks behind a clean 15ms.
+    assert tracker.order() == ["192.0.2.2", "192.0.2.1"]
+
+
+def test_repeated_failures_eject_until_probe(metrics: Metrics) -> None:
+    clock = _Clock()
+    tracker = NameserverHealth(
+        ["192.0.2.1", "192.0.2.2"], eject_after=2, cooldown=5.0, clock=clock
+    )
+    tracker.record_success("192.0.2.2", 0.050)
+    tracker.record_failure("192.0.2.1")
+    assert tracker.stats()[0].state == health.HEALTHY
+    tracker.record_failure("192.0.2.1")
+
+    assert tracker.stats()[0].state == health.EJECTED
+    assert tracker.order() == ["192.0.2.2", "192.0.2.1"]
+    assert metrics.snapshot().counter(
+        "nameserver_ejections_total", (("server", "192.0.2.1"),)
+    ) == 1
+
+    clock.now += 5.0
+    assert tracker.order() == ["192.0.2.1", "192.0.2.2"]
+    assert tracker.stats()[0].state == health.PROBING
+    # Only one query probes; the rest keep using the healthy server.
+    assert tracker.order() == ["192.0.2.2", "192.0.2.1"]
+
+    tracker.record_failure("192.0.2.1")
+    assert tracker.stats()[0].state == health.EJECTED
+    clock.now += 5.0
+    assert tracker.order()[0] == "192.0.2.2"  # Cooldown doubled.
+    clock.now += 5.0
+    assert tracker.order()[0] == "192.0.2.1"
+
+    tracker.record_success("192.0.2.1", 0.010)
+    stats = tracker.stats()[0]
+    assert (stats.state, stats.consecutive_failures) == (health.HEALTHY, 0)
+    assert stats.ejections == 2
+
+
+def test_all_ejected_servers_are_still_returned() -> None:
+    clock = _Clock()
+    tracker = NameserverHealth(
+        ["192.0.2.1", "192.0.2.2"], eject_after=1, cooldown=5.0, clock=clock
+    )
+    tracker.record_failure("192.0.2.2")
+    clock.now += 1.0
+    tracker.record_failure("192.0.2.1")
+    assert tracker.order() == ["192.0.2.2", "192.0.2.1"]
+
+
+def test_summary_and_unknown_servers() -> None:
+    tracker = NameserverHealth(["192.0.2.1", "192.0.2.2", "192.0.2.1"])
+    tracker.record_success("192.0.2.1", 0.012)
+    tracker.record_success("198.51.100.1", 0.012)
+
+    assert tracker.servers == ["192.0.2.1", "192.0.2.2"]
+    assert health.summary(tracker.stats()).splitlines() == [
+        "Nameserver health:",
+        "  192.0.2.1: healthy latency=12.0ms failures=0.0% queries=1 "
+        "ejections=0",
+        "  192.0.2.2: healthy latency=- failures=0.0% queries=0 "
+        "ejections=0",
+    ]
+
+
+def test_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        NameserverHealth([])
+    with pytest.raises(ValueError):
+        NameserverHealth(["192.0.2.1"], alpha=0)
+    with pytest.raises(ValueError):
+        NameserverHealth(["192.0.2.1"], eject_after=0)
+    with pytest.raises(ValueError):
+        NameserverHealth(["192.0.2.1"], cooldown=0)
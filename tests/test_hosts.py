@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import os
+
+import pytest
+
+from domain_ip_converter import hosts
+from domain_ip_converter.hosts import HostsIndex
+from domain_ip_converter.results import ResolveResult
+
+_HOSTS = """\
+# Pinned internal names.
+192.0.2.10   api.corp.example  API-alias.corp.example.   # trailing comment
+2001:db8::10 api.corp.example
+192.0.2.11   db.corp.example
+192.0.2.10   api.corp.example
+not-an-ip    broken.corp.example
+192.0.2.12   bad..name ok.corp.example
+192.0.2.20   *.corp.example
+192.0.2.21   *.eu.corp.example
+fe80::1%eth0 link.corp.example
+"""
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _write(path, text: str, mtime: float) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_exact_names_aliases_and_families(tmp_path, caplog) -> None:
+    path = tmp_path / "hosts"
+    path.write_text(_HOSTS, encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger=hosts.__name__):
+        index = HostsIndex([str(path)])
+
+    assert index.lookup("API.corp.example.") == ResolveResult(
+        ["192.0.2.10"], ["2001:db8::10"]
+    )
+    assert index.lookup("api-alias.corp.example") == ResolveResult(
+        ["192.0.2.10"], []
+    )
+    assert index.lookup("api.corp.example", family=4) == ResolveResult(
+        ["192.0.2.10"], []
+    )
+    assert index.lookup("db.corp.example", family=6) == ResolveResult()
+    assert index.lookup("link.corp.example").ipv6 == ["fe80::1"]
+    assert index.lookup("ok.corp.example").ipv4 == ["192.0.2.12"]
+    assert index.lookup("elsewhere.example") is None
+    assert index.lookup("broken.corp.example").ipv4 == ["192.0.2.20"]
+    assert "invalid address 'not-an-ip'" in caplog.text
+    assert "invalid name 'bad..name'" in caplog.text
+
+
+def test_wildcards_match_by_longest_suffix(tmp_path) -> None:
+    path = tmp_path / "hosts"
+    path.write_text(_HOSTS, encoding="utf-8")
+    index = HostsIndex([str(path)])
+
+    assert index.lookup("x.corp.example").ipv4 == ["192.0.2.20"]
+    assert index.lookup("a.b.corp.example").ipv4 == ["192.0.2.20"]
+    assert index.lookup("x.eu.corp.example").ipv4 == ["192.0.2.21"]
+    assert index.lookup("eu.corp.example").ipv4 == ["192.0.2.20"]
+    assert index.lookup("corp.example") is None
+    assert index.lookup("db.corp.example").ipv4 == ["192.0.2.11"]
+
+
+def test_reverse_names(tmp_path) -> None:
+    path = tmp_path / "hosts"
+    path.write_text(_HOSTS, encoding="utf-8")
+    index = HostsIndex([str(path)])
+
+    assert index.names("192.0.2.10") == [
+        "api-alias.corp.example",
+        "api.corp.example",
+    ]
+    assert index.names("2001:DB8::10") == ["api.corp.example"]
+    assert index.names("192.0.2.20") is None
+    assert index.names("bogus") is None
+
+
+def test_later_files_add_addresses(tmp_path) -> None:
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.write_text("192.0.2.1 a.example\n", encoding="utf-8")
+    second.write_text("192.0.2.2 a.example b.example\n", encoding="utf-8")
+    index = HostsIndex([str(first), str(second)])
+
+    assert index.lookup("a.example").ipv4 == ["192.0.2.1", "192.0.2.2"]
+    assert index.lookup("b.example").ipv4 == ["192.0.2.2"]
+    assert len(index) == 2
+
+
+def test_reloads_only_changed_files(
+    tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clock = _Clock()
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    _write(first, "192.0.2.1 a.example\n", 1000)
+    _write(second, "192.0.2.2 b.example\n", 1000)
+    index = HostsIndex([str(first), str(second)], 5.0, clock=clock)
+    parsed = []
+    parse = hosts._parse
+    monkeypatch.setattr(
+        hosts,
+        "_parse",
+        lambda lines, source: parsed.append(source) or parse(lines, source),
+    )
+
+    _write(second, "192.0.2.3 b.example\n", 2000)
+    assert index.lookup("b.example").ipv4 == ["192.0.2.2"]
+    clock.now += 5
+    assert index.lookup("b.example").ipv4 == ["192.0.2.3"]
+    assert parsed == [str(second)]
+    assert index.reloads == 1
+
+    assert not index.refresh()
+    second.unlink()
+    assert not index.refresh()
+    assert index.lookup("b.example").ipv4 == ["192.0.2.3"]
+
+
+def test_invalid_arguments(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        HostsIndex([])
+    with pytest.raises(ValueError):
+        HostsIndex([str(tmp_path / "hosts")], check_interval=-1)
+    with pytest.raises(OSError):
+        HostsIndex([str(tmp_path / "missing")])
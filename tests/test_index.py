@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pytest
+
+from domain_ip_converter.errors import AddressIndexError, InvalidInputError
+from domain_ip_converter.index import AddressIndex, IndexBuilder, build_index
+from domain_ip_converter.results import ResolveResult, ResultSet
+
+
+def _results() -> ResultSet:
+    results = ResultSet()
+    results.add("a.example", ResolveResult(["203.0.113.5"], ["2001:db8::5"]))
+    results.add("b.example", ResolveResult(["203.0.113.5", "203.0.113.9"]))
+    results.add("c.example", ResolveResult(["198.51.100.1"]))
+    results.add("d.example", ResolveResult(ipv6=["2001:db8:1::1"]))
+    results.add("none.example", ResolveResult())
+    results.add("gone.example", "Domain does not exist: 'gone.example'.")
+    results.add("192.0.2.1", ["host.example"])
+    return results
+
+
+def test_exact_and_network_queries(tmp_path) -> None:
+    path = str(tmp_path / "run.index")
+    assert build_index(path, _results().items()) == 6
+
+    with AddressIndex(path) as index:
+        assert len(index) == 6
+        assert index.lookup("203.0.113.5") == ["a.example", "b.example"]
+        assert index.lookup("[2001:DB8::5]") == ["a.example"]
+        assert index.lookup("203.0.113.6") == []
+        assert index.lookup("192.0.2.1") == []
+        assert list(index.search("203.0.113.0/24")) == [
+            ("203.0.113.5", "a.example"),
+            ("203.0.113.5", "b.example"),
+            ("203.0.113.9", "b.example"),
+        ]
+        assert list(index.search("2001:db8::/32")) == [
+            ("2001:db8::5", "a.example"),
+            ("2001:db8:1::1", "d.example"),
+        ]
+        assert [pair[1] for pair in index.search("0.0.0.0/0")] == [
+            "c.example",
+            "a.example",
+            "b.example",
+            "b.example",
+        ]
+        with pytest.raises(InvalidInputError):
+            index.search("203.0.113.0/33")
+        with pytest.raises(InvalidInputError):
+            index.lookup("203.0.113.0/24")
+
+
+def test_spilled_chunks_merge_in_order(tmp_path) -> None:
+    path = str(tmp_path / "run.index")
+    with IndexBuilder(path, chunk_size=2) as builder:
+        for number in range(50, 0, -1):
+            builder.add(
+                f"host{number}.example",
+                ResolveResult([f"10.0.{number % 3}.{number}"]),
+            )
+    assert builder.records == 50
+    assert not list(tmp_path.glob("*.tmp"))
+
+    with AddressIndex(path) as index:
+        pairs = list(index.search("10.0.1.0/24"))
+        assert [address for address, _ in pairs] == [
+            f"10.0.1.{number}" for number in range(1, 51) if number % 3 == 1
+        ]
+        assert index.lookup("10.0.2.50") == ["host50.example"]
+
+
+def test_rebuild_replaces_the_file_and_empty_index(tmp_path) -> None:
+    path = str(tmp_path / "run.index")
+    build_index(path, _results().items())
+    assert build_index(path, []) == 0
+    with AddressIndex(path) as index:
+        assert len(index) == 0
+        assert list(index.search("::/0")) == []
+
+
+def test_rejects_other_and_truncated_files(tmp_path) -> None:
+    other = tmp_path / "other"
+    other.write_bytes(b"example.com\n" * 4)
+    with pytest.raises(AddressIndexError, match="not an address index"):
+        AddressIndex(str(other))
+
+    path = tmp_path / "run.index"
+    build_index(str(path), _results().items())
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(AddressIndexError, match="truncated"):
+        AddressIndex(str(path))
+    with pytest.raises(ValueError):
+        IndexBuilder(str(path), chunk_size=0)
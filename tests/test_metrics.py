@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from domain_ip_converter.metrics import Metrics, get_metrics
+
+
+def test_counters_merge_across_threads() -> None:
+    metrics = Metrics()
+
+    def work() -> None:
+        for _ in range(1000):
+            metrics.incr("queries", labels=(("rdtype", "A"),))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.incr("queries", labels=(("rdtype", "AAAA"),))
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counter("queries", (("rdtype", "A"),)) == 4000
+    assert snapshot.total("queries") == 4001
+    # Shards of finished threads are folded into one retired shard.
+    assert len(metrics._shards) == 1
+    assert metrics.snapshot().total("queries") == 4001
+
+
+def test_histogram_buckets_and_quantiles() -> None:
+    metrics = Metrics(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        metrics.observe("latency", value)
+
+    hist = metrics.snapshot().histograms[("latency", ())]
+    assert hist.counts == [1, 2, 1, 1]
+    assert hist.samples == 5
+    assert hist.total == pytest.approx(5.605)
+    assert hist.quantile(0.5) == 0.1
+    assert hist.quantile(0.99) == float("inf")
+
+
+def test_merge_adds_snapshot() -> None:
+    worker = Metrics(buckets=(0.01, 0.1))
+    worker.incr("queries", 3)
+    worker.observe("latency", 0.05)
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.incr("queries")
+    metrics.observe("latency", 0.005)
+
+    metrics.merge(worker.snapshot())
+    snapshot = metrics.snapshot()
+    assert snapshot.total("queries") == 4
+    assert snapshot.histograms[("latency", ())].counts == [1, 1, 0]
+
+    with pytest.raises(ValueError):
+        Metrics(buckets=(1.0,)).merge(worker.snapshot())
+
+
+def test_render_prometheus() -> None:
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.incr("dns_queries_total", labels=(("rdtype", "A"),))
+    metrics.observe("lookup_seconds", 0.5, (("backend", "udp"),))
+
+    text = metrics.render_prometheus(prefix="t_")
+    assert "# TYPE t_dns_queries_total counter" in text
+    assert 't_dns_queries_total{rdtype="A"} 1' in text
+    assert "# TYPE t_lookup_seconds histogram" in text
+    assert 't_lookup_seconds_bucket{backend="udp",le="0.1"} 0' in text
+    assert 't_lookup_seconds_bucket{backend="udp",le="1"} 1' in text
+    assert 't_lookup_seconds_bucket{backend="udp",le="+Inf"} 1' in text
+    assert 't_lookup_seconds_sum{backend="udp"} 0.5' in text
+    assert 't_lookup_seconds_count{backend="udp"} 1' in text
+
+
+def test_write_prometheus_and_reset(tmp_path) -> None:
+    metrics = Metrics()
+    metrics.incr("events")
+    path = tmp_path / "metrics.prom"
+    metrics.write_prometheus(str(path))
+    assert "domain_ip_converter_events 1" in path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
+
+    metrics.reset()
+    assert metrics.snapshot().counters == {}
+
+
+def test_summary_lists_counters_and_latency() -> None:
+    metrics = Metrics()
+    metrics.incr("lookups_total", labels=(("outcome", "ok"),))
+    metrics.observe("lookup_seconds", 0.002)
+
+    summary = metrics.summary()
+    assert 'lookups_total{outcome="ok"}: 1' in summary
+    assert "lookup_seconds: n=1" in summary
+
+
+def test_invalid_buckets() -> None:
+    with pytest.raises(ValueError):
+        Metrics(buckets=(1.0, 0.1))
+
+
+def test_get_metrics_is_shared() -> None:
+    assert get_metrics() is get_metrics()
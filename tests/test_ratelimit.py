@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from domain_ip_converter.ratelimit import RateLimiter, TokenBucket
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_queries_are_spaced_evenly() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(qps=10, clock=clock)
+
+    assert [limiter.reserve() for _ in range(3)] == pytest.approx(
+        [0.0, 0.1, 0.2]
+    )
+    clock.now += 0.25
+    assert limiter.reserve() == pytest.approx(0.05)
+    clock.now += 10
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == pytest.approx(0.1)
+
+
+def test_burst_allows_back_to_back_queries() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(qps=10, burst=3, clock=clock)
+
+    assert [limiter.reserve() for _ in range(4)] == pytest.approx(
+        [0.0, 0.0, 0.0, 0.1]
+    )
+
+
+def test_reserve_beyond_limit_claims_nothing() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(qps=10, clock=clock)
+    limiter.reserve()
+
+    assert limiter.reserve(limit=0.05) is None
+    assert limiter.delay() == pytest.approx(0.1)
+    assert limiter.reserve(limit=0.1) == pytest.approx(0.1)
+
+
+def test_nameserver_limits_are_independent() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(qps=100, nameserver_qps=10, clock=clock)
+
+    assert limiter.reserve("192.0.2.1") == 0.0
+    assert limiter.reserve("192.0.2.2") == pytest.approx(0.01)
+    assert limiter.delay("192.0.2.1") == pytest.approx(0.1)
+    assert sorted(["192.0.2.1", "192.0.2.3"], key=limiter.delay) == [
+        "192.0.2.3",
+        "192.0.2.1",
+    ]
+    # Unknown servers only count against the overall limit.
+    assert limiter.reserve() == pytest.approx(0.02)
+
+
+def test_charge_delays_later_queries() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(nameserver_qps=10, clock=clock)
+
+    limiter.charge("192.0.2.1")
+    limiter.charge("192.0.2.1")
+    assert limiter.reserve("192.0.2.1") == pytest.approx(0.2)
+    assert limiter.reserve() == 0.0
+
+
+def test_acquire_waits_for_its_slot() -> None:
+    limiter = RateLimiter(qps=50)
+
+    started = time.monotonic()
+    for _ in range(4):
+        assert limiter.acquire(timeout=1.0)
+    assert time.monotonic() - started >= 0.05
+    assert not limiter.acquire(timeout=0.0)
+
+    async def run() -> bool:
+        return await limiter.acquire_async(timeout=1.0)
+
+    assert asyncio.run(run())
+
+
+def test_invalid_limits() -> None:
+    with pytest.raises(ValueError):
+        RateLimiter()
+    with pytest.raises(ValueError):
+        RateLimiter(qps=0)
+    with pytest.raises(ValueError):
+        RateLimiter(nameserver_qps=-1)
+    with pytest.raises(ValueError):
+        RateLimiter(qps=1, burst=0.5)
+    with pytest.raises(ValueError):
+        TokenBucket(0)
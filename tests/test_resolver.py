@@ -1,11 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import importlib
 import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from domain_ip_converter.errors import DNSTimeoutError, ResolutionError
+from domain_ip_converter.cache import ResolverCache, install_cache
+from domain_ip_converter.errors import (
+    DNSTimeoutError,
+    InvalidInputError,
+    NXDomainError,
+    ResolutionError,
+)
 from domain_ip_converter import resolver
+from domain_ip_converter.metrics import Metrics
 
 
 class _FakeAnswer:
@@ -13,6 +27,17 @@ class _FakeAnswer:
         self.address = address
 
 
+class _FakePTR:
+    def __init__(self, target: str) -> None:
+        self.target = target
+
+
+class _FakeAnswers(list):
+    def __init__(self, addresses, ttl: int) -> None:
+        super().__init__(_FakeAnswer(address) for address in addresses)
+        self.rrset = type("_RRset", (), {"ttl": ttl})()
+
+
 class _FakeTimeout(Exception):
     pass
 
@@ -34,7 +59,12 @@ class _FakeNoNameservers(_FakeDNSException):
 
 
 class _FakeResolver:
-    def __init__(self) -> None:
+    created = 0
+
+    def __init__(self, configure: bool = True) -> None:
+        type(self).created += 1
+        self.configure = configure
+        self.nameservers = ["192.0.2.53"] if configure else []
         self.timeout = 0.0
         self.lifetime = 0.0
 
@@ -49,6 +79,17 @@ class _FakeResolver:
             raise _FakeDNSException()
         if host == "noanswer.example":
             raise _FakeNoAnswer()
+        if host == "ttl.example":
+            ttl = 30 if record_type == "A" else 120
+            return _FakeAnswers(["192.0.2.30"], ttl) if ttl == 30 else []
+        if record_type == "PTR":
+            if host == "2.2.0.192.in-addr.arpa":
+                raise _FakeNXDOMAIN()
+            return [
+                _FakePTR("WWW.example.com."),
+                _FakePTR("mail.example.com."),
+                _FakePTR("www.example.com."),
+            ]
         if record_type == "A":
             return [_FakeAnswer("1.1.1.1"), _FakeAnswer("1.1.1.1")]
         if record_type == "AAAA":
@@ -56,7 +97,22 @@ class _FakeResolver:
         raise _FakeNoAnswer()
 
 
+class _FakeAsyncResolver(_FakeResolver):
+    async def resolve(  # type: ignore[override]
+        self, host: str, record_type: str, lifetime: float
+    ):
+        return _FakeResolver.resolve(self, host, record_type, lifetime)
+
+
+@pytest.fixture(autouse=True)
+def _reset_default_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(resolver, "_default_session", None)
+
+
 class _FakeDNS:
+    class asyncresolver:
+        Resolver = _FakeAsyncResolver
+
     class resolver:
         Resolver = _FakeResolver
         NXDOMAIN = _FakeNXDOMAIN
@@ -144,6 +200,67 @@ def test_resolve_with_socket(monkeypatch: pytest.MonkeyPatch) -> None:
     assert result.ipv6 == ["2001:db8::2"]
 
 
+def test_dnspython_imported_on_first_lookup() -> None:
+    code = (
+        "import sys\n"
+        "from domain_ip_converter import resolver\n"
+        "assert 'dns.resolver' not in sys.modules\n"
+        "print(resolver.ResolverSession().backend_name())\n"
+        "print('dns.resolver' in sys.modules)"
+    )
+    backend, loaded = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert backend == ("dnspython" if resolver.HAS_DNSPYTHON else "socket")
+    assert loaded == str(resolver.HAS_DNSPYTHON)
+
+
+def test_broken_dnspython_falls_back_to_socket(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def fail(name: str) -> None:
+        raise ImportError(name)
+
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", True)
+    monkeypatch.setattr(resolver, "dns_resolver", None)
+    monkeypatch.setattr(importlib, "import_module", fail)
+
+    assert resolver.ResolverSession().backend_name() == "socket"
+    assert resolver.HAS_DNSPYTHON is False
+    with pytest.raises(ResolutionError, match="not available"):
+        resolver.ResolverSession(backend="dnspython").sync_resolver()
+
+
+def test_socket_backend_paces_lookups(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = []
+
+    def fake_getaddrinfo(host: str, *_args, **_kwargs):
+        calls.append(time.monotonic())
+        return [(socket.AF_INET, None, None, None, ("192.0.2.7", 0))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    session = resolver.ResolverSession(backend="socket", qps=25)
+
+    for host in ("a.example", "b.example", "c.example"):
+        resolver.resolve_host(host, timeout=1.0, session=session)
+    assert calls[2] - calls[0] >= 0.075
+
+    async def run() -> None:
+        await resolver.resolve_host_async("d.example", 1.0, session=session)
+
+    asyncio.run(run())
+    assert len(calls) == 4
+    limited = resolver.ResolverSession(backend="socket", qps=0.5)
+    resolver.resolve_host("e.example", timeout=1.0, session=limited)
+    with pytest.raises(DNSTimeoutError):
+        resolver.resolve_host("f.example", timeout=1.0, session=limited)
+
+
 def test_resolve_with_socket_error(monkeypatch: pytest.MonkeyPatch) -> None:
     def fake_getaddrinfo(host: str, *_args, **_kwargs):
         raise socket.gaierror(8, "not found")
@@ -159,3 +276,794 @@ def test_resolve_literal_ip() -> None:
     result = resolver.resolve_host("192.0.2.1", timeout=1.0)
     assert result.ipv4 == ["192.0.2.1"]
     assert result.ipv6 == []
+
+
+def _use_fake_dns(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", True)
+    monkeypatch.setattr(resolver, "dns_exception", _FakeDNS.exception)
+    monkeypatch.setattr(resolver, "dns_resolver", _FakeDNS.resolver)
+    monkeypatch.setattr(
+        resolver, "dns_asyncresolver", _FakeDNS.asyncresolver
+    )
+
+
+def test_resolve_host_async(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+
+    result = asyncio.run(resolver.resolve_host_async("example.com", 1.0))
+    assert result.ipv4 == ["1.1.1.1"]
+    assert result.ipv6 == ["2001:db8::1"]
+
+
+def test_resolve_host_async_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+
+    with pytest.raises(DNSTimeoutError):
+        asyncio.run(resolver.resolve_host_async("timeout.example", 1.0))
+
+
+def test_resolve_host_async_socket_fallback(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def fake_getaddrinfo(host: str, *_args, **_kwargs):
+        return [(socket.AF_INET, None, None, None, ("8.8.4.4", 0))]
+
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+
+    result = asyncio.run(resolver.resolve_host_async("example.com", 1.0))
+    assert result.ipv4 == ["8.8.4.4"]
+
+
+def test_resolve_many_async(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+
+    outcomes = asyncio.run(
+        resolver.resolve_many_async(
+            ["example.com", "missing.example", "192.0.2.7"],
+            timeout=1.0,
+            concurrency=2,
+        )
+    )
+    assert isinstance(outcomes[0], resolver.ResolveResult)
+    assert outcomes[0].ipv4 == ["1.1.1.1"]
+    assert isinstance(outcomes[1], ResolutionError)
+    assert outcomes[2] == resolver.ResolveResult(ipv4=["192.0.2.7"], ipv6=[])
+
+
+def test_resolve_many_async_invalid_concurrency() -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(resolver.resolve_many_async(["example.com"], 1.0, 0))
+
+
+def test_resolve_host_uses_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    calls = []
+    original = _FakeResolver.resolve
+
+    def counting_resolve(self, host: str, record_type: str, lifetime: float):
+        calls.append((host, record_type))
+        return original(self, host, record_type, lifetime)
+
+    monkeypatch.setattr(_FakeResolver, "resolve", counting_resolve)
+    cache = ResolverCache()
+
+    first = resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    second = resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    assert first == second
+    assert len(calls) == 2
+    assert cache.hits == 1
+
+
+def test_answered_locally_tracks_last_lookup(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    cache = ResolverCache()
+
+    resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    assert not resolver.answered_locally()
+    resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    assert resolver.answered_locally()
+    resolver.resolve_host("192.0.2.1", timeout=1.0)
+    assert resolver.answered_locally()
+
+    async def lookup(host: str) -> bool:
+        await resolver.resolve_host_async(host, 1.0, cache=ResolverCache())
+        return resolver.answered_locally()
+
+    assert not asyncio.run(lookup("example.com"))
+    assert asyncio.run(lookup("2001:db8::1"))
+
+
+def test_resolve_host_cache_uses_record_ttl(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    now = [0.0]
+    cache = ResolverCache(clock=lambda: now[0])
+
+    resolver.resolve_host("ttl.example", timeout=1.0, cache=cache)
+    now[0] = 29.0
+    assert cache.get("ttl.example") is not None
+    now[0] = 31.0
+    assert cache.get("ttl.example") is None
+
+
+def test_resolve_host_installed_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    cache = ResolverCache()
+    install_cache(cache)
+    try:
+        resolver.resolve_host("example.com", timeout=1.0)
+        asyncio.run(resolver.resolve_host_async("example.com", 1.0))
+    finally:
+        install_cache(None)
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_default_session_reuses_resolver(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    monkeypatch.setattr(_FakeResolver, "created", 0)
+
+    for _ in range(3):
+        resolver.resolve_host("example.com", timeout=1.0)
+    assert _FakeResolver.created == 1
+
+
+def test_session_explicit_nameservers(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    session = resolver.ResolverSession(
+        ["198.51.100.53", "198.51.100.54"], timeout=2.0, port=5353
+    )
+
+    result = resolver.resolve_host("example.com", timeout=1.0, session=session)
+    assert result.ipv4 == ["1.1.1.1"]
+
+    configured = session.sync_resolver()
+    assert configured is session.sync_resolver()
+    assert configured.configure is False
+    assert configured.nameservers == ["198.51.100.53", "198.51.100.54"]
+    assert configured.port == 5353
+    assert configured.timeout == 2.0
+
+
+def test_session_async_resolver(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    session = resolver.ResolverSession()
+
+    result = asyncio.run(
+        resolver.resolve_host_async("example.com", 1.0, session=session)
+    )
+    assert result.ipv6 == ["2001:db8::1"]
+    assert isinstance(session.async_resolver(), _FakeAsyncResolver)
+
+
+def test_session_search_domains() -> None:
+    pytest.importorskip("dns.resolver")
+    session = resolver.ResolverSession(
+        ["192.0.2.53"], search=["corp.example"]
+    )
+    configured = session.sync_resolver()
+    assert [str(name) for name in configured.search] == ["corp.example."]
+    assert configured.use_search_by_default is True
+
+
+def test_session_invalid_timeout() -> None:
+    with pytest.raises(ValueError):
+        resolver.ResolverSession(timeout=0)
+
+
+def test_session_hedging_settings() -> None:
+    with pytest.raises(ValueError, match="backend='udp'"):
+        resolver.ResolverSession(["192.0.2.53"], hedge_delay=0.05)
+    with pytest.raises(ValueError):
+        resolver.ResolverSession(backend="udp", hedge_percentile=120)
+
+    session = resolver.ResolverSession(
+        ["192.0.2.53", "192.0.2.54"],
+        backend="udp",
+        hedge_delay=0.05,
+        hedge_max_rate=0.2,
+    )
+    try:
+        engine = session.udp_engine()
+        assert engine.hedge_delay == 0.05
+        assert engine.hedge_max_rate == 0.2
+    finally:
+        session.close()
+
+
+def test_install_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    session = resolver.ResolverSession()
+    assert resolver.install_session(session) is None
+    assert resolver.get_session() is session
+    assert resolver.install_session(None) is session
+    assert resolver.get_session() is not session
+
+
+def test_resolve_queries_families_in_parallel(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    both_started = threading.Barrier(2, timeout=2.0)
+    original = _FakeResolver.resolve
+
+    def rendezvous(self, host: str, record_type: str, lifetime: float):
+        both_started.wait()
+        return original(self, host, record_type, lifetime)
+
+    monkeypatch.setattr(_FakeResolver, "resolve", rendezvous)
+
+    result = resolver.resolve_host("example.com", timeout=1.0)
+    assert result.ipv4 == ["1.1.1.1"]
+    assert result.ipv6 == ["2001:db8::1"]
+
+
+def test_resolve_families_share_deadline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    original = _FakeResolver.resolve
+    lifetimes = []
+
+    def slow_aaaa(self, host: str, record_type: str, lifetime: float):
+        lifetimes.append(lifetime)
+        if record_type == "AAAA":
+            time.sleep(0.5)
+        return original(self, host, record_type, lifetime)
+
+    monkeypatch.setattr(_FakeResolver, "resolve", slow_aaaa)
+
+    start = time.monotonic()
+    with pytest.raises(DNSTimeoutError):
+        resolver.resolve_host("example.com", timeout=0.2)
+    assert time.monotonic() - start < 0.45
+    assert all(lifetime <= 0.2 for lifetime in lifetimes)
+
+
+def test_resolve_single_family(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    queried = []
+    original = _FakeResolver.resolve
+
+    def recording(self, host: str, record_type: str, lifetime: float):
+        queried.append(record_type)
+        return original(self, host, record_type, lifetime)
+
+    monkeypatch.setattr(_FakeResolver, "resolve", recording)
+
+    result = resolver.resolve_host("example.com", timeout=1.0, family=6)
+    assert result.ipv4 == []
+    assert result.ipv6 == ["2001:db8::1"]
+
+    session = resolver.ResolverSession(family=4)
+    result = resolver.resolve_host("example.com", 1.0, session=session)
+    assert result.ipv4 == ["1.1.1.1"]
+    assert result.ipv6 == []
+    assert queried == ["AAAA", "A"]
+
+
+def test_resolve_invalid_family() -> None:
+    with pytest.raises(ValueError):
+        resolver.resolve_host("example.com", timeout=1.0, family=5)
+    with pytest.raises(ValueError):
+        resolver.ResolverSession(family=5)
+
+
+def test_resolve_family_cached_separately(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    cache = ResolverCache()
+
+    resolver.resolve_host("example.com", 1.0, cache=cache, family=4)
+    both = resolver.resolve_host("example.com", 1.0, cache=cache)
+    assert both.ipv6 == ["2001:db8::1"]
+    assert cache.hits == 0
+
+
+def test_resolve_with_socket_family(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_getaddrinfo(host: str, *_args, family=0, **_kwargs):
+        assert family == socket.AF_INET6
+        return [(socket.AF_INET6, None, None, None, ("2001:db8::9", 0, 0, 0))]
+
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+
+    result = resolver.resolve_host("example.com", timeout=1.0, family=6)
+    assert result.ipv6 == ["2001:db8::9"]
+
+
+def test_resolve_host_async_parallel_and_family(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    queried = []
+    events = []
+
+    async def gated(self, host: str, record_type: str, lifetime: float):
+        queried.append(record_type)
+        events.append(f"start {record_type}")
+        await asyncio.sleep(0.01)
+        events.append(f"end {record_type}")
+        return _FakeResolver.resolve(self, host, record_type, lifetime)
+
+    monkeypatch.setattr(_FakeAsyncResolver, "resolve", gated)
+
+    result = asyncio.run(resolver.resolve_host_async("example.com", 1.0))
+    assert result.ipv4 == ["1.1.1.1"]
+    assert events[:2] == ["start A", "start AAAA"]
+
+    queried.clear()
+    result = asyncio.run(
+        resolver.resolve_host_async("example.com", 1.0, family=6)
+    )
+    assert result.ipv4 == []
+    assert queried == ["AAAA"]
+
+
+def test_resolve_host_records_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+    metrics = Metrics()
+    monkeypatch.setattr(resolver, "get_metrics", lambda: metrics)
+    cache = ResolverCache()
+
+    resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    resolver.resolve_host("example.com", timeout=1.0, cache=cache)
+    resolver.resolve_host("noanswer.example", timeout=1.0)
+    with pytest.raises(ResolutionError):
+        resolver.resolve_host("missing.example", timeout=1.0)
+    with pytest.raises(DNSTimeoutError):
+        resolver.resolve_host("timeout.example", timeout=1.0)
+
+    snapshot = metrics.snapshot()
+
+    def queries(rdtype: str, outcome: str) -> float:
+        labels = (("rdtype", rdtype), ("outcome", outcome))
+        return snapshot.counter("dns_queries_total", labels)
+
+    assert queries("A", "noerror") == 1
+    assert queries("AAAA", "noerror") == 1
+    assert queries("A", "no_answer") == 1
+    assert queries("A", "nxdomain") == 1
+    assert queries("A", "timeout") == 1
+    hits = snapshot.counter("cache_requests_total", (("result", "hit"),))
+    assert hits == 1
+    dnspython = (("backend", "dnspython"),)
+    assert snapshot.counter(
+        "lookups_total", dnspython + (("outcome", "timeout"),)
+    ) == 1
+    assert snapshot.counter(
+        "lookups_total", (("backend", "cache"), ("outcome", "ok"))
+    ) == 1
+    assert snapshot.histograms[("lookup_seconds", dnspython)].samples == 4
+    wait = snapshot.histograms[("queue_wait_seconds", (("pool", "query"),))]
+    assert wait.samples >= 1
+
+
+def test_resolve_many_async_dedupes_hosts(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = []
+
+    async def fake_resolve(host: str, **kwargs) -> resolver.ResolveResult:
+        calls.append(host)
+        return resolver.ResolveResult(ipv4=["192.0.2.9"], ipv6=[])
+
+    monkeypatch.setattr(resolver, "resolve_host_async", fake_resolve)
+    outcomes = asyncio.run(
+        resolver.resolve_many_async(["a.example", "b.example", "a.example"])
+    )
+
+    assert calls == ["a.example", "b.example"]
+    assert len(outcomes) == 3
+    assert outcomes[0] is outcomes[2]
+
+
+class _SlowCountingResolver(_FakeResolver):
+    queries: list = []
+
+    def resolve(self, host: str, record_type: str, lifetime: float):
+        type(self).queries.append((host, record_type))
+        time.sleep(0.05)
+        return _FakeResolver.resolve(self, host, record_type, lifetime)
+
+
+@pytest.mark.parametrize("coalesce, expected", [(True, 2), (False, 12)])
+def test_resolve_host_coalesces_concurrent_lookups(
+    monkeypatch: pytest.MonkeyPatch, coalesce: bool, expected: int
+) -> None:
+    _use_fake_dns(monkeypatch)
+    monkeypatch.setattr(_SlowCountingResolver, "queries", [])
+
+    class _DNS(_FakeDNS.resolver):
+        Resolver = _SlowCountingResolver
+
+    monkeypatch.setattr(resolver, "dns_resolver", _DNS)
+    metrics = Metrics()
+    monkeypatch.setattr(resolver, "get_metrics", lambda: metrics)
+    session = resolver.ResolverSession(coalesce=coalesce)
+    barrier = threading.Barrier(6)
+
+    def lookup(_):
+        barrier.wait()
+        return resolver.resolve_host("example.com", 1.0, session=session)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lookup, range(6)))
+
+    assert all(result.ipv4 == ["1.1.1.1"] for result in results)
+    assert len(_SlowCountingResolver.queries) == expected
+    shared = metrics.snapshot().total("coalesced_lookups_total")
+    assert shared == (5 if coalesce else 0)
+
+
+def test_resolve_host_async_coalesces_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    before = resolver.coalesce_stats()
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                resolver.resolve_host_async("missing.example", 1.0)
+                for _ in range(4)
+            ),
+            return_exceptions=True,
+        )
+
+    outcomes = asyncio.run(run())
+    after = resolver.coalesce_stats()
+    assert all(isinstance(item, ResolutionError) for item in outcomes)
+    assert after.executed - before.executed == 1
+    assert after.shared - before.shared == 3
+
+
+def _stuck_getaddrinfo(monkeypatch: pytest.MonkeyPatch) -> threading.Event:
+    release = threading.Event()
+
+    def fake_getaddrinfo(host: str, *_args, **_kwargs):
+        release.wait(5.0)
+        return [(socket.AF_INET, None, None, None, ("192.0.2.44", 0))]
+
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    pool = resolver._AddrinfoPool(workers=2, max_abandoned=1)
+    monkeypatch.setattr(resolver, "_addrinfo_pool", pool)
+    return release
+
+
+def test_socket_backend_enforces_deadline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    release = _stuck_getaddrinfo(monkeypatch)
+    pool = resolver._get_addrinfo_pool()
+    try:
+        started = time.monotonic()
+        with pytest.raises(DNSTimeoutError):
+            resolver.resolve_host("stuck.example", timeout=0.1)
+        assert time.monotonic() - started < 1.0
+        assert pool.abandoned == 1
+
+        # Every worker budget is spent on stuck lookups: fail fast.
+        with pytest.raises(ResolutionError, match="unresponsive"):
+            resolver.resolve_host("next.example", timeout=5.0)
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 2.0
+    while pool.abandoned and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.abandoned == 0
+    result = resolver.resolve_host("next.example", timeout=1.0)
+    assert result.ipv4 == ["192.0.2.44"]
+
+
+def test_socket_backend_async_deadline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    release = _stuck_getaddrinfo(monkeypatch)
+    try:
+        with pytest.raises(DNSTimeoutError):
+            asyncio.run(resolver.resolve_host_async("stuck.example", 0.1))
+        assert resolver._get_addrinfo_pool().abandoned == 1
+    finally:
+        release.set()
+
+
+def test_socket_backend_cancels_queued_lookups(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    release = _stuck_getaddrinfo(monkeypatch)
+    pool = resolver._AddrinfoPool(workers=1, max_abandoned=5)
+    monkeypatch.setattr(resolver, "_addrinfo_pool", pool)
+    try:
+        busy = pool.submit("busy.example", None)
+        queued = pool.submit("queued.example", None)
+        pool.abandon(queued)
+        assert queued.cancelled()
+        assert pool.abandoned == 0
+    finally:
+        release.set()
+    assert busy.result(timeout=2.0).result.ipv4 == ["192.0.2.44"]
+
+
+class _PerServerResolver(_FakeAsyncResolver):
+    """Times out on 192.0.2.1 and answers from any other nameserver."""
+
+    asked: list = []
+
+    def __init__(self, configure: bool = True) -> None:
+        super().__init__(configure)
+        self.nameservers = ["192.0.2.1", "192.0.2.2"]
+
+    def ask(self, host: str, record_type: str, lifetime: float):
+        type(self).asked.append((self.nameservers[0], record_type))
+        if self.nameservers == ["192.0.2.1"]:
+            raise _FakeTimeout()
+        return _FakeResolver.resolve(self, host, record_type, lifetime)
+
+    def resolve(self, host: str, record_type: str, lifetime: float):
+        return self.ask(host, record_type, lifetime)
+
+
+class _PerServerAsyncResolver(_PerServerResolver):
+    async def resolve(  # type: ignore[override]
+        self, host: str, record_type: str, lifetime: float
+    ):
+        return self.ask(host, record_type, lifetime)
+
+
+@pytest.fixture
+def per_server_dns(monkeypatch: pytest.MonkeyPatch) -> list:
+    _use_fake_dns(monkeypatch)
+    monkeypatch.setattr(_PerServerResolver, "asked", [])
+
+    class _DNS(_FakeDNS.resolver):
+        Resolver = _PerServerResolver
+
+    class _AsyncDNS:
+        Resolver = _PerServerAsyncResolver
+
+    monkeypatch.setattr(resolver, "dns_resolver", _DNS)
+    monkeypatch.setattr(resolver, "dns_asyncresolver", _AsyncDNS)
+    return _PerServerResolver.asked
+
+
+def test_dnspython_fails_over_and_prefers_healthy_nameserver(
+    per_server_dns: list,
+) -> None:
+    session = resolver.ResolverSession(timeout=0.5, family=4)
+
+    for host in ("one.example", "two.example"):
+        result = resolver.resolve_host(host, timeout=1.0, session=session)
+        assert result.ipv4 == ["1.1.1.1"]
+
+    assert per_server_dns == [
+        ("192.0.2.1", "A"),
+        ("192.0.2.2", "A"),
+        ("192.0.2.2", "A"),
+    ]
+    slow, fast = session.nameserver_stats()
+    assert (slow.server, slow.failures, slow.queries) == ("192.0.2.1", 1, 1)
+    assert (fast.server, fast.queries) == ("192.0.2.2", 2)
+    assert session.sync_resolver().nameservers == ["192.0.2.1", "192.0.2.2"]
+
+
+def test_dnspython_async_routes_by_health(per_server_dns: list) -> None:
+    session = resolver.ResolverSession(timeout=0.5, family=4)
+
+    async def run():
+        for host in ("one.example", "two.example"):
+            await resolver.resolve_host_async(host, 1.0, session=session)
+
+    asyncio.run(run())
+    assert [server for server, _ in per_server_dns] == [
+        "192.0.2.1",
+        "192.0.2.2",
+        "192.0.2.2",
+    ]
+
+
+def test_dnspython_routes_respect_nameserver_qps(
+    per_server_dns: list,
+) -> None:
+    session = resolver.ResolverSession(
+        timeout=0.5, family=4, nameserver_qps=1
+    )
+
+    resolver.resolve_host("one.example", timeout=1.0, session=session)
+    assert [server for server, _ in per_server_dns] == [
+        "192.0.2.1",
+        "192.0.2.2",
+    ]
+    # Both servers used their slot for this second: nothing is sent.
+    with pytest.raises(DNSTimeoutError):
+        resolver.resolve_host("two.example", timeout=0.5, session=session)
+    assert len(per_server_dns) == 2
+
+
+def test_dnspython_without_health_tracking(per_server_dns: list) -> None:
+    session = resolver.ResolverSession(family=4, track_health=False)
+
+    # The shared resolver gets the whole nameserver list, as configured.
+    result = resolver.resolve_host("one.example", timeout=1.0, session=session)
+    assert result.ipv4 == ["1.1.1.1"]
+    assert len(per_server_dns) == 1
+    assert session.nameserver_stats() == []
+
+
+def test_soa_negative_ttl_from_dnspython_responses() -> None:
+    dns_message = pytest.importorskip("dns.message")
+    dns_rrset = pytest.importorskip("dns.rrset")
+    real_resolver = pytest.importorskip("dns.resolver")
+    query = dns_message.make_query("gone.example.", "A")
+    response = dns_message.make_response(query)
+    response.authority.append(
+        dns_rrset.from_text(
+            "example.",
+            900,
+            "IN",
+            "SOA",
+            "ns.example. host.example. 1 3600 600 86400 300",
+        )
+    )
+
+    nxdomain = real_resolver.NXDOMAIN(
+        qnames=[query.question[0].name],
+        responses={query.question[0].name: response},
+    )
+    error = resolver._translate_dns_error("gone.example", nxdomain)
+    assert isinstance(error, NXDomainError)
+    assert error.ttl == 300.0
+    no_answer = real_resolver.NoAnswer(response=response)
+    assert resolver._soa_negative_ttl(no_answer) == 300.0
+    assert resolver._soa_negative_ttl(_FakeNXDOMAIN()) is None
+
+
+def test_nxdomain_is_cached_and_reraised(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    monkeypatch.setattr(_SlowCountingResolver, "queries", [])
+
+    class _DNS(_FakeDNS.resolver):
+        Resolver = _SlowCountingResolver
+
+    monkeypatch.setattr(resolver, "dns_resolver", _DNS)
+    cache = ResolverCache()
+    session = resolver.ResolverSession(family=4)
+
+    for _ in range(3):
+        with pytest.raises(NXDomainError, match="does not exist"):
+            resolver.resolve_host(
+                "missing.example", 1.0, cache=cache, session=session
+            )
+    assert len(_SlowCountingResolver.queries) == 1
+
+    async def lookup():
+        await resolver.resolve_host_async(
+            "missing.example", 1.0, cache=cache, session=session
+        )
+
+    with pytest.raises(NXDomainError):
+        asyncio.run(lookup())
+    assert cache.hits == 3
+
+
+def test_reverse_name() -> None:
+    assert resolver.reverse_name("192.0.2.1") == "1.2.0.192.in-addr.arpa"
+    nibbles = "20010db8" + "0" * 23 + "1"
+    assert resolver.reverse_name("2001:db8::1") == (
+        ".".join(reversed(nibbles)) + ".ip6.arpa"
+    )
+    for bad in ("example.com", "192.0.2", "2001:db8::g", ""):
+        with pytest.raises(InvalidInputError):
+            resolver.reverse_name(bad)
+
+
+def test_resolve_reverse_with_dnspython(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    expected = ["mail.example.com", "www.example.com"]
+
+    assert resolver.resolve_reverse("192.0.2.1", 1.0) == expected
+    assert asyncio.run(
+        resolver.resolve_reverse_async("2001:db8::1", 1.0)
+    ) == expected
+    with pytest.raises(InvalidInputError):
+        resolver.resolve_reverse("not-an-ip", 1.0)
+
+
+def test_resolve_reverse_nxdomain_is_cached(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _use_fake_dns(monkeypatch)
+    cache = ResolverCache()
+
+    for _ in range(2):
+        with pytest.raises(NXDomainError, match="2.2.0.192.in-addr.arpa"):
+            resolver.resolve_reverse("192.0.2.2", 1.0, cache=cache)
+    assert resolver.resolve_reverse("192.0.2.1", 1.0, cache=cache)
+    assert resolver.resolve_reverse("192.0.2.1", 1.0, cache=cache)
+    assert cache.hits == 2
+    assert cache.get_names("1.2.0.192.in-addr.arpa") == [
+        "mail.example.com",
+        "www.example.com",
+    ]
+
+
+def test_resolve_reverse_with_socket(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_gethostbyaddr(address: str):
+        if address == "192.0.2.9":
+            raise socket.herror(1, "Unknown host")
+        return "Host.example.", ["alias.example"], [address]
+
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(socket, "gethostbyaddr", fake_gethostbyaddr)
+
+    assert resolver.resolve_reverse("192.0.2.1", 1.0) == [
+        "alias.example",
+        "host.example",
+    ]
+    with pytest.raises(NXDomainError):
+        resolver.resolve_reverse("192.0.2.9", 1.0)
+
+
+def test_resolve_reverse_many_async(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_fake_dns(monkeypatch)
+
+    outcomes = asyncio.run(
+        resolver.resolve_reverse_many_async(
+            ["192.0.2.1", "192.0.2.2", "bogus", "192.0.2.1"],
+            timeout=1.0,
+            concurrency=2,
+        )
+    )
+    assert outcomes[0] == ["mail.example.com", "www.example.com"]
+    assert isinstance(outcomes[1], NXDomainError)
+    assert isinstance(outcomes[2], InvalidInputError)
+    assert outcomes[3] == outcomes[0]
+
+
+def test_hosts_files_answer_before_any_query(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    def no_network(*_args, **_kwargs):
+        raise AssertionError("pinned names must not be queried")
+
+    path = tmp_path / "hosts"
+    path.write_text(
+        "192.0.2.50 pinned.example\n2001:db8::50 *.pinned.example\n",
+        encoding="utf-8",
+    )
+    metrics = Metrics()
+    monkeypatch.setattr(resolver, "get_metrics", lambda: metrics)
+    monkeypatch.setattr(resolver, "HAS_DNSPYTHON", False)
+    monkeypatch.setattr(socket, "getaddrinfo", no_network)
+    monkeypatch.setattr(socket, "gethostbyaddr", no_network)
+    cache = ResolverCache()
+    session = resolver.ResolverSession(hosts_files=[str(path)])
+
+    result = resolver.resolve_host(
+        "Pinned.example", cache=cache, session=session
+    )
+    assert result == resolver.ResolveResult(["192.0.2.50"], [])
+    assert asyncio.run(
+        resolver.resolve_host_async("a.pinned.example", session=session)
+    ).ipv6 == ["2001:db8::50"]
+    assert resolver.resolve_reverse("192.0.2.50", session=session) == [
+        "pinned.example"
+    ]
+    assert len(cache) == 0
+    hosts = (("backend", "hosts"), ("outcome", "ok"))
+    assert metrics.snapshot().counter("lookups_total", hosts) == 3
+
+    with pytest.raises(OSError):
+        resolver.ResolverSession(hosts_files=[str(tmp_path / "missing")])
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from domain_ip_converter.errors import ResolutionError
+from domain_ip_converter.results import ResolveResult, ResultSet
+
+
+def test_resolve_result_decodes_packed_addresses() -> None:
+    result = ResolveResult(
+        ["192.0.2.1", "198.51.100.7"], ["2001:db8::1", "::ffff:192.0.2.1"]
+    )
+
+    assert result.ipv4 == ["192.0.2.1", "198.51.100.7"]
+    assert result.ipv6 == ["2001:db8::1", "::ffff:c000:201"]
+    assert result.packed_ipv4 == bytes([192, 0, 2, 1, 198, 51, 100, 7])
+    assert len(result.packed_ipv6) == 32
+    assert result.ipv4 is not result.ipv4
+    assert repr(ResolveResult(ipv4=["192.0.2.1"])) == (
+        "ResolveResult(ipv4=['192.0.2.1'], ipv6=[])"
+    )
+
+
+def test_resolve_result_is_immutable_and_compact() -> None:
+    result = ResolveResult(["192.0.2.1"], [])
+
+    with pytest.raises(AttributeError):
+        result.ipv4 = []  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        result.extra = 1  # type: ignore[attr-defined]
+    assert not hasattr(result, "__dict__")
+
+
+def test_resolve_result_equality_hash_and_pickle() -> None:
+    result = ResolveResult(["192.0.2.1"], ["2001:db8::1"])
+    same = ResolveResult.from_packed(result.packed_ipv4, result.packed_ipv6)
+
+    assert result == same
+    assert hash(result) == hash(same)
+    assert result != ResolveResult(["192.0.2.1"], [])
+    assert pickle.loads(pickle.dumps(result)) == result
+
+
+def test_resolve_result_rejects_invalid_addresses() -> None:
+    with pytest.raises(ValueError):
+        ResolveResult(["2001:db8::1"], [])
+    with pytest.raises(ValueError):
+        ResolveResult([], ["not-an-ip"])
+    with pytest.raises(ValueError):
+        ResolveResult.from_packed(b"\x01\x02\x03")
+
+
+def test_result_set_keeps_first_entry_in_insertion_order() -> None:
+    results = ResultSet()
+    ok = ResolveResult(["192.0.2.1", "192.0.2.2"], ["2001:db8::1"])
+
+    assert results.add("b.example", ok, ["b.example", "B.example"])
+    assert results.add("a.example", ResolutionError("lookup failed"))
+    assert results.add("c.example", ResolveResult([], ["2001:db8::2"]))
+    assert not results.add("b.example", ResolveResult())
+    results.add_input("c.example", "https://c.example/")
+
+    assert len(results) == 3
+    assert "a.example" in results and "d.example" not in results
+    assert list(results) == ["b.example", "a.example", "c.example"]
+    assert list(results.items()) == [
+        ("b.example", ok),
+        ("a.example", "lookup failed"),
+        ("c.example", ResolveResult([], ["2001:db8::2"])),
+    ]
+    assert results.get("b.example") == ok
+    assert results.inputs("b.example") == ["b.example", "B.example"]
+    assert results.inputs("a.example") is None
+    assert results.inputs("c.example") == ["https://c.example/"]
+    with pytest.raises(KeyError):
+        results.get("d.example")
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import operator
+import socket
+import threading
+
+import pytest
+
+from domain_ip_converter import shard, wire
+from domain_ip_converter.errors import InvalidInputError, ResolutionError
+from domain_ip_converter.metrics import Metrics
+from domain_ip_converter.resolver import ResolverSession, ResolveResult
+from domain_ip_converter.shard import resolve_sharded
+
+
+class _UDPServer:
+    """Answers every A query with 192.0.2.10 and NXDOMAIN for 'missing*'."""
+
+    def __init__(self) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                data, address = self.sock.recvfrom(4096)
+            except OSError:
+                return
+            query = wire.decode_message(data)
+            assert query.question is not None
+            name, rdtype = query.question
+            if name.startswith("missing"):
+                reply = wire.encode_response(
+                    query, rcode=wire.RCODE_NXDOMAIN, negative_ttl=60
+                )
+            else:
+                reply = wire.encode_response(
+                    query, [(rdtype, 60, "192.0.2.10")]
+                )
+            self.sock.sendto(reply, address)
+
+
+@pytest.fixture
+def metrics(monkeypatch: pytest.MonkeyPatch) -> Metrics:
+    registry = Metrics()
+    monkeypatch.setattr(shard, "get_metrics", lambda: registry)
+    return registry
+
+
+def _inputs(count: int) -> list:
+    return [f"192.0.2.{index % 250}" for index in range(count)]
+
+
+def test_resolve_sharded_keeps_input_order(metrics: Metrics) -> None:
+    inputs = _inputs(300) + ["-bad.example", "[2001:DB8::1]"]
+
+    results = list(
+        resolve_sharded(inputs, processes=2, ordered=True, batch_size=16)
+    )
+
+    assert [result.index for result in results] == list(range(len(inputs)))
+    assert [result.input for result in results] == inputs
+    assert results[7].host == "192.0.2.7"
+    assert results[7].outcome == ResolveResult(ipv4=["192.0.2.7"], ipv6=[])
+    assert results[-2].host is None
+    assert isinstance(results[-2].outcome, InvalidInputError)
+    assert results[-1].outcome == ResolveResult(
+        ipv4=[], ipv6=["2001:db8::1"]
+    )
+
+
+def test_resolve_sharded_unordered_async(metrics: Metrics) -> None:
+    inputs = _inputs(100)
+
+    results = list(
+        resolve_sharded(inputs, processes=2, use_async=True, batch_size=8)
+    )
+
+    assert sorted(result.index for result in results) == list(range(100))
+    for result in results:
+        assert result.outcome == ResolveResult([result.input], [])
+    assert list(resolve_sharded([], processes=2)) == []
+
+
+def test_resolve_sharded_uses_session_and_merges_metrics(
+    metrics: Metrics,
+) -> None:
+    server = _UDPServer()
+    session = ResolverSession(
+        ["127.0.0.1"], timeout=2.0, port=server.port, family=4, backend="udp"
+    )
+    try:
+        results = list(
+            resolve_sharded(
+                ["a.example", "missing.example", "A.example"],
+                processes=2,
+                ordered=True,
+                session=session,
+            )
+        )
+    finally:
+        server.sock.close()
+
+    assert results[0].outcome == ResolveResult(["192.0.2.10"], [])
+    assert isinstance(results[1].outcome, ResolutionError)
+    assert results[2].host == "a.example"
+    snapshot = metrics.snapshot()
+    assert snapshot.counter(
+        "dns_queries_total", (("rdtype", "A"), ("outcome", "nxdomain"))
+    ) == 1
+    assert snapshot.total("lookups_total") >= 2
+
+
+def test_resolve_sharded_groups_spellings_of_a_host(
+    metrics: Metrics,
+) -> None:
+    server = _UDPServer()
+    session = ResolverSession(
+        ["127.0.0.1"], timeout=2.0, port=server.port, family=4, backend="udp"
+    )
+    inputs = ["b.example", "B.EXAMPLE.", "https://b.example/path", "B.Example"]
+    try:
+        hosts = list(
+            resolve_sharded(
+                inputs,
+                processes=4,
+                ordered=True,
+                session=session,
+                render=operator.attrgetter("host"),
+            )
+        )
+    finally:
+        server.sock.close()
+
+    assert hosts == ["b.example"] * 4
+    assert metrics.snapshot().total("dns_queries_total") == 1
+    assert shard._shard_key("[2001:DB8::1]", reverse=True) == "2001:db8::1"
+    assert shard._shard_key("-bad.example", reverse=False) == "-bad.example"
+    for raw in ("http://u:p@B.example:8080/x?y", "b.example:443"):
+        assert shard._shard_key(raw, reverse=False) == "b.example"
+    for raw in ("2001:DB8::1", "http://[2001:db8::1]:53/"):
+        assert shard._shard_key(raw, reverse=False) == "2001:db8::1"
+
+
+def test_shards_split_rate_limits() -> None:
+    session = ResolverSession(qps=100, nameserver_qps=30)
+
+    args = shard._session_args(session, processes=4)
+    assert (args["qps"], args["nameserver_qps"]) == (25, 7.5)
+    limiter = ResolverSession(**args).rate_limiter
+    assert limiter is not None and limiter.qps == 25
+    assert shard._session_args(ResolverSession())["qps"] is None
+
+
+def test_resolve_sharded_rejects_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        resolve_sharded(["example.com"], processes=0)
+    with pytest.raises(ValueError):
+        resolve_sharded(["example.com"], workers=0)
+    with pytest.raises(ValueError):
+        resolve_sharded(["example.com"], batch_size=0)
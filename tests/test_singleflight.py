@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from domain_ip_converter.singleflight import SingleFlight
+
+
+def _run_concurrently(flight: SingleFlight, func, callers: int = 8):
+    started = threading.Barrier(callers)
+
+    def call(_):
+        started.wait()
+        try:
+            return flight.do("key", func)
+        except RuntimeError as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return list(pool.map(call, range(callers)))
+
+
+def test_do_runs_once_for_concurrent_callers() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work() -> int:
+        calls.append(1)
+        release.wait(1.0)
+        return 42
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results = _run_concurrently(flight, work)
+    timer.cancel()
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert flight.stats() == (1, 7)
+
+
+def test_do_shares_exceptions() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    release = threading.Event()
+
+    def work() -> int:
+        release.wait(1.0)
+        raise RuntimeError("boom")
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results = _run_concurrently(flight, work, callers=4)
+    timer.cancel()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats().executed == 1
+
+
+def test_do_forgets_completed_calls() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.stats() == (2, 0)
+
+
+def test_do_async_coalesces_and_survives_cancelled_waiter() -> None:
+    flight: SingleFlight[str] = SingleFlight()
+    calls = []
+
+    async def work() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        others = [
+            asyncio.ensure_future(flight.do_async("key", work))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(run()) == ["done"] * 3
+    assert len(calls) == 1
+    assert flight.stats() == (1, 3)
+
+
+def test_do_async_shares_exceptions() -> None:
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def work() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do_async("key", work) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats().executed == 1
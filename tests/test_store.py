@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+
+from domain_ip_converter.errors import NXDomainError
+from domain_ip_converter.resolver import ResolveResult
+from domain_ip_converter.store import PersistentCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _result() -> ResolveResult:
+    return ResolveResult(ipv4=["203.0.113.1"], ipv6=["2001:db8::1"])
+
+
+def test_store_roundtrip_across_instances(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    with PersistentCache(path) as store:
+        store.set("Example.com", _result(), ttl=60)
+        assert store.get("example.com") == _result()
+
+    with PersistentCache(path) as store:
+        assert store.get("example.com") == _result()
+        assert store.get("missing.example") is None
+
+
+def test_store_expiry(tmp_path) -> None:
+    clock = _Clock()
+    path = str(tmp_path / "cache.sqlite")
+    with PersistentCache(path, clock=clock) as store:
+        store.set("example.com", _result(), ttl=30)
+        store.flush()
+        clock.now += 31
+        assert store.get("example.com") is None
+        assert store.purge_expired() == 1
+
+
+def test_store_batches_writes(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    store = PersistentCache(path, batch_size=3)
+    other = PersistentCache(path)
+    try:
+        store.set("a.example", _result(), ttl=60)
+        store.set("b.example", _result(), ttl=60)
+        assert other.get("a.example") is None
+        store.set("c.example", _result(), ttl=60)
+        assert other.get("a.example") == _result()
+    finally:
+        store.close()
+        other.close()
+
+
+def test_store_empty_families_and_zero_ttl(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    with PersistentCache(path) as store:
+        store.set("v4.example", ResolveResult(ipv4=["192.0.2.1"], ipv6=[]))
+        store.set("skip.example", _result(), ttl=0)
+        store.flush()
+        assert store.get("v4.example") == ResolveResult(
+            ipv4=["192.0.2.1"], ipv6=[]
+        )
+        assert store.get("skip.example") is None
+
+
+def test_store_negative_entries(tmp_path) -> None:
+    clock = _Clock()
+    path = str(tmp_path / "cache.sqlite")
+    empty = ResolveResult(ipv4=[], ipv6=[])
+    with PersistentCache(path, clock=clock, max_negative_ttl=60) as store:
+        store.set_nxdomain("Gone.example", ttl=3600)
+        store.set("empty.example", empty, ttl=30)
+        with pytest.raises(NXDomainError, match="Gone.example"):
+            store.get("Gone.example")
+
+    with PersistentCache(path, clock=clock) as store:
+        with pytest.raises(NXDomainError):
+            store.get("gone.example")
+        assert store.get("empty.example") == empty
+        clock.now += 31
+        assert store.get("empty.example") is None
+        clock.now += 30
+        assert store.get("gone.example") is None
+
+
+def test_store_migrates_old_schema(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE results (host TEXT PRIMARY KEY, ipv4 TEXT NOT NULL, "
+        "ipv6 TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+    )
+    connection.execute(
+        "INSERT INTO results VALUES ('example.com', '203.0.113.1', '', ?)",
+        (4_000_000_000.0,),
+    )
+    connection.commit()
+    connection.close()
+
+    with PersistentCache(path) as store:
+        assert store.get("example.com") == ResolveResult(["203.0.113.1"], [])
+        store.set_nxdomain("gone.example")
+        store.set_names("1.2.0.192.in-addr.arpa", ["host.example"])
+        store.flush()
+        with pytest.raises(NXDomainError):
+            store.get("gone.example")
+        assert store.get_names("1.2.0.192.in-addr.arpa") == ["host.example"]
+
+
+def test_store_names(tmp_path) -> None:
+    clock = _Clock()
+    path = str(tmp_path / "cache.sqlite")
+    name = "1.2.0.192.in-addr.arpa"
+    with PersistentCache(path, clock=clock) as store:
+        store.set_names(name, ["a.example", "b.example"], ttl=60)
+        store.set_names("2.2.0.192.in-addr.arpa", None, ttl=60)
+        store.set_names("3.2.0.192.in-addr.arpa", [], ttl=60)
+
+    with PersistentCache(path, clock=clock) as store:
+        assert store.get_names(name) == ["a.example", "b.example"]
+        assert store.get(name) is None
+        with pytest.raises(NXDomainError):
+            store.get_names("2.2.0.192.in-addr.arpa")
+        assert store.get_names("3.2.0.192.in-addr.arpa") == []
+        clock.now += 61
+        assert store.get_names(name) is None
+
+
+def test_store_concurrent_threads(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    errors = []
+
+    with PersistentCache(path, batch_size=16) as store:
+
+        def worker(offset: int) -> None:
+            try:
+                for index in range(100):
+                    host = f"h{offset}-{index}.example"
+                    store.set(host, _result(), ttl=60)
+                    assert store.get(host) == _result()
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    with PersistentCache(path) as store:
+        assert store.get("h5-99.example") == _result()
+
+
+class _SlowWriter:
+    """Wrap the writer connection so a commit waits for ``release``."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.connection.__enter__()
+
+    def __exit__(self, *exc_info) -> None:
+        self.connection.__exit__(*exc_info)
+
+    def executemany(self, sql: str, rows) -> sqlite3.Cursor:
+        self.writing.set()
+        assert self.release.wait(5.0)
+        return self.connection.executemany(sql, rows)
+
+    def execute(self, sql: str, *args) -> sqlite3.Cursor:
+        return self.connection.execute(sql, *args)
+
+
+def test_store_reads_do_not_wait_for_commit(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    with PersistentCache(path, batch_size=2) as store:
+        store.set("old.example", _result(), ttl=60)
+        store.flush()
+        writer = _SlowWriter(store._writer)
+        store._writer = writer  # type: ignore[assignment]
+
+        store.set("a.example", _result(), ttl=60)
+        flusher = threading.Thread(
+            target=store.set, args=("b.example", _result()), kwargs={"ttl": 60}
+        )
+        flusher.start()
+        assert writer.writing.wait(5.0)
+
+        # The batch is mid-commit: both it and older rows stay readable.
+        assert store.get("b.example") == _result()
+        assert store.get("old.example") == _result()
+        store.set("c.example", _result(), ttl=60)
+        assert store.get("c.example") == _result()
+        assert flusher.is_alive()
+
+        writer.release.set()
+        flusher.join()
+
+    with PersistentCache(path) as store:
+        for host in ("a.example", "b.example", "c.example"):
+            assert store.get(host) == _result()
+
+
+def test_store_invalid_batch_size(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        PersistentCache(str(tmp_path / "cache.sqlite"), batch_size=0)
@@ -0,0 +1,677 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import pytest
+
+from domain_ip_converter import resolver, udp, wire
+from domain_ip_converter.cache import ResolverCache
+from domain_ip_converter.errors import (
+    DNSTimeoutError,
+    NXDomainError,
+    ResolutionError,
+)
+from domain_ip_converter.health import NameserverHealth
+from domain_ip_converter.metrics import Metrics
+from domain_ip_converter.ratelimit import RateLimiter
+from domain_ip_converter.udp import UDPEngine, system_nameservers
+
+_Handler = Callable[[wire.Message, str], Optional[bytes]]
+
+
+def _default_handler(query: wire.Message, transport: str) -> Optional[bytes]:
+    assert query.question is not None
+    name, rdtype = query.question
+    if name.startswith(("missing", "9.")):
+        return wire.encode_response(
+            query, rcode=wire.RCODE_NXDOMAIN, negative_ttl=60
+        )
+    if name.startswith("servfail"):
+        return wire.encode_response(query, rcode=wire.RCODE_SERVFAIL)
+    if rdtype == wire.TYPE_A:
+        return wire.encode_response(query, [(rdtype, 120, "192.0.2.10")])
+    if rdtype == wire.TYPE_AAAA:
+        return wire.encode_response(query, [(rdtype, 60, "2001:db8::10")])
+    if rdtype == wire.TYPE_PTR:
+        return wire.encode_response(
+            query, [(rdtype, 300, "Host.Example"), (rdtype, 300, "a.example")]
+        )
+    return wire.encode_response(query)
+
+
+class _StubServer:
+    """Answers DNS over UDP and TCP on one 127.0.0.1 port."""
+
+    def __init__(
+        self,
+        handler: _Handler = _default_handler,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.handler = handler
+        self.queries: List[tuple] = []
+        self.last_address: tuple = ()
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind((host, port))
+        self.port = self.udp.getsockname()[1]
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind((host, self.port))
+        self.tcp.listen()
+        for target in (self._serve_udp, self._serve_tcp):
+            threading.Thread(target=target, daemon=True).start()
+
+    def _answer(self, data: bytes, transport: str) -> Optional[bytes]:
+        query = wire.decode_message(data)
+        self.queries.append((query.question, transport))
+        return self.handler(query, transport)
+
+    def _serve_udp(self) -> None:
+        while True:
+            try:
+                data, address = self.udp.recvfrom(4096)
+            except OSError:
+                return
+            self.last_address = address
+            reply = self._answer(data, "udp")
+            if reply is not None:
+                self.udp.sendto(reply, address)
+
+    def _serve_tcp(self) -> None:
+        while True:
+            try:
+                conn, _ = self.tcp.accept()
+            except OSError:
+                return
+            with conn:
+                (length,) = struct.unpack("!H", conn.recv(2))
+                reply = self._answer(conn.recv(length), "tcp")
+                if reply is not None:
+                    conn.sendall(struct.pack("!H", len(reply)) + reply)
+
+    def close(self) -> None:
+        self.udp.close()
+        self.tcp.close()
+
+
+@pytest.fixture
+def server():
+    stub = _StubServer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def engine(server: _StubServer):
+    instance = UDPEngine(["127.0.0.1"], port=server.port)
+    yield instance
+    instance.close()
+
+
+def test_engine_answers_a_and_aaaa(engine: UDPEngine) -> None:
+    a = engine.submit("Host.Example.", wire.TYPE_A, 2.0)
+    aaaa = engine.submit("host.example", wire.TYPE_AAAA, 2.0)
+
+    assert [r.value for r in a.result().answers] == ["192.0.2.10"]
+    assert [r.value for r in aaaa.result().answers] == ["2001:db8::10"]
+
+
+def test_engine_pipelines_many_queries(
+    engine: UDPEngine, server: _StubServer
+) -> None:
+    futures = [
+        engine.submit(f"h{index}.example", wire.TYPE_A, 5.0)
+        for index in range(500)
+    ]
+    assert all(f.result().answers[0].value == "192.0.2.10" for f in futures)
+    assert len({question for question, _ in server.queries}) == 500
+
+
+def test_engine_caps_queries_in_flight(server: _StubServer) -> None:
+    engine = UDPEngine(["127.0.0.1"], port=server.port, max_in_flight=2)
+    try:
+        futures = [
+            engine.submit(f"w{index}.example", wire.TYPE_A, 5.0)
+            for index in range(20)
+        ]
+        assert all(f.result().answers for f in futures)
+        assert engine._in_flight == 0
+    finally:
+        engine.close()
+    assert len(server.queries) == 20
+
+
+def test_engine_retransmits_lost_datagrams(server: _StubServer) -> None:
+    dropped = set()
+
+    def lossy(query: wire.Message, transport: str) -> Optional[bytes]:
+        if query.question not in dropped:
+            dropped.add(query.question)
+            return None
+        return _default_handler(query, transport)
+
+    server.handler = lossy
+    engine = UDPEngine(["127.0.0.1"], port=server.port, retry_interval=0.02)
+    try:
+        message = engine.query("lossy.example", wire.TYPE_A, 2.0)
+    finally:
+        engine.close()
+    assert message.answers[0].value == "192.0.2.10"
+    assert len(server.queries) == 2
+
+
+def test_engine_times_out(server: _StubServer) -> None:
+    server.handler = lambda query, transport: None
+    engine = UDPEngine(["127.0.0.1"], port=server.port, retry_interval=0.02)
+    try:
+        with pytest.raises(DNSTimeoutError):
+            engine.query("silent.example", wire.TYPE_A, 0.2)
+    finally:
+        engine.close()
+    assert len(server.queries) >= 2
+
+
+def test_engine_falls_back_to_tcp(server: _StubServer) -> None:
+    def truncating(query: wire.Message, transport: str) -> Optional[bytes]:
+        if transport == "udp":
+            return wire.encode_response(query, truncated=True)
+        return _default_handler(query, transport)
+
+    server.handler = truncating
+    engine = UDPEngine(["127.0.0.1"], port=server.port)
+    try:
+        message = engine.query("big.example", wire.TYPE_A, 2.0)
+    finally:
+        engine.close()
+    assert message.answers[0].value == "192.0.2.10"
+    assert [transport for _, transport in server.queries] == ["udp", "tcp"]
+
+
+def test_engine_ignores_mismatched_responses(server: _StubServer) -> None:
+    def spoofing(query: wire.Message, transport: str) -> Optional[bytes]:
+        forged = wire.Message(
+            (query.txid + 1) % 65536, query.flags, query.question
+        )
+        server.udp.sendto(
+            wire.encode_response(forged, [(1, 60, "203.0.113.66")]),
+            server.last_address,
+        )
+        other = wire.Message(query.txid, query.flags, ("other.example", 1))
+        server.udp.sendto(
+            wire.encode_response(other, [(1, 60, "203.0.113.67")]),
+            server.last_address,
+        )
+        return _default_handler(query, transport)
+
+    server.handler = spoofing
+    engine = UDPEngine(["127.0.0.1"], port=server.port)
+    try:
+        message = engine.query("real.example", wire.TYPE_A, 2.0)
+    finally:
+        engine.close()
+    assert [record.value for record in message.answers] == ["192.0.2.10"]
+
+
+def test_engine_close_fails_pending(server: _StubServer) -> None:
+    server.handler = lambda query, transport: None
+    engine = UDPEngine(["127.0.0.1"], port=server.port)
+    future = engine.submit("slow.example", wire.TYPE_A, 10.0)
+    engine.close()
+
+    with pytest.raises(ResolutionError):
+        future.result(timeout=1.0)
+    with pytest.raises(ResolutionError):
+        engine.submit("late.example", wire.TYPE_A, 1.0)
+
+
+class _RacingReader:
+    """Wake socket wrapper that submits a query just before each read."""
+
+    def __init__(self, engine: UDPEngine, sock: socket.socket) -> None:
+        self.engine = engine
+        self.sock = sock
+        self.raced: List["Future[wire.Message]"] = []
+
+    def recv(self, size: int) -> bytes:
+        if not self.raced:
+            self.raced.append(
+                self.engine.submit("raced.example", wire.TYPE_A, 60.0)
+            )
+        return self.sock.recv(size)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def test_engine_wakes_after_submit_races_with_drain(
+    server: _StubServer,
+) -> None:
+    # Long deadlines and retries: no timer may wake the dispatcher, only
+    # the wake-up socket.
+    engine = UDPEngine(["127.0.0.1"], port=server.port, retry_interval=60.0)
+    reader = _RacingReader(engine, engine._wake_reader)
+    engine._wake_reader = reader  # type: ignore[assignment]
+    try:
+        assert engine.submit("first.example", wire.TYPE_A, 60.0).result(2.0)
+        assert reader.raced[0].result(2.0)
+        time.sleep(0.05)  # let the dispatcher go idle in select()
+        future = engine.submit("later.example", wire.TYPE_A, 60.0)
+        assert future.result(2.0).answers[0].value == "192.0.2.10"
+    finally:
+        engine.close()
+
+
+def test_engine_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        UDPEngine([])
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], sockets=0)
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], retry_interval=0)
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], max_in_flight=0)
+
+
+def test_system_nameservers(tmp_path) -> None:
+    conf = tmp_path / "resolv.conf"
+    conf.write_text(
+        "# comment\nnameserver 192.0.2.53\nsearch example\n"
+        "nameserver fe80::1%eth0\n",
+        encoding="utf-8",
+    )
+    assert system_nameservers(str(conf)) == ["192.0.2.53", "fe80::1"]
+    assert system_nameservers(str(tmp_path / "missing")) == ["127.0.0.1"]
+
+
+def _udp_session(server: _StubServer) -> resolver.ResolverSession:
+    return resolver.ResolverSession(
+        ["127.0.0.1"], port=server.port, backend="udp"
+    )
+
+
+def test_resolve_host_udp_backend(server: _StubServer) -> None:
+    session = _udp_session(server)
+    try:
+        result = resolver.resolve_host("host.example", 2.0, session=session)
+        with pytest.raises(ResolutionError, match="does not exist"):
+            resolver.resolve_host("missing.example", 2.0, session=session)
+        with pytest.raises(ResolutionError, match="failed"):
+            resolver.resolve_host("servfail.example", 2.0, session=session)
+        only_v6 = resolver.resolve_host(
+            "host.example", 2.0, session=session, family=6
+        )
+    finally:
+        session.close()
+
+    assert result.ipv4 == ["192.0.2.10"]
+    assert result.ipv6 == ["2001:db8::10"]
+    assert only_v6.ipv4 == []
+
+
+def test_resolve_host_udp_backend_skips_malformed_addresses(
+    server: _StubServer,
+) -> None:
+    def handler(query: wire.Message, transport: str) -> bytes:
+        assert query.question is not None
+        name, rdtype = query.question
+        if rdtype == wire.TYPE_AAAA:
+            return wire.encode_response(query)
+        data = bytearray(
+            wire.encode_response(
+                query, [(rdtype, 60, "192.0.2.1"), (rdtype, 60, "192.0.2.2")]
+            )
+        )
+        # Stretch the last record's rdlength from 4 to 5 bytes.
+        data[-6:-4] = struct.pack("!H", 5)
+        return bytes(data) + b"\x00"
+
+    server.handler = handler
+    session = _udp_session(server)
+    try:
+        result = resolver.resolve_host("bad.example", 2.0, session=session)
+    finally:
+        session.close()
+    assert result == resolver.ResolveResult(["192.0.2.1"], [])
+
+
+def test_resolve_host_udp_backend_records_metrics(
+    server: _StubServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    metrics = Metrics()
+    monkeypatch.setattr(resolver, "get_metrics", lambda: metrics)
+    session = _udp_session(server)
+    try:
+        resolver.resolve_host("host.example", 2.0, session=session)
+        with pytest.raises(ResolutionError):
+            resolver.resolve_host("missing.example", 2.0, session=session)
+    finally:
+        session.close()
+
+    snapshot = metrics.snapshot()
+    noerror = (("rdtype", "AAAA"), ("outcome", "noerror"))
+    nxdomain = (("rdtype", "A"), ("outcome", "nxdomain"))
+    assert snapshot.counter("dns_queries_total", noerror) == 1
+    assert snapshot.counter("dns_queries_total", nxdomain) == 1
+    assert snapshot.histograms[
+        ("dns_query_seconds", (("rdtype", "A"),))
+    ].samples == 2
+
+
+def test_resolve_host_udp_backend_caches_ttl(server: _StubServer) -> None:
+    now = [0.0]
+    cache = ResolverCache(clock=lambda: now[0])
+    session = _udp_session(server)
+    try:
+        resolver.resolve_host("ttl.example", 2.0, cache=cache, session=session)
+    finally:
+        session.close()
+
+    now[0] = 59.0
+    assert cache.get("ttl.example") is not None
+    now[0] = 61.0
+    assert cache.get("ttl.example") is None
+
+
+def test_resolve_host_udp_backend_caches_negative_answers(
+    server: _StubServer,
+) -> None:
+    now = [0.0]
+    cache = ResolverCache(clock=lambda: now[0])
+    session = resolver.ResolverSession(
+        ["127.0.0.1"], port=server.port, family=4, backend="udp"
+    )
+    try:
+        for _ in range(2):
+            with pytest.raises(NXDomainError):
+                resolver.resolve_host(
+                    "missing.example", 2.0, cache=cache, session=session
+                )
+        sent = len(server.queries)
+        assert sent == 1
+        now[0] = 61.0  # The SOA negative TTL is 60s.
+        with pytest.raises(NXDomainError):
+            resolver.resolve_host(
+                "missing.example", 2.0, cache=cache, session=session
+            )
+    finally:
+        session.close()
+    assert len(server.queries) == 2
+
+
+def test_resolve_host_async_udp_backend(server: _StubServer) -> None:
+    session = _udp_session(server)
+
+    async def run():
+        return await resolver.resolve_many_async(
+            ["a.example", "missing.example"], 2.0, session=session
+        )
+
+    try:
+        outcomes = asyncio.run(run())
+    finally:
+        session.close()
+
+    assert isinstance(outcomes[0], resolver.ResolveResult)
+    assert outcomes[0].ipv6 == ["2001:db8::10"]
+    assert isinstance(outcomes[1], ResolutionError)
+
+
+def test_resolve_reverse_udp_backend(server: _StubServer) -> None:
+    session = _udp_session(server)
+
+    async def run():
+        return await resolver.resolve_reverse_many_async(
+            ["2001:db8::1", "192.0.2.9"], 2.0, session=session
+        )
+
+    try:
+        names = resolver.resolve_reverse("192.0.2.1", 2.0, session=session)
+        outcomes = asyncio.run(run())
+    finally:
+        session.close()
+
+    assert names == ["a.example", "host.example"]
+    assert server.queries[0] == (
+        ("1.2.0.192.in-addr.arpa", wire.TYPE_PTR),
+        "udp",
+    )
+    assert outcomes[0] == names
+    assert isinstance(outcomes[1], NXDomainError)
+
+
+def test_session_invalid_backend() -> None:
+    with pytest.raises(ValueError):
+        resolver.ResolverSession(backend="carrier-pigeon")
+
+
+def _silent(query: wire.Message, transport: str) -> Optional[bytes]:
+    return None
+
+
+@pytest.fixture
+def pair():
+    """A silent nameserver on 127.0.0.1 and a working one on 127.0.0.2."""
+
+    stalled = _StubServer(_silent)
+    healthy = _StubServer(host="127.0.0.2", port=stalled.port)
+    yield stalled, healthy
+    stalled.close()
+    healthy.close()
+
+
+@pytest.fixture
+def metrics(monkeypatch: pytest.MonkeyPatch) -> Metrics:
+    registry = Metrics()
+    monkeypatch.setattr(udp, "get_metrics", lambda: registry)
+    return registry
+
+
+def test_engine_retransmits_to_the_next_nameserver(pair) -> None:
+    stalled, healthy = pair
+    engine = UDPEngine(
+        ["127.0.0.2", "127.0.0.1"], port=stalled.port, retry_interval=0.05
+    )
+    try:
+        # The second query starts on the silent server; its retransmit
+        # must move on to the other one instead of retrying it.
+        engine.query("first.example", wire.TYPE_A, 2.0)
+        engine.query("second.example", wire.TYPE_A, 2.0)
+    finally:
+        engine.close()
+    assert [q for q, _ in stalled.queries] == [
+        ("second.example", wire.TYPE_A)
+    ]
+
+
+def test_engine_hedges_slow_queries(pair, metrics: Metrics) -> None:
+    stalled, healthy = pair
+    engine = UDPEngine(
+        ["127.0.0.1", "127.0.0.2"],
+        port=stalled.port,
+        retry_interval=5.0,
+        hedge_delay=0.05,
+    )
+    try:
+        started = time.monotonic()
+        message = engine.query("example.com", wire.TYPE_A, 3.0)
+        assert time.monotonic() - started < 1.0
+    finally:
+        engine.close()
+    assert message.answers
+    snapshot = metrics.snapshot()
+    assert snapshot.counter("hedged_queries_total", (("result", "sent"),)) == 1
+    assert snapshot.counter("hedged_queries_total", (("result", "won"),)) == 1
+
+
+def test_engine_caps_hedge_rate(
+    pair, metrics: Metrics, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stalled, healthy = pair
+    monkeypatch.setattr(udp, "HEDGE_BURST", 1.0)
+    engine = UDPEngine(
+        ["127.0.0.1", "127.0.0.2"],
+        port=stalled.port,
+        retry_interval=0.3,
+        hedge_delay=0.02,
+        hedge_max_rate=0.0,
+    )
+    try:
+        engine.query("one.example", wire.TYPE_A, 2.0)  # offset 0: hedged
+        engine.query("two.example", wire.TYPE_A, 2.0)  # offset 1: healthy
+        engine.query("three.example", wire.TYPE_A, 2.0)  # budget spent
+    finally:
+        engine.close()
+    snapshot = metrics.snapshot()
+    assert snapshot.counter("hedged_queries_total", (("result", "sent"),)) == 1
+    assert snapshot.counter(
+        "hedged_queries_total", (("result", "capped"),)
+    ) == 1
+
+
+def test_engine_hedge_delay_follows_latency_percentile(
+    server: _StubServer,
+) -> None:
+    second = _StubServer(host="127.0.0.2", port=server.port)
+    engine = UDPEngine(
+        ["127.0.0.1", "127.0.0.2"],
+        port=server.port,
+        hedge_delay=0.001,
+        hedge_percentile=90,
+    )
+    try:
+        assert engine._current_hedge_delay() == 0.001
+        for index in range(udp.HEDGE_MIN_SAMPLES):
+            engine.query(f"host{index}.example", wire.TYPE_A, 2.0)
+        delay = engine._current_hedge_delay()
+    finally:
+        engine.close()
+        second.close()
+    assert delay is not None and 0.001 <= delay < 0.5
+
+
+def test_engine_rejects_invalid_hedging() -> None:
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], hedge_delay=0)
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], hedge_percentile=100)
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.1"], hedge_max_rate=2)
+
+
+def test_engine_routes_by_nameserver_health(pair) -> None:
+    stalled, healthy = pair
+    tracker = NameserverHealth(["127.0.0.1", "127.0.0.2"], eject_after=1)
+    engine = UDPEngine(
+        ["127.0.0.1", "127.0.0.2"],
+        port=stalled.port,
+        retry_interval=0.05,
+        health=tracker,
+    )
+    try:
+        for index in range(5):
+            engine.query(f"host{index}.example", wire.TYPE_A, 2.0)
+    finally:
+        engine.close()
+    # Only the first query tried the silent server before it was ejected.
+    assert len(stalled.queries) == 1
+    assert len(healthy.queries) == 5
+    silent, working = tracker.stats()
+    assert (silent.state, silent.failures) == ("ejected", 1)
+    assert working.state == "healthy" and working.latency is not None
+    with pytest.raises(ValueError):
+        UDPEngine(["127.0.0.2"], health=tracker)
+
+
+def test_session_reports_nameserver_stats(pair) -> None:
+    stalled, healthy = pair
+    session = resolver.ResolverSession(
+        ["127.0.0.2"], port=healthy.port, family=4, backend="udp"
+    )
+    assert session.nameserver_stats() == []
+    try:
+        resolver.resolve_host("example.com", 1.0, session=session)
+    finally:
+        session.close()
+    [stats] = session.nameserver_stats()
+    assert (stats.server, stats.queries) == ("127.0.0.2", 1)
+
+
+def test_engine_paces_first_attempts(server: _StubServer) -> None:
+    engine = UDPEngine(
+        ["127.0.0.1"], port=server.port, limiter=RateLimiter(qps=40)
+    )
+    try:
+        started = time.monotonic()
+        futures = [
+            engine.submit(f"paced{index}.example", wire.TYPE_A, 2.0)
+            for index in range(5)
+        ]
+        assert all(future.result().answers for future in futures)
+        assert time.monotonic() - started >= 0.09
+    finally:
+        engine.close()
+
+
+def test_engine_spreads_queries_over_nameserver_limits(
+    server: _StubServer,
+) -> None:
+    second = _StubServer(host="127.0.0.2", port=server.port)
+    engine = UDPEngine(
+        ["127.0.0.1", "127.0.0.2"],
+        port=server.port,
+        health=NameserverHealth(["127.0.0.1", "127.0.0.2"]),
+        limiter=RateLimiter(nameserver_qps=10),
+    )
+    try:
+        started = time.monotonic()
+        futures = [
+            engine.submit(f"spread{index}.example", wire.TYPE_A, 2.0)
+            for index in range(4)
+        ]
+        assert all(future.result().answers for future in futures)
+        elapsed = time.monotonic() - started
+    finally:
+        engine.close()
+        second.close()
+    # Two per server, 0.1s apart, instead of four on the preferred one.
+    assert (len(server.queries), len(second.queries)) == (2, 2)
+    assert 0.09 <= elapsed < 0.3
+
+
+def test_engine_fails_queries_the_limit_cannot_fit(
+    server: _StubServer,
+) -> None:
+    engine = UDPEngine(
+        ["127.0.0.1"], port=server.port, limiter=RateLimiter(qps=1)
+    )
+    try:
+        first = engine.submit("first.example", wire.TYPE_A, 0.5)
+        second = engine.submit("second.example", wire.TYPE_A, 0.5)
+        assert first.result().answers
+        with pytest.raises(DNSTimeoutError):
+            second.result(timeout=0.2)
+    finally:
+        engine.close()
+    assert len(server.queries) == 1
+
+
+def test_session_rate_limits_udp_lookups(server: _StubServer) -> None:
+    session = resolver.ResolverSession(
+        ["127.0.0.1"], port=server.port, backend="udp", qps=20
+    )
+    try:
+        started = time.monotonic()
+        resolver.resolve_host("a.example", 2.0, session=session)
+        resolver.resolve_host("b.example", 2.0, session=session)
+        # Four queries (A and AAAA twice), 50ms apart.
+        assert time.monotonic() - started >= 0.14
+    finally:
+        session.close()
+    assert session.rate_limiter is not None
+    assert session.udp_engine().limiter is session.rate_limiter
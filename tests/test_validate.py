@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import subprocess
+import sys
+
 import pytest
 
+import domain_ip_converter
+
 from domain_ip_converter.errors import InvalidInputError
-from domain_ip_converter.validate import normalize_domain
+from domain_ip_converter.validate import (
+    _fast_host,
+    _normalize_full,
+    normalize_address,
+    normalize_addresses,
+    normalize_domain,
+    normalize_many,
+)
 
 
 def test_normalize_domain_basic() -> None:
@@ -60,3 +72,90 @@ def test_normalize_domain_url_without_scheme() -> None:
 def test_normalize_domain_empty_label() -> None:
     with pytest.raises(InvalidInputError):
         normalize_domain("example..com")
+
+
+def test_normalize_domain_fast_path() -> None:
+    assert _fast_host("  WWW.Example.COM. ") == "www.example.com"
+    assert _fast_host("пример.рф") is None
+    assert _fast_host("example.com/path") is None
+    assert _fast_host("-bad.example") is None
+    assert normalize_domain("Example.COM.") == "example.com"
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "Example.COM",
+        "example.com.",
+        "192.0.2.1",
+        "010.1.1.1",
+        "1.2.3",
+        "123",
+        "xn--e1afmkfd.xn--p1ai",
+        "a" * 63 + ".example",
+        ".".join(["abcdefghij"] * 23),
+    ],
+)
+def test_fast_path_matches_full_path(raw: str) -> None:
+    assert _fast_host(raw) == _normalize_full(raw)
+
+
+def test_normalize_many_aligns_errors_with_inputs() -> None:
+    inputs = [
+        "Example.COM",
+        "https://user@пример.рф/x",
+        "-bad.example",
+        "[2001:db8::1]",
+        "Example.COM",
+    ]
+    results = normalize_many(inputs)
+
+    assert results[0] == "example.com"
+    assert results[1] == "xn--e1afmkfd.xn--p1ai"
+    assert isinstance(results[2], InvalidInputError)
+    assert "Invalid hostname label" in str(results[2])
+    assert results[3] == "2001:db8::1"
+    assert results[4] == "example.com"
+
+
+def test_normalize_many_bounded_memo() -> None:
+    inputs = [f"host{index % 5}.example" for index in range(20)]
+    assert normalize_many(inputs, memo_size=2) == inputs
+
+
+def test_normalize_address() -> None:
+    assert normalize_address(" 192.0.2.1\n") == "192.0.2.1"
+    assert normalize_address("[2001:DB8:0::1]") == "2001:db8::1"
+    assert normalize_address("fe80::1%eth0") == "fe80::1"
+    for bad in ("example.com", "192.0.2.256", "[]", ""):
+        with pytest.raises(InvalidInputError, match="Invalid IP address"):
+            normalize_address(bad)
+
+
+def test_normalize_addresses_aligns_errors_with_inputs() -> None:
+    results = normalize_addresses(["2001:db8::1", "bogus", "2001:DB8::1"])
+
+    assert results[0] == results[2] == "2001:db8::1"
+    assert isinstance(results[1], InvalidInputError)
+
+
+def test_package_exports_load_on_first_use() -> None:
+    code = (
+        "import sys, domain_ip_converter as package\n"
+        "assert package.normalize_domain('Example.COM.') == 'example.com'\n"
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    loaded = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert "domain_ip_converter.validate" in loaded
+    assert "domain_ip_converter.resolver" not in loaded
+    assert "domain_ip_converter.cli" not in loaded
+
+    assert domain_ip_converter.normalize_domain is normalize_domain
+    assert set(domain_ip_converter.__all__) <= set(dir(domain_ip_converter))
+    with pytest.raises(AttributeError):
+        getattr(domain_ip_converter, "no_such_name")
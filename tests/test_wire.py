@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import struct
+
+import pytest
+
+from domain_ip_converter import wire
+
+
+def test_encode_query_roundtrip() -> None:
+    data = wire.encode_query(0xBEEF, "Example.COM.", wire.TYPE_AAAA)
+    message = wire.decode_message(data)
+
+    assert message.txid == 0xBEEF
+    assert message.question == ("example.com", wire.TYPE_AAAA)
+    assert message.flags & wire.FLAG_RD
+    assert not message.is_response
+
+
+def test_encode_response_records_and_negative_ttl() -> None:
+    query = wire.decode_message(wire.encode_query(7, "a.example", 1))
+    data = wire.encode_response(
+        query,
+        [
+            (wire.TYPE_CNAME, 300, "b.example"),
+            (wire.TYPE_A, 60, "192.0.2.1"),
+        ],
+        negative_ttl=30,
+    )
+    message = wire.decode_message(data)
+
+    assert message.is_response
+    assert message.rcode == wire.RCODE_NOERROR
+    assert [(r.rdtype, r.ttl, r.value) for r in message.answers] == [
+        (wire.TYPE_CNAME, 300, "b.example"),
+        (wire.TYPE_A, 60, "192.0.2.1"),
+    ]
+    assert message.negative_ttl() == 30
+
+
+def test_negative_ttl_uses_smaller_of_ttl_and_minimum() -> None:
+    query = wire.decode_message(wire.encode_query(7, "a.example", 1))
+    data = bytearray(
+        wire.encode_response(
+            query, rcode=wire.RCODE_NXDOMAIN, negative_ttl=900
+        )
+    )
+    # Lower the SOA record TTL (not the minimum field) to 120.
+    soa_ttl = data.rfind(struct.pack("!I", 900), 0, len(data) - 4)
+    data[soa_ttl:soa_ttl + 4] = struct.pack("!I", 120)
+
+    message = wire.decode_message(bytes(data))
+    assert message.rcode == wire.RCODE_NXDOMAIN
+    assert message.negative_ttl() == 120
+
+
+def test_truncated_response_has_no_answers() -> None:
+    query = wire.decode_message(wire.encode_query(9, "a.example", 1))
+    message = wire.decode_message(
+        wire.encode_response(query, [(1, 60, "192.0.2.1")], truncated=True)
+    )
+    assert message.truncated
+    assert message.answers == []
+
+
+def _bad_address_response(rdtype: int, value: str) -> bytes:
+    """Return a response whose last answer's rdlength is one too long."""
+
+    query = wire.decode_message(wire.encode_query(9, "a.example", rdtype))
+    data = bytearray(wire.encode_response(query, [(rdtype, 60, value)]))
+    size = 4 if rdtype == wire.TYPE_A else 16
+    rdlength = len(data) - size - 2
+    data[rdlength:rdlength + 2] = struct.pack("!H", size + 1)
+    return bytes(data) + b"\x00"
+
+
+def test_decode_address_with_bad_rdlength_has_no_value() -> None:
+    for rdtype, value in (
+        (wire.TYPE_A, "192.0.2.1"),
+        (wire.TYPE_AAAA, "2001:db8::1"),
+    ):
+        message = wire.decode_message(_bad_address_response(rdtype, value))
+        [record] = message.answers
+        assert (record.rdtype, record.value) == (rdtype, "")
+        assert len(record.rdata) == (5 if rdtype == wire.TYPE_A else 17)
+
+
+def test_decode_compressed_names() -> None:
+    header = struct.pack("!HHHHHH", 1, 0x8180, 1, 1, 0, 0)
+    question = wire.encode_name("a.example") + struct.pack("!HH", 1, 1)
+    answer = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + bytes(
+        [192, 0, 2, 5]
+    )
+    message = wire.decode_message(header + question + answer)
+
+    assert message.answers[0].name == "a.example"
+    assert message.answers[0].value == "192.0.2.5"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"\x00\x01",
+        struct.pack("!HHHHHH", 1, 0, 1, 0, 0, 0) + b"\x05abc",
+        struct.pack("!HHHHHH", 1, 0, 1, 0, 0, 0) + b"\xc0\x0c",
+        struct.pack("!HHHHHH", 1, 0, 0, 1, 0, 0)
+        + b"\x00"
+        + struct.pack("!HHIH", 1, 1, 60, 4),
+    ],
+)
+def test_decode_rejects_malformed(data: bytes) -> None:
+    with pytest.raises(wire.WireFormatError):
+        wire.decode_message(data)
+
+
+def test_encode_name_rejects_bad_labels() -> None:
+    with pytest.raises(wire.WireFormatError):
+        wire.encode_name("a..example")
+    with pytest.raises(wire.WireFormatError):
+        wire.encode_name("x" * 64 + ".example")